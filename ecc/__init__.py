@@ -2,3 +2,4 @@ from ecc.controller import *
 from ecc.utilities import *
 from ecc.point import *
 import ecc.types as types
+import ecc.report as report
@@ -0,0 +1,4 @@
+from .gates import Gate, GATES
+from .folding import Folding, fold_constants
+from .netlist import Netlist
+from .simulate import simulate, Simulation
@@ -0,0 +1,206 @@
+from itertools import product
+from typing import Optional, Sequence
+
+from ecc.circuit.gates import Gate, NOT
+from ecc.circuit.netlist import Netlist
+from ecc.types import Binary, Name
+
+
+GateRecord = tuple[Gate, tuple[Name, ...]]
+
+
+class _Names:
+    """disjoint set of names with constant values, used while folding"""
+
+    def __init__(self, constants: dict[Name, Binary]) -> None:
+        self.parent: dict[Name, Name] = {}
+        self.value: dict[Name, Binary] = dict(constants)
+        self.merges: list[tuple[Name, Name]] = []
+        # increased on every change
+        self.version = 0
+
+    def find(self, name: Name) -> Name:
+        parent = self.parent
+        while name in parent:
+            name = parent[name]
+
+        return name
+
+    def get(self, name: Name) -> Optional[Binary]:
+        return self.value.get(self.find(name))
+
+    def set(self, name: Name, value: Binary) -> None:
+        self.value[self.find(name)] = value
+        self.version += 1
+
+    def merge(self, name1: Name, name2: Name) -> None:
+        """merge name2 to name1, caller checks values does not conflict"""
+        name1, name2 = self.find(name1), self.find(name2)
+        if name1 == name2:
+            return
+
+        self.parent[name2] = name1
+        self.merges.append((name1, name2))
+        self.version += 1
+
+        if name2 in self.value:
+            self.value[name1] = self.value.pop(name2)
+
+
+def _fold_gate(gate: Gate, names: tuple[Name, ...], table: _Names) -> Optional[list[GateRecord]]:
+    """returns gates replacing given gate, None if it is kept"""
+    names = tuple(table.find(n) for n in names)
+    inputs = names[:gate.n_inputs]
+    outputs = names[gate.n_inputs:gate.n_inputs + gate.n_outputs]
+
+    free = list(dict.fromkeys(n for n in inputs if table.get(n) is None))
+    if free and gate is NOT:
+        return None
+
+    # outputs and ancillas of every assignment of free inputs
+    rows = []
+    for assignment in product((0, 1), repeat=len(free)):
+        value = dict(zip(free, assignment))
+        evaluated = gate.evaluate(
+            *(value[n] if n in value else table.get(n) for n in inputs))
+        rows.append((value, evaluated))
+
+    def consistent(value: dict, evaluated: tuple) -> bool:
+        seen = dict(value)
+        for n, v in zip(names[gate.n_inputs:], evaluated):
+            if (known := table.get(n)) is not None and known != v:
+                return False
+            if seen.setdefault(n, v) != v:
+                return False
+
+        return True
+
+    valid = [row for row in rows if consistent(*row)]
+    if not valid:
+        # no zero energy state, keep penalty
+        return None
+
+    if len(valid) < len(rows):
+        # outputs restrict inputs, fix inputs that have a single valid value
+        for n in free:
+            values = {value[n] for value, _ in valid}
+            if len(values) == 1:
+                table.set(n, values.pop())
+
+        return None
+
+    replaced: list[GateRecord] = []
+    merges: list[tuple[Name, Name]] = []
+    constants: dict[Name, Binary] = {}
+
+    # ancillas are replaced like outputs, so their value is known after gate is removed
+    for i, out in enumerate(names[gate.n_inputs:]):
+        column = [evaluated[i] for _, evaluated in rows]
+
+        if len(set(column)) == 1:
+            constants[out] = column[0]
+            continue
+
+        for n in free:
+            inputs_column = [value[n] for value, _ in rows]
+
+            if column == inputs_column:
+                merges.append((out, n))
+                break
+
+            if column == [v ^ 1 for v in inputs_column]:
+                replaced.append((NOT, (n, out)))
+                break
+
+        else:
+            return None
+
+    for out, value in constants.items():
+        if table.get(out) is None:
+            table.set(out, value)
+
+    for out, n in merges:
+        table.merge(out, n)
+
+    return replaced
+
+
+def _fold_all(gates: Sequence[GateRecord], table: _Names) -> list[GateRecord]:
+    """fold gates until nothing changes, returns remaining gates"""
+    changed = True
+    while changed:
+        version = table.version
+        remaining: list[GateRecord] = []
+
+        for gate, names in gates:
+            replaced = _fold_gate(gate, names, table)
+
+            if replaced is None:
+                remaining.append((gate, names))
+            else:
+                remaining += replaced
+
+        changed = table.version != version or len(remaining) != len(gates)
+        gates = remaining
+
+    return list(gates)
+
+
+class Folding:
+    """constants propagated through gates added in order, gates added later are folded with what is already known
+    remaining gates are folded again only when later gates find a new constant or merge"""
+
+    def __init__(self, constants: dict[Name, Binary]) -> None:
+        self._table = _Names(constants)
+        self._gates: list[GateRecord] = []
+        self._netlist: Optional[Netlist] = None
+
+    def add(self, gates: Sequence[GateRecord]) -> None:
+        self._netlist = None
+
+        version = self._table.version
+        gates = _fold_all(gates, self._table)
+
+        if self._table.version != version:
+            self._gates = _fold_all(self._gates + gates, self._table)
+        else:
+            self._gates += gates
+
+    @property
+    def gates(self) -> list[GateRecord]:
+        """remaining gates with merged names replaced"""
+        find = self._table.find
+        return [(gate, tuple(find(n) for n in names)) for gate, names in self._gates]
+
+    @property
+    def netlist(self) -> Netlist:
+        """remaining gates as netlist, made once after gates are added"""
+        if self._netlist is None:
+            self._netlist = Netlist(self.gates)
+
+        return self._netlist
+
+    @property
+    def constants(self) -> dict[Name, Binary]:
+        """constants found, including given ones"""
+        find = self._table.find
+        return {find(n): v for n, v in self._table.value.items()}
+
+    @property
+    def merges(self) -> list[tuple[Name, Name]]:
+        """pairs of names merged, name2 to name1"""
+        return self._table.merges
+
+    def __len__(self) -> int:
+        return len(self._gates)
+
+
+def fold_constants(
+    gates: Sequence[GateRecord], constants: dict[Name, Binary]
+) -> tuple[list[GateRecord], dict[Name, Binary], list[tuple[Name, Name]]]:
+    """propagate constants through gates
+    returns remaining gates, constants found(including given ones) and pairs of names to merge(name2 to name1)"""
+    folding = Folding(constants)
+    folding.add(gates)
+
+    return folding.gates, folding.constants, folding.merges
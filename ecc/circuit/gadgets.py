@@ -0,0 +1,227 @@
+from functools import cache
+from itertools import combinations, product
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+from scipy.optimize import linprog
+
+from ecc.circuit.gates import Gate, GATES, XOR, CTRL_SELECT
+from ecc.circuit.scaling import H_RANGE, J_RANGE
+from ecc.utilities.bqm_builder import Penalty
+
+
+OBJECTIVES = ('size', 'gap')
+
+
+# xor with ancilla a | b instead of a & b
+XOR_OR_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (2, 1), (3, 4)],
+    quadratic=[(0, 1, 2), (0, 2, 2), (1, 2, 2),
+               (0, 3, -4), (1, 3, -4), (2, 3, -4)],
+)
+
+# same ground states as CTRL_SELECT_PENALTY with 8 interactions instead of 10
+CTRL_SELECT_SPARSE_PENALTY = Penalty(
+    linear=[(0, 1), (3, 1), (4, 6)],
+    quadratic=[(0, 2, -1), (0, 3, -2), (0, 4, 2), (1, 2, 1),
+               (1, 4, -2), (2, 3, 2), (2, 4, -4), (3, 4, -4)],
+)
+
+# ctrl_select with ancilla in0 & ~ctrl
+CTRL_SELECT_NOT_PENALTY = Penalty(
+    linear=[(0, 1), (3, 3), (4, 2)],
+    quadratic=[(0, 2, -1), (0, 4, -2), (1, 2, 1), (1, 3, -2),
+               (1, 4, 2), (2, 3, -2), (2, 4, 4), (3, 4, -4)],
+)
+
+# two ctrl_select with same control and swapped inputs share one ancilla in1 & ctrl
+CTRL_SWAP_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (3, 1), (4, 2), (5, 6)],
+    quadratic=[(0, 1, 2), (0, 3, -2), (0, 4, -2), (1, 2, 2), (1, 3, -1), (1, 4, -3), (1, 5, -4),
+               (2, 3, 1), (2, 4, -1), (2, 5, -4), (3, 4, 1), (3, 5, -2), (4, 5, 2)],
+)
+
+# full adder of (in0 & x), in1, in2, partial product does not need its own bit
+FULLADDER_AND_PENALTY = Penalty(
+    linear=[(2, 1), (3, 1), (4, 3), (5, 10)],
+    quadratic=[(0, 1, 1), (0, 2, 2), (0, 3, 2), (0, 4, -2), (0, 5, -4),
+               (1, 2, 2), (1, 3, 2), (1, 4, -2), (1, 5, -4), (2, 3, 4),
+               (2, 4, -4), (2, 5, -8), (3, 4, -4), (3, 5, -8), (4, 5, 8)],
+)
+
+# full adder of (in0 ^ x), in1, in2 with ancilla in0 & x, xor does not need its own bit
+FULLADDER_XOR_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (2, 1), (3, 1), (4, 1), (5, 4), (6, 7)],
+    quadratic=[(0, 1, 3), (0, 2, 2), (0, 3, 2), (0, 4, -2), (0, 5, -4), (0, 6, -6),
+               (1, 2, 2), (1, 3, 2), (1, 4, -2), (1, 5, -4), (1, 6, -6),
+               (2, 3, 2), (2, 4, -2), (2, 5, -4), (2, 6, -4),
+               (3, 4, -2), (3, 5, -4), (3, 6, -4), (4, 5, 4), (4, 6, 4), (5, 6, 8)],
+)
+
+
+def _fulladder(a, b, c):
+    return a ^ b ^ c, (a & b) | (c & (a ^ b))
+
+
+XOR_OR = Gate(
+    'xor_or', 2, 1, 1,
+    lambda a, b, one=1: (a ^ b, a | b),
+    XOR_OR_PENALTY,
+)
+
+CTRL_SELECT_SPARSE = Gate(
+    'ctrl_select_sparse', 3, 1, 1,
+    CTRL_SELECT.evaluate,
+    CTRL_SELECT_SPARSE_PENALTY,
+)
+
+CTRL_SELECT_NOT = Gate(
+    'ctrl_select_not', 3, 1, 1,
+    lambda a, b, ctrl, one=1: (a ^ ((a ^ b) & ctrl), a & (ctrl ^ one)),
+    CTRL_SELECT_NOT_PENALTY,
+)
+
+CTRL_SWAP = Gate(
+    'ctrl_swap', 3, 2, 1,
+    lambda a, b, ctrl, one=1: (a ^ ((a ^ b) & ctrl), b ^ ((a ^ b) & ctrl), b & ctrl),
+    CTRL_SWAP_PENALTY,
+)
+
+FULLADDER_AND = Gate(
+    'fulladder_and', 4, 2, 0,
+    lambda a, x, b, c, one=1: _fulladder(a & x, b, c),
+    FULLADDER_AND_PENALTY,
+)
+
+FULLADDER_XOR = Gate(
+    'fulladder_xor', 4, 2, 1,
+    lambda a, x, b, c, one=1: (*_fulladder(a ^ x, b, c), a & x),
+    FULLADDER_XOR_PENALTY,
+)
+
+# alternative encodings of every gadget, first one is used when no objective is given
+GADGETS: dict[str, list[Gate]] = {
+    'xor': [XOR, XOR_OR],
+    'ctrl_select': [CTRL_SELECT, CTRL_SELECT_SPARSE, CTRL_SELECT_NOT],
+    'ctrl_swap': [CTRL_SWAP],
+    'fulladder_and': [FULLADDER_AND],
+    'fulladder_xor': [FULLADDER_XOR],
+}
+
+# every gate kind by name, including alternative encodings
+ALL_GATES: dict[str, Gate] = {
+    **GATES, **{gate.name: gate for gates in GADGETS.values() for gate in gates}}
+
+
+def truth_table(gate: Gate) -> np.ndarray:
+    """ground state of every input assignment as (2**n_inputs, size) array, bits ordered as gate's bits"""
+    rows = []
+    for inputs in product((0, 1), repeat=gate.n_inputs):
+        rows.append((*inputs, *gate.evaluate(*inputs)))
+
+    return np.array(rows, dtype=np.int8)
+
+
+def verify(gate: Gate, penalty: Optional[Penalty] = None, atol: float = 1e-9) -> float:
+    """check every state of penalty(gate's penalty if not given) against truth table of gate
+    truth table states must have zero energy, no state is lower and states with wrong outputs are higher
+    returns smallest energy of states with wrong outputs, raises ValueError if penalty does not encode gate"""
+    penalty = gate.penalty if penalty is None else penalty
+    if penalty.size > gate.size:
+        raise ValueError(f"penalty has more bits than {gate.name} gate")
+
+    n = gate.size
+    states = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+    energies = penalty.energies(n)
+
+    table = truth_table(gate)
+    index = table.astype(np.int64) @ (1 << np.arange(n))
+    if np.abs(energies[index]).max() > atol:
+        raise ValueError(f"truth table of {gate.name} gate has nonzero energy")
+    if energies.min() < -atol:
+        raise ValueError(f"penalty of {gate.name} gate has state lower than truth table")
+
+    # state is wrong if its inputs and outputs are not a row of truth table
+    m = gate.n_inputs + gate.n_outputs
+    visible = (states[:, :m] @ (1 << np.arange(m)))
+    wrong = ~np.isin(visible, index & ((1 << m) - 1))
+
+    gap = float(energies[wrong].min()) if wrong.any() else np.inf
+    if gap <= atol:
+        raise ValueError(f"penalty of {gate.name} gate has wrong output on ground state")
+
+    return gap
+
+
+def scaled_gap(penalty: Penalty, h_range: float = H_RANGE, j_range: float = J_RANGE) -> float:
+    """gap of penalty after it's biases are scaled to fit on h_range, j_range"""
+    scale = max(max((abs(b) / h_range for _, b in penalty.linear), default=0),
+                max((abs(b) / j_range for _, _, b in penalty.quadratic), default=0))
+
+    return penalty.gap / scale if scale else np.inf
+
+
+def fit_penalty(
+    n_inputs: int,
+    evaluate: Callable[..., tuple],
+    couplers: Optional[Sequence[tuple[int, int]]] = None,
+    h_range: float = H_RANGE,
+    j_range: float = J_RANGE,
+) -> Optional[Penalty]:
+    """penalty whose zero energy states are (inputs, evaluate(inputs)) and every other state has energy >= 1
+    largest bias relative to h_range, j_range is minimized by linear program, None if there is no such penalty
+    couplers limits interactions to given pairs of positions, can be used to search encodings of fewer interactions"""
+    n = n_inputs + len(evaluate(*([0] * n_inputs)))
+    pairs = list(combinations(range(n), 2)) if couplers is None else [tuple(sorted(p)) for p in couplers]
+
+    states = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+    features = np.hstack([states, np.stack([states[:, i] * states[:, j] for i, j in pairs], axis=1)
+                          if pairs else np.zeros((2**n, 0)), np.ones((2**n, 1))])
+
+    valid = np.zeros(2**n, dtype=bool)
+    for inputs in product((0, 1), repeat=n_inputs):
+        valid[int(np.dot((*inputs, *evaluate(*inputs)), 1 << np.arange(n)))] = True
+
+    # variables are biases, offset and scale t, minimize t where |h| <= h_range * t and |J| <= j_range * t
+    k = features.shape[1]
+    ranges = np.array([h_range] * n + [j_range] * len(pairs))
+    bound = np.zeros((2 * (k - 1), k + 1))
+    bound[:k - 1, :k - 1] = np.eye(k - 1)
+    bound[k - 1:, :k - 1] = -np.eye(k - 1)
+    bound[:, -1] = -np.tile(ranges, 2)
+
+    A_ub = np.vstack([np.hstack([-features[~valid], np.zeros(((~valid).sum(), 1))]), bound])
+    b_ub = np.concatenate([-np.ones((~valid).sum()), np.zeros(2 * (k - 1))])
+    A_eq = np.hstack([features[valid], np.zeros((valid.sum(), 1))])
+
+    c = np.zeros(k + 1)
+    c[-1] = 1
+
+    result = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=np.zeros(valid.sum()),
+                     bounds=[(None, None)] * k + [(0, None)], method='highs')
+    if not result.success:
+        return None
+
+    x = np.where(np.abs(result.x) > 1e-9, result.x, 0)
+    return Penalty(
+        [(i, float(x[i])) for i in range(n) if x[i]],
+        [(i, j, float(x[n + t])) for t, (i, j) in enumerate(pairs) if x[n + t]],
+        float(x[k - 1]),
+    )
+
+
+@cache
+def choose(name: str, objective: str = 'size', h_range: float = H_RANGE, j_range: float = J_RANGE) -> Gate:
+    """encoding of gadget best on objective
+    size prefers fewer ancillas then fewer interactions, gap prefers larger gap after scaling to QPU range"""
+    if name not in GADGETS:
+        raise ValueError(f"unknown gadget {name}")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"unknown gadget objective {objective}")
+
+    def key(gate: Gate) -> tuple:
+        size = (gate.n_ancillas, len(gate.penalty.quadratic))
+        gap = -scaled_gap(gate.penalty, h_range, j_range)
+        return (*size, gap) if objective == 'size' else (gap, *size)
+
+    return min(GADGETS[name], key=key)
@@ -0,0 +1,136 @@
+from typing import Callable
+
+from ecc.utilities.bqm_builder import Penalty
+
+
+# penalty templates, positions follow the gate's parameter order (ancilla last)
+HALFADDER_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (2, 1), (3, 4)],
+    quadratic=[(0, 1, 2), (0, 2, -2), (0, 3, -4),
+               (1, 2, -2), (1, 3, -4), (2, 3, 4)],
+)
+
+FULLADDER_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (2, 1), (3, 1), (4, 4)],
+    quadratic=[(0, 1, 2), (0, 2, 2), (0, 3, -2), (0, 4, -4), (1, 2, 2),
+               (1, 3, -2), (1, 4, -4), (2, 3, -2), (2, 4, -4), (3, 4, 4)],
+)
+
+NOT_PENALTY = Penalty(
+    linear=[(0, -1), (1, -1)],
+    quadratic=[(0, 1, 2)],
+    offset=1,
+)
+
+AND_PENALTY = Penalty(
+    linear=[(0, 0), (1, 0), (2, 3)],
+    quadratic=[(0, 1, 1), (0, 2, -2), (1, 2, -2)],
+)
+
+OR_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (2, 1)],
+    quadratic=[(0, 1, 1), (0, 2, -2), (1, 2, -2)],
+)
+
+XOR_PENALTY = Penalty(
+    linear=[(0, 1), (1, 1), (2, 1), (3, 4)],
+    quadratic=[(0, 1, 2), (0, 2, -2), (1, 2, -2),
+               (0, 3, -4), (1, 3, -4), (3, 2, 4)],
+)
+
+# XOR_PENALTY with output flipped
+XNOR_PENALTY = Penalty(
+    linear=[(0, -1), (1, -1), (2, -1), (3, 8)],
+    quadratic=[(0, 1, 2), (0, 2, 2), (1, 2, 2),
+               (0, 3, -4), (1, 3, -4), (3, 2, -4)],
+    offset=1,
+)
+
+CTRL_SELECT_PENALTY = Penalty(
+    linear=[(0, 1), (1, 0), (2, 0), (3, 3), (4, 8)],
+    quadratic=[(0, 1, 2), (0, 2, -1), (1, 2, 1), (0, 3, -4), (1, 3, -2),
+               (2, 3, 2), (0, 4, 2), (1, 4, -4), (2, 4, -4), (3, 4, -4)],
+)
+
+
+class Gate:
+    """kind of gate, bits are ordered as inputs, outputs then ancillas
+    evaluate returns outputs and ancillas of the ground state for given inputs"""
+
+    def __init__(
+        self,
+        name: str,
+        n_inputs: int,
+        n_outputs: int,
+        n_ancillas: int,
+        evaluate: Callable[..., tuple],
+        penalty: Penalty,
+    ) -> None:
+        self.name = name
+        self.n_inputs = n_inputs
+        self.n_outputs = n_outputs
+        self.n_ancillas = n_ancillas
+        self.evaluate = evaluate
+        self.penalty = penalty
+
+    @property
+    def size(self) -> int:
+        return self.n_inputs + self.n_outputs + self.n_ancillas
+
+    def __repr__(self) -> str:
+        return f'Gate({self.name})'
+
+
+# one is the value of all ones, evaluate works on ints and on bit packed words
+HALFADDER = Gate(
+    'halfadder', 2, 2, 0,
+    lambda a, b, one=1: (a ^ b, a & b),
+    HALFADDER_PENALTY,
+)
+
+FULLADDER = Gate(
+    'fulladder', 3, 2, 0,
+    lambda a, b, c, one=1: (a ^ b ^ c, (a & b) | (c & (a ^ b))),
+    FULLADDER_PENALTY,
+)
+
+NOT = Gate(
+    'not', 1, 1, 0,
+    lambda a, one=1: (a ^ one,),
+    NOT_PENALTY,
+)
+
+AND = Gate(
+    'and', 2, 1, 0,
+    lambda a, b, one=1: (a & b,),
+    AND_PENALTY,
+)
+
+OR = Gate(
+    'or', 2, 1, 0,
+    lambda a, b, one=1: (a | b,),
+    OR_PENALTY,
+)
+
+XOR = Gate(
+    'xor', 2, 1, 1,
+    lambda a, b, one=1: (a ^ b, a & b),
+    XOR_PENALTY,
+)
+
+XNOR = Gate(
+    'xnor', 2, 1, 1,
+    lambda a, b, one=1: (a ^ b ^ one, a & b),
+    XNOR_PENALTY,
+)
+
+CTRL_SELECT = Gate(
+    'ctrl_select', 3, 1, 1,
+    lambda a, b, ctrl, one=1: (a ^ ((a ^ b) & ctrl), b & ctrl),
+    CTRL_SELECT_PENALTY,
+)
+
+GATES: dict[str, Gate] = {
+    gate.name: gate
+    for gate in (HALFADDER, FULLADDER, NOT, AND, OR, XOR, XNOR, CTRL_SELECT)
+}
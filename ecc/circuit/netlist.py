@@ -0,0 +1,150 @@
+from array import array
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+import json
+
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+
+from ecc.circuit.gates import Gate, GATES
+from ecc.utilities.bqm_builder import BQMBuilder, Penalty
+
+
+GateRecord = tuple[Gate, tuple[int, ...]]
+# position(number of gates before it), function, input variables, output variables
+HintRecord = tuple[int, Callable[..., tuple[int, ...]], list[list[int]], list[list[int]]]
+
+
+class Netlist:
+    """gates stored as array columns, kind and start position per gate and bits of every gate on a flat array
+    bits of a gate are ordered as inputs, outputs then ancillas
+    hints compute values of free variables(ex. quotient of modulo) from other variables, used for simulation"""
+
+    def __init__(self, records: Iterable[GateRecord] = ()) -> None:
+        self.kinds: list[Gate] = []
+        self._codes: dict[Gate, int] = {}
+
+        self.codes = array('B')
+        self.starts = array('q')
+        self.bits = array('q')
+
+        self.hints: list[HintRecord] = []
+
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[GateRecord]:
+        bits = self.bits
+        for code, start in zip(self.codes, self.starts):
+            gate = self.kinds[code]
+            yield gate, tuple(bits[start:start + gate.size])
+
+    def __getitem__(self, i: int) -> GateRecord:
+        gate = self.kinds[self.codes[i]]
+        start = self.starts[i]
+        return gate, tuple(self.bits[start:start + gate.size])
+
+    def _get_code(self, gate: Gate) -> int:
+        if (code := self._codes.get(gate)) is None:
+            code = len(self.kinds)
+            self.kinds.append(gate)
+            self._codes[gate] = code
+
+        return code
+
+    def append(self, gate: Gate, bits: Sequence[int]) -> None:
+        if len(bits) != gate.size:
+            raise ValueError(f"{gate.name} gate needs {gate.size} bits")
+
+        self.codes.append(self._get_code(gate))
+        self.starts.append(len(self.bits))
+        self.bits.extend(bits)
+
+    def extend(self, records: Iterable[GateRecord]) -> None:
+        for gate, bits in records:
+            self.append(gate, bits)
+
+    def add_hint(
+        self, fn: Callable[..., tuple[int, ...]], inputs: list[list[int]], outputs: list[list[int]]
+    ) -> None:
+        """fn is called with value of inputs and outputs(None if not known) as int
+        and returns value of outputs, applied before gates added after it"""
+        self.hints.append((len(self), fn, inputs, outputs))
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def count(self) -> dict[str, int]:
+        """number of gates for each kind"""
+        counts = np.bincount(np.frombuffer(self.codes, dtype=np.uint8),
+                             minlength=len(self.kinds))
+        return {gate.name: int(n) for gate, n in zip(self.kinds, counts) if n}
+
+    def group(self) -> Iterator[tuple[Gate, np.ndarray]]:
+        """bits of every gate grouped by kind, as (number of gates, gate size) array"""
+        codes = np.frombuffer(self.codes, dtype=np.uint8)
+        starts = np.frombuffer(self.starts, dtype=np.int64)
+        bits = np.frombuffer(self.bits, dtype=np.int64)
+
+        for code, gate in enumerate(self.kinds):
+            gate_starts = starts[codes == code]
+            if not len(gate_starts):
+                continue
+
+            yield gate, bits[gate_starts[:, None] + np.arange(gate.size)]
+
+    def lower(self, builder: BQMBuilder, penalties: Optional[dict[str, Penalty]] = None) -> None:
+        """add penalty of every gate to builder, penalties replaces the gate's penalty by name"""
+        for gate, rows in self.group():
+            penalty = gate.penalty
+            if penalties and gate.name in penalties:
+                penalty = penalties[gate.name]
+
+            n = len(rows)
+            builder.add_arrays(
+                rows[:, penalty.linear_index].ravel(),
+                np.tile(penalty.linear_biases, n),
+                rows[:, penalty.quadratic_u_index].ravel(),
+                rows[:, penalty.quadratic_v_index].ravel(),
+                np.tile(penalty.quadratic_biases, n),
+                n * penalty.offset,
+            )
+
+    def compile(
+        self, names: Optional[np.ndarray] = None, penalties: Optional[dict[str, Penalty]] = None
+    ) -> BinaryQuadraticModel:
+        """create BinaryQuadraticModel of the netlist, names maps each bit to it's name"""
+        builder = BQMBuilder()
+        self.lower(builder, penalties)
+
+        return builder.build(names)
+
+    def save(self, file) -> None:
+        """save as npz file, gate kinds are stored by name, hints are not saved"""
+        np.savez(
+            file,
+            kinds=np.array(json.dumps([gate.name for gate in self.kinds])),
+            codes=np.frombuffer(self.codes, dtype=np.uint8),
+            starts=np.frombuffer(self.starts, dtype=np.int64),
+            bits=np.frombuffer(self.bits, dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, file, gates: Optional[dict[str, Gate]] = None) -> 'Netlist':
+        """load netlist saved by save, gates maps stored names to gate kinds"""
+        # gadgets are imported here, they use scaling which needs this module
+        from ecc.circuit.gadgets import ALL_GATES
+
+        gates = ALL_GATES if gates is None else gates
+
+        with np.load(file) as data:
+            netlist = cls()
+            for name in json.loads(str(data['kinds'])):
+                netlist._get_code(gates[name])
+
+            netlist.codes.frombytes(data['codes'].astype(np.uint8).tobytes())
+            netlist.starts.frombytes(data['starts'].astype(np.int64).tobytes())
+            netlist.bits.frombytes(data['bits'].astype(np.int64).tobytes())
+
+        return netlist
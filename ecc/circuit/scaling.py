@@ -0,0 +1,135 @@
+from typing import Optional
+
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+from scipy.optimize import linprog
+
+from ecc.circuit.netlist import Netlist
+from ecc.utilities.bqm_builder import Penalty
+
+
+# range of biases on the QPU, auto_scale divides the bqm until it fits on these
+H_RANGE = 4.0
+J_RANGE = 1.0
+
+
+def analyze(
+    bqm: BinaryQuadraticModel, min_gap: float = 1, h_range: float = H_RANGE, j_range: float = J_RANGE
+) -> dict[str, float]:
+    """bias range of bqm and gap left after it is scaled to h_range, j_range
+    min_gap is the smallest energy difference between valid and invalid states before scaling
+    ratio is largest bias relative to the QPU range divided by min_gap, smaller is better"""
+    linear = np.abs(np.fromiter(bqm.linear.values(), dtype=np.float64,
+                                count=bqm.num_variables))
+    quadratic = np.abs(np.fromiter(bqm.quadratic.values(), dtype=np.float64,
+                                   count=bqm.num_interactions))
+    biases = np.concatenate([linear, quadratic])
+    nonzero = biases[biases > 0]
+
+    max_linear = float(linear.max()) if len(linear) else 0.0
+    max_quadratic = float(quadratic.max()) if len(quadratic) else 0.0
+    scale = max(max_linear / h_range, max_quadratic / j_range)
+
+    return {
+        'max_linear': max_linear,
+        'max_quadratic': max_quadratic,
+        'min_bias': float(nonzero.min()) if len(nonzero) else 0.0,
+        'dynamic_range': float(nonzero.max() / nonzero.min()) if len(nonzero) else 0.0,
+        'min_gap': float(min_gap),
+        'ratio': scale / min_gap if min_gap else np.inf,
+        'scaled_gap': min_gap / scale if scale else np.inf,
+    }
+
+
+def _loads(
+    netlist: Netlist, names: np.ndarray, penalties: dict[str, Penalty]
+) -> tuple[list[Penalty], list[str], np.ndarray, np.ndarray]:
+    """sum of biases each kind of gate puts on every variable and interaction
+    returns penalties and names of kinds, (number of variables, kinds) and (number of interactions, kinds) loads"""
+    used, kinds, linear, quadratic = [], [], [], []
+
+    for gate, rows in netlist.group():
+        penalty = penalties.get(gate.name, gate.penalty)
+        rows = names[rows]
+
+        used.append(penalty)
+        kinds.append(gate.name)
+        linear.append((rows[:, penalty.linear_index].ravel(),
+                       np.tile(penalty.linear_biases, len(rows))))
+
+        u = rows[:, penalty.quadratic_u_index].ravel()
+        v = rows[:, penalty.quadratic_v_index].ravel()
+        quadratic.append((np.minimum(u, v), np.maximum(u, v),
+                          np.tile(penalty.quadratic_biases, len(rows))))
+
+    n = int(names.max()) + 1 if len(names) else 0
+    linear_load = np.zeros((n, len(kinds)))
+    for k, (index, biases) in enumerate(linear):
+        np.add.at(linear_load[:, k], index, biases)
+
+    # interactions are numbered by unique (u, v) pairs
+    pairs = np.concatenate([u * n + v for u, v, _ in quadratic]) if kinds else np.empty(0, dtype=np.int64)
+    edges, inverse = np.unique(pairs, return_inverse=True)
+    quadratic_load = np.zeros((len(edges), len(kinds)))
+
+    start = 0
+    for k, (u, v, biases) in enumerate(quadratic):
+        np.add.at(quadratic_load[:, k], inverse[start:start + len(u)], biases)
+        start += len(u)
+
+    # self loops(merged bits) act on linear bias
+    loops = (edges // n) == (edges % n) if n else np.zeros(0, dtype=bool)
+    np.add.at(linear_load, edges[loops] // n, quadratic_load[loops])
+
+    return used, kinds, linear_load, quadratic_load[~loops]
+
+
+def balance_penalties(
+    netlist: Netlist,
+    names: Optional[np.ndarray] = None,
+    penalties: Optional[dict[str, Penalty]] = None,
+    h_range: float = H_RANGE,
+    j_range: float = J_RANGE,
+) -> dict[str, float]:
+    """multiplier for penalty of each gate kind that maximizes smallest gap after scaling to QPU range
+    every bias is linear on multipliers so it is solved as linear program, smallest multiplier is 1
+    names maps bits to names, penalties replaces penalty of gates by name"""
+    if names is None:
+        names = np.arange(max(netlist.bits, default=-1) + 1, dtype=np.int64)
+
+    used, kinds, linear_load, quadratic_load = _loads(netlist, names, penalties or {})
+    if not kinds:
+        return {}
+
+    gaps = np.array([penalty.gap for penalty in used])
+    k = len(kinds)
+
+    # variables are multipliers and t, maximize t where t <= multiplier * gap of every kind
+    # -1 <= bias / range <= 1
+    loads = np.concatenate([linear_load / h_range, quadratic_load / j_range])
+    loads = np.unique(np.concatenate([loads, -loads]), axis=0)
+    A_ub = np.block([
+        [loads, np.zeros((len(loads), 1))],
+        [-np.diag(gaps), np.ones((k, 1))],
+    ])
+    b_ub = np.concatenate([np.ones(len(loads)), np.zeros(k)])
+    c = np.zeros(k + 1)
+    c[-1] = -1
+
+    result = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=[(0, None)] * (k + 1), method='highs')
+    if not result.success:
+        raise ValueError(f"penalties could not be balanced: {result.message}")
+
+    multipliers = result.x[:k]
+    multipliers = multipliers / multipliers.min()
+
+    return dict(zip(kinds, multipliers.tolist()))
+
+
+def scaled_penalties(
+    netlist: Netlist, multipliers: dict[str, float], penalties: Optional[dict[str, Penalty]] = None
+) -> dict[str, Penalty]:
+    """penalties of netlist's gate kinds multiplied, can be given to Netlist.lower or GateController.penalties"""
+    penalties = penalties or {}
+    return {gate.name: penalties.get(gate.name, gate.penalty).scale(multipliers[gate.name])
+            for gate in netlist.kinds if gate.name in multipliers}
@@ -0,0 +1,256 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from ecc.circuit.netlist import Netlist
+from ecc.types import Name
+
+
+WORD_BITS = 64
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def pack_lanes(values: Sequence[int], length: int, n_words: int) -> np.ndarray:
+    """pack one int per lane into (length, n_words) uint64 array, bit i of lane j is bit j of row i"""
+    n_bytes = (length + 7) // 8
+    data = b''.join((v % (1 << length)).to_bytes(n_bytes, 'little')
+                    for v in values)
+
+    bits = np.zeros((n_words * WORD_BITS, n_bytes * 8), dtype=np.uint8)
+    bits[:len(values)] = np.unpackbits(
+        np.frombuffer(data, dtype=np.uint8).reshape(len(values), n_bytes),
+        axis=1, bitorder='little')
+
+    packed = np.packbits(bits[:, :length].T, axis=1, bitorder='little')
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def unpack_lanes(words: np.ndarray, n_lanes: int) -> list[int]:
+    """inverse of pack_lanes, returns one int per lane"""
+    bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8),
+                         axis=1, bitorder='little')[:, :n_lanes]
+    packed = np.packbits(bits, axis=0, bitorder='little').T
+
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+class Simulation:
+    """values of every name for each lane(test vector), names that could not be evaluated are not valued"""
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        valued: np.ndarray,
+        violated: np.ndarray,
+        n_lanes: int,
+        names: np.ndarray,
+        unresolved: int,
+    ) -> None:
+        self.values = values
+        self.valued = valued
+        self.violated = violated
+        self.n_lanes = n_lanes
+        self.names = names
+        self.unresolved = unresolved
+
+    @property
+    def valid(self) -> np.ndarray:
+        """true for lanes where every gate is satisfied(zero energy)"""
+        return self._lane_bits(self.violated) == 0
+
+    def _lane_bits(self, words: np.ndarray) -> np.ndarray:
+        bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8),
+                             bitorder='little')
+        return bits[:self.n_lanes]
+
+    def _name(self, bit: int) -> Name:
+        name = int(self.names[bit])
+        if not self.valued[name]:
+            raise ValueError(f"value of bit {bit} was not found")
+
+        return name
+
+    def get_bit(self, bit: int) -> np.ndarray:
+        """value of bit for each lane"""
+        return self._lane_bits(self.values[self._name(bit)])
+
+    def get_variable(self, var: Sequence[int]) -> list[int]:
+        """value of variable as int for each lane"""
+        rows = [self._name(bit) for bit in var]
+        return unpack_lanes(self.values[rows], self.n_lanes)
+
+    def samples(self, names: Sequence[Name]) -> np.ndarray:
+        """value of given names on every lane as (number of lanes, number of names) array, names without value are 0"""
+        rows = np.asarray(names, dtype=np.int64)
+        words = np.where(self.valued[rows, None], self.values[rows], np.uint64(0))
+
+        bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8),
+                             axis=1, bitorder='little')[:, :self.n_lanes]
+        return bits.T.astype(np.int8)
+
+    def sample(self, lane: int = 0) -> dict[Name, int]:
+        """assignment of every valued name on given lane, can be used as initial state of samplers"""
+        word, shift = divmod(lane, WORD_BITS)
+        column = (self.values[:, word] >> np.uint64(shift)) & np.uint64(1)
+
+        valued = np.flatnonzero(self.valued)
+        return dict(zip(valued.tolist(), column[valued].astype(int).tolist()))
+
+
+def _schedule(netlist: Netlist, rows: list[tuple[Name, ...]], hint_rows: list, level: list[int]):
+    """assign level to every gate and hint, item can be evaluated when every input has a lower level
+    returns levels of gates/hints, which outputs they assign and number of gates that can't be evaluated"""
+    n_gates = len(netlist)
+    gate_level = [-1] * n_gates
+    gate_assign: list[Optional[tuple[bool, ...]]] = [None] * n_gates
+    hint_level = [-1] * len(hint_rows)
+    hint_assign: list[Optional[list[bool]]] = [None] * len(hint_rows)
+    n_inputs = [netlist.kinds[code].n_inputs for code in netlist.codes]
+
+    # hints are placed before the gate at their position
+    order: list[tuple[bool, int]] = []
+    hint_index = 0
+    for i in range(n_gates + 1):
+        while hint_index < len(hint_rows) and hint_rows[hint_index][0] <= i:
+            order.append((True, hint_index))
+            hint_index += 1
+
+        if i < n_gates:
+            order.append((False, i))
+
+    pending = order
+    while pending:
+        deferred = []
+
+        for is_hint, i in pending:
+            if is_hint:
+                _, inputs, outputs = hint_rows[i]
+                ins = [n for var in inputs for n in var]
+                outs = [n for var in outputs for n in var]
+            else:
+                names = rows[i]
+                ins, outs = names[:n_inputs[i]], names[n_inputs[i]:]
+
+            if any(level[n] < 0 for n in ins):
+                deferred.append((is_hint, i))
+                continue
+
+            current = max([0, *(level[n] for n in ins),
+                           *(level[n] for n in outs if level[n] >= 0)]) + 1
+
+            assign = []
+            for n in outs:
+                assign.append(level[n] < 0)
+                if level[n] < 0:
+                    level[n] = current
+
+            if is_hint:
+                hint_level[i], hint_assign[i] = current, assign
+            else:
+                gate_level[i], gate_assign[i] = current, tuple(assign)
+
+        if len(deferred) == len(pending):
+            break
+        pending = deferred
+
+    unresolved = sum(1 for is_hint, _ in pending if not is_hint)
+    return gate_level, gate_assign, hint_level, hint_assign, unresolved
+
+
+def simulate(
+    netlist: Netlist,
+    names: np.ndarray,
+    inputs: dict[Name, np.ndarray],
+    n_lanes: int,
+) -> Simulation:
+    """evaluate netlist for many inputs at once, 64 lanes are packed on each uint64 word
+    names maps bits to names, inputs maps names to (n_words,) uint64 array of the name's value on each lane"""
+    n_words = max(1, (n_lanes + WORD_BITS - 1) // WORD_BITS)
+    n_names = len(names)
+
+    values = np.zeros((n_names, n_words), dtype=np.uint64)
+    level = [-1] * n_names
+    for name, words in inputs.items():
+        values[name] = words
+        level[name] = 0
+
+    bits = np.frombuffer(netlist.bits, dtype=np.int64)
+    starts = np.frombuffer(netlist.starts, dtype=np.int64)
+    codes = np.frombuffer(netlist.codes, dtype=np.uint8)
+    sizes = np.array([gate.size for gate in netlist.kinds], dtype=np.int64)
+
+    named = names[bits].tolist()
+    rows = [tuple(named[s:s + n]) for s, n in
+            zip(starts.tolist(), sizes[codes].tolist())] if len(netlist) else []
+    hint_rows = [(position, [names[var].tolist() for var in inputs_],
+                  [names[var].tolist() for var in outputs])
+                 for position, _, inputs_, outputs in netlist.hints]
+
+    gate_level, gate_assign, hint_level, hint_assign, unresolved = _schedule(
+        netlist, rows, hint_rows, level)
+
+    # group gates by level and kind, every group is evaluated at once
+    groups: dict[tuple[int, int, tuple], list[int]] = {}
+    for i, (current, assign) in enumerate(zip(gate_level, gate_assign)):
+        if current >= 0:
+            groups.setdefault((current, int(codes[i]), assign), []).append(i)
+
+    hints_by_level: dict[int, list[int]] = {}
+    for i, current in enumerate(hint_level):
+        if current >= 0:
+            hints_by_level.setdefault(current, []).append(i)
+
+    violated = np.zeros(n_words, dtype=np.uint64)
+    levels = sorted({key[0] for key in groups} | set(hints_by_level))
+
+    group_keys = sorted(groups, key=lambda key: key[0])
+    g = 0
+    for current in levels:
+        for i in hints_by_level.get(current, []):
+            _, fn, _, _ = netlist.hints[i]
+            _, inputs_, outputs = hint_rows[i]
+
+            in_values = [unpack_lanes(values[var], n_lanes) for var in inputs_]
+
+            assign = hint_assign[i]
+            out_known, k = [], 0
+            for var in outputs:
+                known = not any(assign[k:k + len(var)])
+                out_known.append(unpack_lanes(values[var], n_lanes)
+                                 if known else [None] * n_lanes)
+                k += len(var)
+
+            results = [fn(*args) for args in
+                       zip(*in_values, *out_known)]
+
+            k = 0
+            for j, var in enumerate(outputs):
+                packed = pack_lanes([r[j] for r in results], len(var), n_words)
+                for b, name in enumerate(var):
+                    if assign[k + b]:
+                        values[name] = packed[b]
+                k += len(var)
+
+        while g < len(group_keys) and group_keys[g][0] == current:
+            _, code, assign = key = group_keys[g]
+            g += 1
+
+            gate = netlist.kinds[code]
+            gate_rows = np.array([rows[i] for i in groups[key]], dtype=np.int64)
+
+            results = gate.evaluate(
+                *(values[gate_rows[:, j]] for j in range(gate.n_inputs)), one=ONES)
+
+            for j, result in enumerate(results):
+                out = gate_rows[:, gate.n_inputs + j]
+                if assign[j]:
+                    values[out] = result
+                else:
+                    violated |= np.bitwise_or.reduce(
+                        values[out] ^ result, axis=0)
+
+    valued = np.array([current >= 0 for current in level], dtype=bool)
+    if n_lanes % WORD_BITS:
+        violated[-1] &= np.uint64((1 << (n_lanes % WORD_BITS)) - 1)
+
+    return Simulation(values, valued, violated, n_lanes, names, unresolved)
@@ -2,5 +2,5 @@ from .base_controller import BaseController
 from .bit_controller import BitController
 from .gate_controller import GateController
 from .arithmetic_controller import ArithmeticController
-from .modulo_controller import ModuloController
+from .modulo_controller import ModuloController, LazyValue
 from .ecc_controller import EccController
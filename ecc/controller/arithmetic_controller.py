@@ -1,25 +1,53 @@
 
 from typing import Optional
+import math
 
 from ecc.controller.gate_controller import GateController
 from ecc.types import Bit, Binary, Name, Variable, Constant
+from ecc.utilities.number_to_binary import binary_to_number
+
+
+ADD_STRATEGIES = ('ripple', 'kogge_stone', 'brent_kung', 'carry_select')
+MULTIPLY_STRATEGIES = ('array', 'wallace', 'dadda', 'karatsuba')
+SQUARE_STRATEGIES = ('array', 'symmetric')
 
 
 class ArithmeticController(GateController):
-    def __init__(self) -> None:
-        super().__init__()
+    # operands shorter than this are multiplied with dadda tree instead of splitting again
+    KARATSUBA_THRESHOLD = 16
+
+    def __init__(self, buffered: bool = False, record: bool = False) -> None:
+        # strategy used when it is not given on each call
+        self.add_strategy = 'ripple'
+        self.multiply_strategy = 'array'
+        self.square_strategy = 'array'
 
-    def add(self, a: Variable, b: Variable, c: Variable) -> None:
-        """c = a + b"""
+        super().__init__(buffered, record)
+
+    def add(self, a: Variable, b: Variable, c: Variable, strategy: Optional[str] = None) -> None:
+        """c = a + b
+        strategy is one of ripple, kogge_stone, brent_kung, carry_select, add_strategy is used if not given"""
         if not len(c) == max(len(a), len(b)) + 1:
             raise ValueError("C length is too short")
 
+        strategy = strategy or self.add_strategy
+        if strategy not in ADD_STRATEGIES:
+            raise ValueError(f"unknown add strategy {strategy}")
+
         if len(a) < len(b):
             # swap so var1 is longer than var2
             temp = a
             a = b
             b = temp
 
+        if strategy == 'carry_select':
+            self._add_carry_select(a, b, c)
+            return
+
+        if strategy != 'ripple':
+            self._add_prefix(a, b, c, strategy == 'kogge_stone')
+            return
+
         carry: Bit = self.get_bit()
         self.halfadder_gate(a[0], b[0], c[0], carry)
 
@@ -39,6 +67,180 @@ class ArithmeticController(GateController):
 
         self.merge_bit(c[-1], carry)
 
+    def _add_prefix(self, a: Variable, b: Variable, c: Variable, kogge_stone: bool = True) -> None:
+        """c = a + b, carries are calculated by parallel prefix(kogge stone or brent kung) of generate, propagate
+        a should not be shorter than b"""
+        n = len(a)
+
+        # generate, propagate of every group ending on i, None generate is zero
+        generate: list[Optional[Bit]] = [None] * n
+        propagate: list[Bit] = list(a)
+        low = list(range(n))
+
+        for i in range(len(b)):
+            propagate[i], generate[i] = self.get_bit(2)
+            self.halfadder_gate(a[i], b[i], propagate[i], generate[i])
+
+        bit_propagate = list(propagate)
+
+        def combine(i: int, j: int) -> None:
+            """group i is extended by group j right below it"""
+            g, p = generate[i], propagate[i]
+
+            if generate[j] is not None:
+                t = self.get_bit()
+                self.and_gate(p, generate[j], t)
+
+                if g is None:
+                    g = t
+                else:
+                    g = self.get_bit()
+                    self.or_gate(generate[i], t, g)
+
+            # propagate of group starting from 0 is not used
+            if low[j] > 0:
+                p = self.get_bit()
+                self.and_gate(propagate[i], propagate[j], p)
+
+            generate[i], propagate[i], low[i] = g, p, low[j]
+
+        if kogge_stone:
+            d = 1
+            while d < n:
+                for i in reversed(range(d, n)):
+                    if low[i] > 0:
+                        combine(i, i - d)
+                d *= 2
+
+        else:
+            d = 1
+            while 2 * d <= n:
+                for i in range(2 * d - 1, n, 2 * d):
+                    combine(i, i - d)
+                d *= 2
+
+            while d > 1:
+                d //= 2
+                for i in range(3 * d - 1, n, 2 * d):
+                    combine(i, i - d)
+
+        self.merge_bit(c[0], bit_propagate[0])
+        for i in range(1, n):
+            if generate[i - 1] is None:
+                self.merge_bit(c[i], bit_propagate[i])
+            else:
+                self.xor_gate(bit_propagate[i], generate[i - 1], c[i])
+
+        if generate[-1] is None:
+            self.zero_gate(c[-1])
+        else:
+            self.merge_bit(c[-1], generate[-1])
+
+    def _ripple_block(self, a: Variable, b: Variable, s: Variable, carry: Optional[Bit], carry_one: bool = False) -> Optional[Bit]:
+        """s = a + b + carry without last carry, returns last carry(None if it is zero)
+        carry is one if carry_one is set, zero if None, b can be shorter than a"""
+        for i in range(len(a)):
+            bits = [a[i]] + ([b[i]] if i < len(b) else [])
+
+            if carry_one:
+                carry_one = False
+
+                if len(bits) == 1:
+                    self.not_gate(a[i], s[i])
+                    carry = a[i]
+                else:
+                    carry = self.get_bit()
+                    self.xnor_gate(*bits, s[i])
+                    self.or_gate(*bits, carry)
+
+            elif carry is None:
+                if len(bits) == 1:
+                    self.merge_bit(s[i], a[i])
+                else:
+                    carry = self.get_bit()
+                    self.halfadder_gate(*bits, s[i], carry)
+
+            else:
+                pre_carry = carry
+                carry = self.get_bit()
+                if len(bits) == 1:
+                    self.halfadder_gate(a[i], pre_carry, s[i], carry)
+                else:
+                    self.fulladder_gate(*bits, pre_carry, s[i], carry)
+
+        return carry
+
+    def _add_carry_select(self, a: Variable, b: Variable, c: Variable) -> None:
+        """c = a + b, blocks of sqrt(length) bits are added for both carries and selected by carry of previous block
+        a should not be shorter than b"""
+        n = len(a)
+        k = math.isqrt(n - 1) + 1 if n > 1 else 1
+
+        carry = self._ripple_block(a[:k], b[:k], c[:k], None)
+
+        for start in range(k, n, k):
+            a_, b_, c_ = a[start:start + k], b[start:start + k], c[start:min(start + k, n)]
+
+            if carry is None:
+                carry = self._ripple_block(a_, b_, c_, None)
+                continue
+
+            s0, s1 = self.get_bits(len(a_), len(a_))
+            carry0 = self._ripple_block(a_, b_, s0, None)
+            carry1 = self._ripple_block(a_, b_, s1, None, carry_one=True)
+
+            self.ctrl_select_variable(s0, s1, carry, c_)
+
+            selected = self.get_bit()
+            if carry0 is None:
+                self.and_gate(carry, carry1, selected)
+            else:
+                self.ctrl_select(carry0, carry1, carry, selected)
+            carry = selected
+
+        if carry is None:
+            self.zero_gate(c[-1])
+        else:
+            self.merge_bit(c[-1], carry)
+
+    def add_multiple(self, variables: list[Variable], c: Variable) -> None:
+        """c = sum of variables, bits are accumulated by carry save adders(3:2 compressors) then added once"""
+        self._reduce_columns(_shifted_columns(*((var, 0) for var in variables)), c)
+
+    def add_and(self, a: Variable, b: Variable, ctrl: Bit, c: Variable) -> None:
+        """c = a + (b & ctrl), and of each bit is fused on full adder"""
+        if not len(c) == max(len(a), len(b)) + 1:
+            raise ValueError("C length is too short")
+
+        carry: Optional[Bit] = None
+        for i in range(len(c) - 1):
+            if i < len(a) and i < len(b) and carry is not None:
+                pre_carry = carry
+                carry = self.get_bit()
+                self.fulladder_and_gate(b[i], ctrl, a[i], pre_carry, c[i], carry)
+                continue
+
+            bits = [a[i]] if i < len(a) else []
+            if i < len(b):
+                bits.append(self.get_bit())
+                self.and_gate(b[i], ctrl, bits[-1])
+            if carry is not None:
+                bits.append(carry)
+
+            if len(bits) == 1:
+                self.merge_bit(c[i], bits[0])
+                carry = None
+                continue
+
+            carry = self.get_bit()
+            self.halfadder_gate(bits[0], bits[1], c[i], carry)
+
+        if carry is None:
+            self.zero_gate(c[-1])
+            return
+
+        self.merge_bit(c[-1], carry)
+
     def add_no_overflow(self, a: Variable, b: Variable, c: Variable) -> None:
         """c = a + b (no last carry), don't use if a+b could be larger than c's maximum value"""
 
@@ -111,6 +313,10 @@ class ArithmeticController(GateController):
         if not (len(c) == len(a) == len(b)):
             raise ValueError("A, B, C length must be same")
 
+        n = len(a)
+        self._add_hint(lambda a, b, c, u: ((a - b) % 2**n, int(a < b)),
+                       [a, b], [c, [underflow]])
+
         var_ = [*a, underflow]
 
         self.add(b, c, var_)
@@ -121,12 +327,89 @@ class ArithmeticController(GateController):
         if len(c) != len(a):
             raise ValueError("A, C length must be same")
 
+        n, B = len(a), binary_to_number(self.check_ConstantType(b))
+        self._add_hint(lambda a, c, u: ((a - B) % 2**n, int(a < B)),
+                       [a], [c, [underflow]])
+
         var_ = [*a, underflow]
 
         self.add_const(c, b, var_)
 
-    def multiply(self, a: Variable, b: Variable, c: Variable) -> None:
-        """c = a * b"""
+    def _reduce_columns(self, columns: list[list[Bit]], c: Variable, dadda: bool = True) -> None:
+        """c = sum of bits in every column weighted by 2**column
+        columns are reduced to height 2 with carry save adders(dadda or wallace tree) then added by ripple carry"""
+        columns = [list(col) for col in columns]
+        columns += [[] for _ in range(len(c) + 1 - len(columns))]
+
+        def full(i: int, bits: list[Bit], out: list[Bit]) -> None:
+            sum_, carry = self.get_bit(2)
+            self.fulladder_gate(*bits, sum_, carry)
+            out.append(sum_)
+            columns[i + 1].append(carry)
+
+        def half(i: int, bits: list[Bit], out: list[Bit]) -> None:
+            sum_, carry = self.get_bit(2)
+            self.halfadder_gate(*bits, sum_, carry)
+            out.append(sum_)
+            columns[i + 1].append(carry)
+
+        if dadda:
+            heights = [2]
+            while heights[-1] < max(len(col) for col in columns):
+                heights.append(heights[-1] * 3 // 2)
+
+            for d in reversed(heights[:-1]):
+                for i in range(len(c)):
+                    col = columns[i]
+                    while len(col) > d:
+                        if len(col) - d >= 2:
+                            full(i, [col.pop(0) for _ in range(3)], col)
+                        else:
+                            half(i, [col.pop(0) for _ in range(2)], col)
+
+        else:
+            while max(len(col) for col in columns[:len(c)]) > 2:
+                # every column is reduced at once using bits from previous stage
+                stage = [[] for _ in columns]
+                for i in range(len(c)):
+                    col = columns[i]
+                    while len(col) >= 3:
+                        full(i, col[:3], stage[i])
+                        col = col[3:]
+
+                    if len(col) == 2:
+                        half(i, col, stage[i])
+                    else:
+                        stage[i] += col
+
+                    columns[i] = []
+
+                for i in range(len(c)):
+                    columns[i] += stage[i]
+
+        carry: Optional[Bit] = None
+        for i in range(len(c)):
+            bits = columns[i] + ([] if carry is None else [carry])
+            carry = None
+
+            if not bits:
+                self.zero_gate(c[i])
+            elif len(bits) == 1:
+                self.merge_bit(c[i], bits[0])
+            else:
+                carry = self.get_bit()
+                if len(bits) == 2:
+                    self.halfadder_gate(*bits, c[i], carry)
+                else:
+                    self.fulladder_gate(*bits, c[i], carry)
+
+        # value fits on c, bits above it are zero
+        for bit in columns[len(c)] + ([] if carry is None else [carry]):
+            self.zero_gate(bit)
+
+    def multiply(self, a: Variable, b: Variable, c: Variable, strategy: Optional[str] = None) -> None:
+        """c = a * b
+        strategy is one of array, wallace, dadda, karatsuba, multiply_strategy is used if not given"""
 
         a_length = len(a)  # n
         b_length = len(b)  # n2
@@ -135,6 +418,18 @@ class ArithmeticController(GateController):
         if a_length + b_length != c_length and a_length * b_length != c_length:
             raise ValueError("C length is too short")
 
+        strategy = strategy or self.multiply_strategy
+        if strategy not in MULTIPLY_STRATEGIES:
+            raise ValueError(f"unknown multiply strategy {strategy}")
+
+        if strategy == 'karatsuba':
+            self._multiply_karatsuba(a, b, c)
+            return
+
+        if strategy != 'array':
+            self._multiply_tree(a, b, c, strategy == 'dadda')
+            return
+
         ctrl_ancilla_var = self.get_bit(a_length)
         self.ctrl_var(b[0], a, ctrl_ancilla_var)
 
@@ -142,18 +437,63 @@ class ArithmeticController(GateController):
         pre_add_ancilla_var = ctrl_ancilla_var[1:]  # n-1
 
         for i in range(1, b_length):
-            ctrl_ancilla_var = self.get_bit(a_length)  # n
-            self.ctrl_var(b[i], a, ctrl_ancilla_var)
-
             # n+1 (n+n => n+1 or n-1+n => n+1)
             add_ancilla_var = self.get_bit(a_length+1)
-            self.add(pre_add_ancilla_var, ctrl_ancilla_var, add_ancilla_var)
+
+            if self.gadget_objective == 'size':
+                # partial products are fused on full adders
+                self.add_and(pre_add_ancilla_var, a, b[i], add_ancilla_var)
+            else:
+                ctrl_ancilla_var = self.get_bit(a_length)  # n
+                self.ctrl_var(b[i], a, ctrl_ancilla_var)
+                self.add(pre_add_ancilla_var, ctrl_ancilla_var, add_ancilla_var)
 
             self.merge_bit(c[i], add_ancilla_var[0])
             pre_add_ancilla_var = add_ancilla_var[1:]  # n
 
         self.merge_variable(c[b_length:c_length], pre_add_ancilla_var)
 
+    def _multiply_tree(self, a: Variable, b: Variable, c: Variable, dadda: bool = True) -> None:
+        """c = a * b, every partial product is reduced at once with carry save adders"""
+        columns: list[list[Bit]] = [[] for _ in range(len(a) + len(b))]
+        for i in range(len(b)):
+            for j in range(len(a)):
+                product = self.get_bit()
+                self.and_gate(a[j], b[i], product)
+                columns[i + j].append(product)
+
+        self._reduce_columns(columns, c, dadda)
+
+    def _multiply_karatsuba(self, a: Variable, b: Variable, c: Variable) -> None:
+        """c = a * b, a*b = z2 * 2^2k + z1 * 2^k + z0 where z1 = (a0+a1)(b0+b1) - z0 - z2"""
+        n = len(a)
+        # sums of halves are not shorter than a below 4 bits
+        if n != len(b) or n < max(4, self.KARATSUBA_THRESHOLD):
+            self._multiply_tree(a, b, c)
+            return
+
+        k = n // 2
+        z0, z2 = self.get_bits(2 * k, 2 * (n - k))
+        self._multiply_karatsuba(a[:k], b[:k], z0)
+        self._multiply_karatsuba(a[k:], b[k:], z2)
+
+        a_sum, b_sum = self.get_bits(n - k + 1, n - k + 1)
+        self.add(a[k:], a[:k], a_sum)
+        self.add(b[k:], b[:k], b_sum)
+
+        product = self.get_bit(2 * (n - k + 1))
+        self._multiply_karatsuba(a_sum, b_sum, product)
+
+        # z1 is found from product = z0 + z1 + z2
+        z1 = self.get_bit(len(product))
+        self._add_hint(lambda p, z0, z2, z1: (p - z0 - z2,),
+                       [product, z0, z2], [z1])
+        self._reduce_columns(
+            _shifted_columns((z0, 0), (z1, 0), (z2, 0)), product)
+
+        self._reduce_columns(
+            _shifted_columns((z0, 0), (z1, k), (z2, 2 * k)), c)
+
     def multiply_const(self, a: Variable, b: Constant, c: Variable) -> None:
         """c = a * b"""
 
@@ -198,8 +538,16 @@ class ArithmeticController(GateController):
         for i in range(current, len(c)):
             self.zero_gate(c[i])
 
-    def square(self, a: Variable, c: Variable) -> None:
-        """c = a^2"""
+    def square(self, a: Variable, c: Variable, strategy: Optional[str] = None) -> None:
+        """c = a^2
+        strategy is one of array, symmetric, square_strategy is used if not given"""
+        strategy = strategy or self.square_strategy
+        if strategy not in SQUARE_STRATEGIES:
+            raise ValueError(f"unknown square strategy {strategy}")
+
+        if strategy == 'symmetric':
+            self._square_symmetric(a, c)
+            return
 
         def ctrl_skip_var(var, index, out):
             for i in range(len(var)):
@@ -234,3 +582,32 @@ class ArithmeticController(GateController):
         # (n + n2) - n2 = n
 
         self.merge_variable(c[var_length:], pre_add_ancilla_var)
+
+    def _square_symmetric(self, a: Variable, c: Variable) -> None:
+        """c = a^2, a_i*a_j and a_j*a_i are same so each pair is computed once and added on next column
+        a_i*a_i is a_i itself"""
+        if 2 * len(a) != len(c):
+            raise ValueError("C length is too short")
+
+        columns: list[list[Bit]] = [[] for _ in range(len(c))]
+        for i in range(len(a)):
+            columns[2 * i].append(a[i])
+
+            for j in range(i + 1, len(a)):
+                product = self.get_bit()
+                self.and_gate(a[i], a[j], product)
+                columns[i + j + 1].append(product)
+
+        self._reduce_columns(columns, c)
+
+
+def _shifted_columns(*shifted: tuple[Variable, int]) -> list[list[Bit]]:
+    """bits of every column for variables shifted left by given amount"""
+    columns: list[list[Bit]] = []
+    for var, shift in shifted:
+        for i, bit in enumerate(var):
+            while len(columns) <= i + shift:
+                columns.append([])
+            columns[i + shift].append(bit)
+
+    return columns
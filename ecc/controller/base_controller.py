@@ -1,20 +1,220 @@
-from dwave.system import DWaveSampler, EmbeddingComposite
+from typing import Any, Optional, Union
+
+import dimod
+import numpy as np
+from dwave.system import DWaveSampler, EmbeddingComposite, FixedEmbeddingComposite
 from dimod.binary import BinaryQuadraticModel
 from dimod.vartypes import Vartype
 from dimod import ExactSolver
 from dimod.sampleset import SampleSet
 
+from ecc.solvers import GrayCodeSolver, get_backend
+from ecc.utilities.array_file import load_arrays, save_arrays
+from ecc.utilities.bqm_arrays import BQMArrays
+from ecc.utilities.bqm_builder import BQMBuilder, Penalty
+from ecc.utilities.embedding_cache import EmbeddingCache
+
+
+Vectors = tuple[Union[list, np.ndarray], np.ndarray, tuple[np.ndarray, np.ndarray, np.ndarray], float]
+
+
+def _is_simple(value) -> bool:
+    """true if value can be stored as json without losing it's type"""
+    if isinstance(value, list):
+        return all(_is_simple(v) for v in value)
+
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+def _find_class(cls: type, name: str) -> type:
+    """cls or it's subclass named by module and qualified name"""
+    if f'{cls.__module__}.{cls.__qualname__}' == name:
+        return cls
+
+    for subclass in cls.__subclasses__():
+        try:
+            return _find_class(subclass, name)
+        except ValueError:
+            pass
+
+    raise ValueError(f"{name} is not a {cls.__name__}")
+
+
+def _relocate(bits: np.ndarray, base: int, shift: int) -> np.ndarray:
+    """bits from base moved by shift, used to place bits of a fragment after bits of controller"""
+    bits = np.asarray(bits, dtype=np.int64)
+    return np.where(bits >= base, bits + shift, bits)
+
 
 class BaseController:
-    def __init__(self) -> None:
-        self.bqm = BinaryQuadraticModel(Vartype.BINARY)
+    def __init__(self, buffered: bool = False) -> None:
+        self._bqm = BinaryQuadraticModel(Vartype.BINARY)
+        # bqm vectors of loaded controller, bqm is built from them when it is accessed
+        self._stored: Optional[Vectors] = None
+        # increased on every change of bqm, models derived from bqm are cached on it
+        self._version = 0
+
+        # when buffered, terms are collected on arrays and added to bqm when it is accessed
+        self.builder: Optional[BQMBuilder] = BQMBuilder() if buffered else None
 
         self.dwave_sampler = None
         self.embedding_sampler = None
+        self.embedding_cache: Optional[EmbeddingCache] = None
+
+    @property
+    def buffered(self) -> bool:
+        return self.builder is not None
+
+    @property
+    def bqm(self) -> BinaryQuadraticModel:
+        if self._stored is not None:
+            self._build_stored()
+
+        if self._has_pending():
+            self._flush()
+            self._version += 1
+
+        return self._bqm
+
+    @bqm.setter
+    def bqm(self, bqm: BinaryQuadraticModel) -> None:
+        self._bqm = bqm
+        self._version += 1
+
+    def _sampled_bqm(self) -> BinaryQuadraticModel:
+        """bqm given to samplers"""
+        return self.bqm
+
+    def _build_stored(self) -> None:
+        labels, linear, quadratic, offset = self._stored
+        self._stored = None
+
+        bqm = BinaryQuadraticModel.from_numpy_vectors(
+            linear, quadratic, offset, Vartype.BINARY, variable_order=labels.tolist())
+
+        # terms added directly after loading
+        bqm.update(self._bqm)
+        self._bqm = bqm
+
+    def _only_stored(self) -> bool:
+        """true if every variable of bqm is on loaded arrays, they can be used without building bqm"""
+        return self._stored is not None and not self._has_pending() and not self._bqm.num_variables
+
+    def _vectors(self) -> Vectors:
+        """(labels, linear, (row, col, biases), offset) of bqm, taken from loaded arrays if bqm is not built yet"""
+        if self._only_stored():
+            labels, linear, quadratic, offset = self._stored
+            return labels.tolist(), linear, quadratic, offset + self._bqm.offset
+
+        linear, quadratic, offset, labels = self.bqm.to_numpy_vectors(return_labels=True)
+        return list(labels), linear, quadratic, offset
+
+    def _get_state(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        """arrays and json serializable meta that is enough to restore controller with _set_state"""
+        labels, linear, (row, col, biases), offset = self._vectors()
+
+        arrays = {
+            'labels': np.asarray(labels, dtype=np.int64),
+            'linear': np.asarray(linear, dtype=np.float64),
+            'row': np.asarray(row, dtype=np.int64),
+            'col': np.asarray(col, dtype=np.int64),
+            'biases': np.asarray(biases, dtype=np.float64),
+        }
+
+        meta = self._get_meta()
+        meta['offset'] = float(offset)
+
+        return arrays, meta
+
+    def _get_meta(self) -> dict[str, Any]:
+        """json serializable class and settings of controller, stored with arrays of _get_state"""
+        # strategies and other settings, private state is stored by each class
+        attributes = {k: v for k, v in vars(self).items()
+                      if not k.startswith('_') and _is_simple(v)}
+
+        return {
+            'class': f'{type(self).__module__}.{type(self).__qualname__}',
+            'buffered': self.buffered,
+            'attributes': attributes,
+        }
+
+    def _set_state(self, arrays: dict[str, np.ndarray], meta: dict[str, Any]) -> None:
+        # settings first, so state made by __init__ is not replaced by them
+        self.__dict__.update(meta['attributes'])
+        BaseController.__init__(self, meta['buffered'])
+
+        self._stored = (arrays['labels'], arrays['linear'],
+                        (arrays['row'], arrays['col'], arrays['biases']), meta['offset'])
 
-    def get_sampler(self):
-        self.dwave_sampler = DWaveSampler()
-        print("QPU {} was selected.".format(self.dwave_sampler.solver.name))
+    def save(self, path: str) -> None:
+        """store controller on one file, bqm and state of bits are stored as numpy arrays
+        samplers and recorded netlist are not stored"""
+        save_arrays(path, *self._get_state())
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'BaseController':
+        """controller stored by save, class of stored controller is used if it is a subclass of cls
+        when mmap, arrays are memory mapped and bqm is built only when it is accessed"""
+        arrays, meta = load_arrays(path, mmap)
+
+        kind = _find_class(cls, meta['class'])
+        controller = kind.__new__(kind)
+        controller._set_state(arrays, meta)
+
+        return controller
+
+    def _get_fragment(self) -> dict[str, Any]:
+        """terms and state of buffered controller a stage is built on, added to another one by _add_fragment
+        terms are taken from builder before they are named, so bqm is not built"""
+        builder = self.builder
+        builder.add_bqm(self._bqm)
+
+        return {
+            'linear_bits': np.frombuffer(builder.linear_bits, dtype=np.int64),
+            'linear_biases': np.frombuffer(builder.linear_biases, dtype=np.float64),
+            'u': np.frombuffer(builder.quadratic_u, dtype=np.int64),
+            'v': np.frombuffer(builder.quadratic_v, dtype=np.int64),
+            'quadratic_biases': np.frombuffer(builder.quadratic_biases, dtype=np.float64),
+            'offset': builder.offset,
+        }
+
+    def _add_fragment(self, fragment: dict[str, Any], base: int, shift: int) -> None:
+        """add terms of fragment to builder, bits from base are moved by shift and bits before it are shared"""
+        self.builder.add_arrays(
+            _relocate(fragment['linear_bits'], base, shift), fragment['linear_biases'],
+            _relocate(fragment['u'], base, shift), _relocate(fragment['v'], base, shift),
+            fragment['quadratic_biases'], fragment['offset'])
+        self._version += 1
+
+    def _has_pending(self) -> bool:
+        """true if there are changes not applied to bqm yet"""
+        return bool(self.builder)
+
+    def _flush(self) -> None:
+        """build collected terms and add them to bqm"""
+        bqm = self.builder.build(self._get_name_table())
+
+        if self._bqm.num_variables == 0 and self._bqm.offset == 0:
+            self._bqm = bqm
+        else:
+            self._bqm.update(bqm)
+
+    def _get_name_table(self) -> Optional[np.ndarray]:
+        """mapping from collected bits to bqm variables, None if they are same"""
+        return None
+
+    def get_sampler(self, sampler=None, embedding_cache: Union[EmbeddingCache, str, None] = None):
+        """sampler is structured sampler used instead of DWaveSampler
+        embedding_cache is cache or directory of it, embeddings found are stored and reused on next runs"""
+        if sampler is None:
+            sampler = DWaveSampler()
+            print("QPU {} was selected.".format(sampler.solver.name))
+
+        self.dwave_sampler = sampler
+
+        if isinstance(embedding_cache, str):
+            embedding_cache = EmbeddingCache(embedding_cache)
+        self.embedding_cache = embedding_cache
 
         self.embedding_sampler = EmbeddingComposite(self.dwave_sampler)
 
@@ -22,35 +222,114 @@ class BaseController:
         if not self.embedding_sampler:
             self.get_sampler()
 
-        solution = self.embedding_sampler.sample(
-            self.bqm, num_reads=num_reads, label=label)
+        bqm = self._sampled_bqm()
+
+        sampler = self.embedding_sampler
+        if self.embedding_cache is not None:
+            embedding = self.embedding_cache.find_embedding(
+                bqm, self.dwave_sampler)
+            sampler = FixedEmbeddingComposite(self.dwave_sampler, embedding)
+
+        solution = sampler.sample(
+            bqm, num_reads=num_reads, label=label)
 
         return solution
 
+    def run(self, sampler: Union[str, dimod.Sampler] = 'sa', polish: bool = False, **params) -> SampleSet:
+        """sample bqm with sampler registered by name(see ecc.solvers.SAMPLERS) or sampler instance
+        params are passed to sampler, polish runs steepest descent from every read of the result"""
+        bqm = self._sampled_bqm()
+        if not bqm.num_variables:
+            return self._empty_sampleset()
+
+        if isinstance(sampler, str):
+            sampler = get_backend(sampler)
+
+        solution = sampler.sample(bqm, **params)
+
+        if polish:
+            solution = get_backend('steepest').sample(
+                bqm, initial_states=solution)
+
+        return solution
+
+    def _empty_sampleset(self) -> SampleSet:
+        # every variable is fixed, samplers would return an empty SampleSet
+        return SampleSet.from_samples_bqm((np.empty((1, 0), dtype=np.int8), []), self._sampled_bqm())
+
     def run_ExactSolver(self, lowest=False) -> SampleSet:
-        solver = ExactSolver()
-        solution = solver.sample(self.bqm)
+        """every state of bqm, only lowest states are found with GrayCodeSolver which doesn't keep every state on memory"""
+        bqm = self._sampled_bqm()
+        if not bqm.num_variables:
+            return self._empty_sampleset()
 
         if lowest:
-            solution = solution.lowest()
+            return GrayCodeSolver().sample(bqm)
 
-        return solution
+        solver = ExactSolver()
+        return solver.sample(bqm)
+
+    def get_arrays(self, fixed: bool = True) -> BQMArrays:
+        """bqm as numpy arrays, used for evaluating many samples at once
+        fixed gives bqm samplers get, so samples returned by run are scored with it
+        otherwise bqm of controller is used, taken from loaded arrays if it is not built"""
+        if fixed:
+            return BQMArrays.from_bqm(self._sampled_bqm())
+
+        return BQMArrays.from_vectors(*self._vectors())
 
     @property
     def shape(self) -> int:
+        if self._only_stored():
+            labels, _, (_, _, biases), _ = self._stored
+            return len(labels), len(biases)
+
         return self.bqm.shape
 
     def _fix_variable(self, bit, value):
         self.bqm.fix_variable(bit, value)
+        self._version += 1
 
     def _add_variable(self, bit, bias: int = 0) -> None:
-        self.bqm.add_variable(bit, bias)
+        self._version += 1
+        if self.builder is not None:
+            self.builder.add_variable(bit, bias)
+            return
+
+        self._bqm.add_variable(bit, bias)
 
     def _add_quadratic(self, bit1, bit2, bias: int) -> None:
-        self.bqm.add_quadratic(bit1, bit2, bias)
+        self._version += 1
+        if self.builder is not None:
+            self.builder.add_quadratic(bit1, bit2, bias)
+            return
+
+        self._bqm.add_quadratic(bit1, bit2, bias)
+
+    def _add_penalty(self, penalty: Penalty, *bits) -> None:
+        """add every term of penalty template to given bits"""
+        self._version += 1
+        if self.builder is not None:
+            self.builder.add_penalty(penalty, bits)
+            return
+
+        for i, bias in penalty.linear:
+            self._add_variable(bits[i], bias)
+
+        for i, j, bias in penalty.quadratic:
+            self._add_quadratic(bits[i], bits[j], bias)
+
+        if penalty.offset:
+            self._add_offset(penalty.offset)
 
     def _flip_variable(self, bit) -> None:
         self.bqm.flip_variable(bit)
+        self._version += 1
 
     def _add_offset(self, v: int):
-        self.bqm.offset += v
+        self._version += 1
+        if self.builder is not None:
+            self.builder.add_offset(v)
+            return
+
+        self._bqm.offset += v
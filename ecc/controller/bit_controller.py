@@ -1,25 +1,82 @@
-from typing import Union, Optional
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Iterable, Iterator, Union, Optional
 import warnings
 
+import dimod
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
 from dimod.sampleset import SampleView
 from dimod.sampleset import SampleSet
 
 
 from ecc.types import Constant, Variable, Bit, Name, Binary
-from ecc.controller.base_controller import BaseController
+from ecc.controller.base_controller import BaseController, _relocate
+from ecc.solvers import DecompositionSolver
+from ecc.utilities.bqm_arrays import BQMArrays
+from ecc.utilities.bqm_builder import BQMBuilder
+from ecc.utilities.bqm_template import BQMTemplate
 from ecc.utilities.number_to_binary import number_to_binary
 
 
+def _build_stage(controller: 'BitController', method: str, args: tuple) -> dict[str, Any]:
+    """build one stage on blank controller, run on worker process"""
+    getattr(controller, method)(*args)
+    return controller._get_fragment()
+
+
+class _BlankBits(dict):
+    """parent or size of every bit of blank controller, bits before base keep default until they are merged
+    so bits of controller are not copied to every stage"""
+
+    def __init__(self, base: int, default: Optional[int] = None) -> None:
+        super().__init__()
+        self.base = base
+        self.length = base
+        # value of bits before base, bit itself if None
+        self.default = default
+
+    def __missing__(self, bit: Bit) -> int:
+        return bit if self.default is None else self.default
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, value: int) -> None:
+        self[self.length] = value
+        self.length += 1
+
+    def changed(self) -> list[Bit]:
+        """bits before base that are stored"""
+        return [bit for bit in self.keys() if bit < self.base]
+
+
 class BitController(BaseController):
-    def __init__(self) -> None:
+    def __init__(self, buffered: bool = False) -> None:
         self.bit_cnt = 0
-        self.bit_to_name: dict[Bit, Name] = {}
-        self.name_to_bit: dict[Name, list[Bit]] = {}
+
+        # disjoint set of bits, root of each set is used as name
+        self._parent: list[Bit] = []
+        self._size: list[int] = []
+        # merged since bqm was last built, already added terms needs to be renamed
+        self._merged = False
 
         self.constants: dict[Bit, Binary] = {}
         self.constants_from_name: dict[Name, Binary] = {}
+        # increased when constants or names change, results derived from them are cached on it
+        self._constants_version = 0
+        # range of bits created in each stage, used to split bqm into subproblems
+        self.stages: list[range] = []
 
-        super().__init__()
+        # bqm with constants fixed and version of bqm it was made from
+        self._fixed: Optional[BinaryQuadraticModel] = None
+        self._fixed_version = -1
+        # name of every name on fixed bqm when it is reduced further, None if names are same
+        self._fixed_names: Optional[np.ndarray] = None
+
+        super().__init__(buffered)
 
     def check_ConstantType(self, constant: Constant, length=None) -> list[Binary]:
         """returns list of ints for given constant"""
@@ -44,8 +101,8 @@ class BitController(BaseController):
             bit = self.bit_cnt
             self.bit_cnt += 1
 
-            self.bit_to_name[bit] = bit
-            self.name_to_bit[bit] = [bit]
+            self._parent.append(bit)
+            self._size.append(1)
 
         else:
             bit: Variable = [self.get_bit() for _ in range(num)]
@@ -66,11 +123,42 @@ class BitController(BaseController):
         if isinstance(bit, list):
             n = self.get_names(*bit)
 
-        elif (n := self.bit_to_name[bit]) == None:
+        elif not 0 <= bit < self.bit_cnt:
             raise ValueError('bit name not found')
 
+        else:
+            n = self._find(bit)
+
         return n
 
+    def _find(self, bit: Bit) -> Name:
+        parent = self._parent
+
+        root = bit
+        while parent[root] != root:
+            root = parent[root]
+
+        # path compression
+        while parent[bit] != root:
+            parent[bit], bit = root, parent[bit]
+
+        return root
+
+    @property
+    def bit_to_name(self) -> dict[Bit, Name]:
+        """mapping from every bit to it's name"""
+        names = self._get_name_table()
+        return dict(enumerate(names.tolist()))
+
+    @property
+    def name_to_bit(self) -> dict[Name, list[Bit]]:
+        """mapping from every name to bits merged into it"""
+        r: dict[Name, list[Bit]] = {}
+        for bit, name in self.bit_to_name.items():
+            r.setdefault(name, []).append(bit)
+
+        return r
+
     def get_names(self, *args: Union[Variable, Bit]) -> list[Union[list[Name], Name]]:
         """returns name of given bits, if one bit is given this will return a single int"""
         r = []
@@ -87,13 +175,39 @@ class BitController(BaseController):
 
         return c
 
-    def _extract_bit(self, sample: SampleView, bit: Bit) -> Optional[Binary]:
+    def _sampled_name(self, bit: Bit) -> Name:
+        """name of bit on fixed_bqm"""
         name = self.get_name(bit)
 
+        self._set_constant()
+        if self._fixed_names is not None and name < len(self._fixed_names):
+            name = int(self._fixed_names[name])
+
+        return name
+
+    def _sampled_name_table(self) -> np.ndarray:
+        """name on fixed_bqm of every bit"""
+        names = self._get_name_table()
+
+        self._set_constant()
+        if self._fixed_names is None:
+            return names
+
+        # bits created after fixed bqm was made are not renamed
+        renamed = np.arange(self.bit_cnt, dtype=np.int64)
+        renamed[:len(self._fixed_names)] = self._fixed_names
+        return renamed[names]
+
+    def _extract_bit(self, sample: SampleView, bit: Bit) -> Optional[Binary]:
+        name = self._sampled_name(bit)
+
         try:
-            # SampleView raises ValueError when using get
+            # SampleView raises ValueError when using get on some versions, others return None
             result = sample.get(name)
         except ValueError:
+            result = None
+
+        if result is None:
             return self.get_constant_from_name(name)
 
         return result
@@ -132,6 +246,43 @@ class BitController(BaseController):
 
         return result
 
+    def extract_batch(self, sampleset: SampleSet, *args: Union[Bit, Variable]) -> list[np.ndarray]:
+        """returns value of given bits/variables for every read of sampleset at once
+        bit gives array of binary, variable gives array of ints(uint64 if it fits, else python ints)
+        bits not present in sampleset are taken from constants"""
+        names = self._sampled_name_table()
+
+        # column of every name in sampleset, -1 if name is not a variable of sampleset
+        labels = np.fromiter(sampleset.variables, dtype=np.int64,
+                             count=len(sampleset.variables))
+        columns = np.full(self.bit_cnt, -1, dtype=np.int64)
+        columns[labels] = np.arange(len(labels))
+
+        known = np.zeros(self.bit_cnt, dtype=bool)
+        fill = np.zeros(self.bit_cnt, dtype=np.uint8)
+        for name, value in self.constants_from_name.items():
+            known[name] = True
+            fill[name] = value
+
+        samples = sampleset.record.sample
+
+        result = []
+        for b in args:
+            bits = names[np.atleast_1d(np.asarray(b, dtype=np.int64))]
+
+            missing = (columns[bits] < 0) & ~known[bits]
+            if missing.any():
+                raise ValueError(
+                    f"value of {np.atleast_1d(b)[missing].tolist()} was not found")
+
+            r = BQMArrays.decode(samples, columns[bits], fill[bits])
+            if isinstance(b, Bit):
+                r = r.astype(np.int8)
+
+            result.append(r)
+
+        return result
+
     def check_Sample(self, sample: SampleView):
         if not isinstance(sample, SampleView):
             return sample.sample
@@ -141,6 +292,8 @@ class BitController(BaseController):
     def set_bit_constant(self, bit: Bit, value: Binary) -> None:
         """temporarily stores bit value on constants dictionary, will be applied before running solver"""
         self.constants[bit] = value
+        self._version += 1
+        self._constants_version += 1
 
     def set_variable_constant(self, var: Variable, const: Constant) -> None:
         const = self.check_ConstantType(const, len(var))
@@ -148,27 +301,185 @@ class BitController(BaseController):
         for i in range(len(var)):
             self.set_bit_constant(var[i], const[i])
 
-    def merge_bit(self, bit1: Bit, bit2: Bit) -> None:
-        """merge bit2 to bit1"""
-        bit1_name, bit2_name = self.get_names(bit1, bit2)
-
-        bit2_list = self.name_to_bit[bit2_name]
-        for bit in bit2_list:
-            self.bit_to_name[bit] = bit1_name
+    def template(self, *inputs: Union[Bit, Variable]) -> BQMTemplate:
+        """bqm compiled once so inputs can be bound to many constants without changing bqm
+        constants already set are fixed on every binding, inputs must not be constant"""
+        arrays = self.get_arrays(fixed=False)
+        names = self._get_name_table()
+
+        constants = {}
+        for bit, value in self.constants.items():
+            constants.setdefault(int(names[bit]), value)
+
+        inputs = [names[np.atleast_1d(np.asarray(var, dtype=np.int64))].tolist() for var in inputs]
+
+        return BQMTemplate(arrays, inputs, constants)
+
+    @contextmanager
+    def stage(self) -> Iterator[None]:
+        """bits created in this block are recorded as one stage"""
+        start = self.bit_cnt
+        yield
+        self.stages.append(range(start, self.bit_cnt))
+
+    def build_stages(self, method: str, calls: Iterable[tuple], processes: int = 1) -> None:
+        """call method with every args of calls, each call as one stage
+        when processes > 1, stages are built on blank copies of controller at once on a process pool
+        and added in order with their bits moved after bits of controller, so args must use only bits created before"""
+        if processes <= 1:
+            for args in calls:
+                with self.stage():
+                    getattr(self, method)(*args)
+            return
 
-        self.name_to_bit[bit1_name] += bit2_list
-        self.name_to_bit[bit2_name] = []
+        # terms of stages are collected and added to bqm at once, like on buffered controller
+        buffered = self.buffered
+        if not buffered:
+            self.builder = BQMBuilder()
 
+        calls = iter(calls)
+        executor: Executor = ProcessPoolExecutor(processes)
         try:
-            linear = self.bqm.get_linear(bit2_name)
-        except ValueError:
+            # few stages are sent at once, so only those are kept on memory
+            while batch := list(islice(calls, 2 * processes)):
+                base = self.bit_cnt
+                blanks = [self._blank() for _ in batch]
+
+                for fragment in executor.map(_build_stage, blanks, [method] * len(batch), batch):
+                    start = self.bit_cnt
+                    self._add_fragment(fragment, base, start - base)
+                    self.stages.append(range(start, self.bit_cnt))
+        finally:
+            executor.shutdown()
+
+            if not buffered:
+                builder, self.builder = self.builder, None
+                builder.add_bqm(self._bqm)
+
+                self._bqm = builder.build(self._get_name_table())
+                # stored terms of loaded controller are renamed when they are built
+                if self._stored is None:
+                    self._merged = False
+
+    def _blank(self) -> 'BitController':
+        """buffered controller with settings and bits of this one without any term, merge or constant"""
+        kind = type(self)
+        controller = kind.__new__(kind)
+
+        # every array is empty, bits are added after
+        controller._set_state(defaultdict(lambda: np.empty(0, dtype=np.int64)),
+                              {**self._get_meta(), 'offset': 0, 'buffered': True})
+        controller._stored = None
+        # bits of controller are their own names on blank, merges of them are added back by _add_fragment
+        controller._parent = _BlankBits(self.bit_cnt)
+        controller._size = _BlankBits(self.bit_cnt, 1)
+
+        return controller
+
+    def _get_fragment(self) -> dict[str, Any]:
+        """only bits created by stage and bits before them merged by it are returned, named by their roots"""
+        fragment = super()._get_fragment()
+        base, merged = self._parent.base, self._parent.changed()
+
+        fragment['names'] = np.array([self._find(bit) for bit in range(base, self.bit_cnt)], dtype=np.int64)
+        fragment['sizes'] = np.array([self._size[bit] for bit in range(base, self.bit_cnt)], dtype=np.int64)
+        fragment['merged_bits'] = np.array(merged, dtype=np.int64)
+        fragment['merged_names'] = np.array([self._find(bit) for bit in merged], dtype=np.int64)
+        fragment['stages'] = np.array([(bits.start, bits.stop) for bits in self.stages], dtype=np.int64).reshape(-1, 2)
+        fragment['constant_bits'] = np.fromiter(self.constants.keys(), dtype=np.int64, count=len(self.constants))
+        fragment['constant_values'] = np.fromiter(self.constants.values(), dtype=np.int8, count=len(self.constants))
+
+        return fragment
+
+    def _add_fragment(self, fragment: dict[str, Any], base: int, shift: int) -> None:
+        names = fragment['names']
+        bits = np.arange(base, base + len(names))
+        start = self.bit_cnt
+
+        # bits of fragment are added in order, named as in fragment if name is also a new bit
+        local = _relocate(names, base, shift)
+        self._parent.extend(np.where(local >= start, local, bits + shift).tolist())
+        self._size.extend(fragment['sizes'].tolist())
+        self.bit_cnt += len(names)
+
+        # shared bits merged in fragment, or new bits named by a shared bit
+        shared = names < base
+        for name, bit in zip(np.concatenate([fragment['merged_names'], names[shared]]).tolist(),
+                             np.concatenate([fragment['merged_bits'], bits[shared]]).tolist()):
+            self.merge_bit(*_relocate([name, bit], base, shift).tolist())
+
+        self.constants.update(zip(_relocate(fragment['constant_bits'], base, shift).tolist(),
+                                  fragment['constant_values'].tolist()))
+        self.stages.extend(range(a + shift, b + shift) for a, b in fragment['stages'].tolist())
+
+        super()._add_fragment(fragment, base, shift)
+
+    def _stage_of_names(self) -> np.ndarray:
+        """stage of every name on fixed_bqm, -1 for names not on it, variable merged over stages is on the latest one
+        variables created out of stages join the first stage they interact with, others are on one more stage"""
+        bqm = self.fixed_bqm
+        names = self._sampled_name_table()
+
+        stage_of_bit = np.full(self.bit_cnt, -1, dtype=np.int64)
+        for i, bits in enumerate(self.stages):
+            stage_of_bit[bits.start:bits.stop] = i
+
+        stage_of_name = np.full(self.bit_cnt, -1, dtype=np.int64)
+        np.maximum.at(stage_of_name, names, stage_of_bit)
+
+        labels = np.fromiter(bqm.variables, dtype=np.int64, count=bqm.num_variables)
+        stage = stage_of_name[labels]
+
+        _, (row, col, _), _ = bqm.to_numpy_vectors(labels)
+        first = np.full(len(labels), len(self.stages), dtype=np.int64)
+        for u, v in ((row, col), (col, row)):
+            edge = (stage[u] < 0) & (stage[v] >= 0)
+            np.minimum.at(first, u[edge], stage[v[edge]])
+
+        result = np.full(self.bit_cnt, -1, dtype=np.int64)
+        result[labels] = np.where(stage < 0, first, stage)
+
+        return result
+
+    def stage_blocks(self) -> list[list[Name]]:
+        """variables of fixed_bqm grouped by stage in order, stages without variable are left out"""
+        stage_of_name = self._stage_of_names()
+        labels = np.flatnonzero(stage_of_name >= 0)
+
+        blocks: list[list[Name]] = [[] for _ in range(len(self.stages) + 1)]
+        for label, i in zip(labels.tolist(), stage_of_name[labels].tolist()):
+            blocks[i].append(label)
+
+        return [block for block in blocks if block]
+
+    def stage_parts(self) -> Optional[list[BinaryQuadraticModel]]:
+        """terms of fixed_bqm belonging to each block of stage_blocks, None if they are not known"""
+        return None
+
+    def run_stages(self, child: Union[str, dimod.Sampler] = 'elimination', processes: int = 1, **params) -> SampleSet:
+        """solve fixed_bqm stage by stage with DecompositionSolver, child samples each stage
+        stages that don't read each other are sampled on multiple processes, params are passed to DecompositionSolver"""
+        params.setdefault('parts', self.stage_parts())
+        return self.run(DecompositionSolver(child, processes), blocks=self.stage_blocks(), **params)
+
+    def merge_bit(self, bit1: Bit, bit2: Bit) -> None:
+        """merge bit2 to bit1, name of the larger set is kept
+        terms already added to bqm are renamed once when bqm is accessed"""
+        bit1_name, bit2_name = self.get_names(bit1, bit2)
+
+        if bit1_name == bit2_name:
             return
 
-        for u, bias in self.bqm.iter_neighborhood(bit2_name):
-            self.bqm.add_quadratic(bit1_name, u, bias)
+        if self._size[bit1_name] < self._size[bit2_name]:
+            bit1_name, bit2_name = bit2_name, bit1_name
+
+        self._parent[bit2_name] = bit1_name
+        self._size[bit1_name] += self._size[bit2_name]
+        self._version += 1
+        self._constants_version += 1
 
-        self._add_variable(bit1_name, linear)
-        self.bqm.remove_variable(bit2_name)
+        if not self._merged and (self._stored is not None or bit2_name in self._bqm.variables):
+            self._merged = True
 
     def merge_variable(self, var1: Variable, var2: Variable) -> None:
         """merge var2 to var1"""
@@ -180,21 +491,35 @@ class BitController(BaseController):
             self.merge_bit(bit1, bit2)
 
     def _set_constant(self) -> None:
-        """ran before running solver to apply stored constants"""
+        """ran before running solver to apply stored constants on a copy of bqm
+        copy is kept until bqm or constants change, so repeated runs skip it"""
+        if self._fixed is not None and self._fixed_version == self._version:
+            return
+
+        self._fixed, self.constants_from_name, self._fixed_names = self._fix_constants()
+        self._fixed_version = self._version
+
+    def _fix_constants(self) -> tuple[BinaryQuadraticModel, dict[Name, Binary], Optional[np.ndarray]]:
+        """copy of bqm with constants fixed, constant of every name on it and names of it's bits(None if not renamed)"""
+        constants: dict[Name, Binary] = {}
         for key, value in self.constants.items():
-            bit_name = self.get_name(key)
-            self._fix_variable_by_name(bit_name, value)
-            self.constants_from_name[bit_name] = value
+            constants[self.get_name(key)] = value
 
-    def run_DWaveSampler(self, *args) -> SampleSet:
-        self._set_constant()
+        fixed = self.bqm.copy()
+        fixed.fix_variables([(name, value) for name, value in constants.items() if name in fixed.variables])
 
-        return super().run_DWaveSampler(*args)
+        return fixed, constants, None
 
-    def run_ExactSolver(self, *args) -> SampleSet:
+    @property
+    def fixed_bqm(self) -> BinaryQuadraticModel:
+        """bqm with constants fixed, this is given to samplers and bqm itself is not changed
+        changes made directly on bqm are not detected"""
         self._set_constant()
 
-        return super().run_ExactSolver(*args)
+        return self._fixed
+
+    def _sampled_bqm(self) -> BinaryQuadraticModel:
+        return self.fixed_bqm
 
     def _fix_variable(self, bit: Bit, value: Binary):
         bit_name = self.get_name(bit)
@@ -206,11 +531,78 @@ class BitController(BaseController):
         except ValueError:
             pass
 
+    def _get_name_table(self) -> np.ndarray:
+        parent = np.array(self._parent, dtype=np.int64)
+
+        # pointer jumping, every bit points to it's root when finished
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+        self._parent = parent.tolist()
+        return parent
+
+    def _get_state(self) -> tuple[dict[str, np.ndarray], dict]:
+        arrays, meta = super()._get_state()
+
+        # names are roots after bqm is built, so parent of every bit is it's name
+        arrays['names'] = self._get_name_table()
+        arrays['sizes'] = np.array(self._size, dtype=np.int64)
+        arrays['stages'] = np.array([(bits.start, bits.stop) for bits in self.stages], dtype=np.int64).reshape(-1, 2)
+
+        for key, constants in (('constant', self.constants), ('constant_name', self.constants_from_name)):
+            arrays[f'{key}_bits'] = np.fromiter(constants.keys(), dtype=np.int64, count=len(constants))
+            arrays[f'{key}_values'] = np.fromiter(constants.values(), dtype=np.int8, count=len(constants))
+
+        return arrays, meta
+
+    def _set_state(self, arrays: dict[str, np.ndarray], meta: dict) -> None:
+        super()._set_state(arrays, meta)
+
+        self._parent = arrays['names'].tolist()
+        self._size = arrays['sizes'].tolist()
+        self._merged = False
+        self._fixed = None
+        self._fixed_version = -1
+        self._fixed_names = None
+        self._constants_version = 0
+        self.stages = [range(start, stop) for start, stop in arrays['stages'].tolist()]
+
+        self.constants = dict(zip(arrays['constant_bits'].tolist(), arrays['constant_values'].tolist()))
+        self.constants_from_name = dict(
+            zip(arrays['constant_name_bits'].tolist(), arrays['constant_name_values'].tolist()))
+
+    def _has_pending(self) -> bool:
+        return self._merged or super()._has_pending()
+
+    def _flush(self) -> None:
+        if not self._merged:
+            super()._flush()
+            return
+
+        # add already built terms again so they are renamed with the rest
+        builder = self.builder if self.buffered else BQMBuilder()
+        builder.add_bqm(self._bqm)
+
+        self._bqm = builder.build(self._get_name_table())
+        self._merged = False
+
     def _add_variable(self, bit: Bit, bias: int = 0) -> None:
+        if self.buffered:
+            # named when bqm is built
+            super()._add_variable(bit, bias)
+            return
+
         bit_name = self.get_name(bit)
         super()._add_variable(bit_name, bias)
 
     def _add_quadratic(self, bit1: Bit, bit2: Bit, bias: int) -> None:
+        if self.buffered:
+            super()._add_quadratic(bit1, bit2, bias)
+            return
+
         bit1_name, bit2_name = self.get_names(bit1, bit2)
         super()._add_quadratic(bit1_name, bit2_name, bias)
 
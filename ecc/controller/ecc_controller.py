@@ -1,5 +1,8 @@
-from ecc.controller.modulo_controller import ModuloController
+from typing import Optional
+
+from ecc.controller.modulo_controller import LazyValue, ModuloController, _div_modp
 from ecc.types import Bit, Binary, Name, Variable, Constant
+from ecc.utilities.curve import point_sum, window_tables
 from ecc.utilities.number_to_binary import number_to_binary
 from ecc.point import Point, PointConst
 
@@ -7,8 +10,15 @@ from tqdm import tqdm
 
 
 class EccController(ModuloController):
-    def __init__(self, P):
-        super().__init__(P)
+    def __init__(self, P, buffered: bool = False, record: bool = False):
+        # when true, ecc_add reduces only where values leave the formula
+        self.lazy_reduction = False
+        # bits of key added at once by ecc_multiply, used if window is not given
+        self.ecc_window = 1
+        # when true, ecc_multiply adds or subtracts every double instead of selecting points
+        self.signed_digits = False
+
+        super().__init__(P, buffered, record)
 
     def new_point(self) -> Point:
         x, y = self.get_bits(self.length, self.length)
@@ -22,6 +32,10 @@ class EccController(ModuloController):
         self.ctrl_select_variable(A.x, B.x, ctrl, C.x)
         self.ctrl_select_variable(A.y, B.y, ctrl, C.y)
 
+    def select_point_constant(self, points: list[PointConst], select: Variable, C: Point) -> None:
+        """C = points[select], x and y share one multiplexer tree"""
+        self.select_constant([point.x + point.y for point in points], select, C.x + C.y)
+
     def set_point_constant(self, point: Point, const_point: PointConst) -> None:
         self.set_variable_constant(point.x, const_point.x)
         self.set_variable_constant(point.y, const_point.y)
@@ -30,15 +44,37 @@ class EccController(ModuloController):
         self.merge_variable(point1.x, point2.x)
         self.merge_variable(point1.y, point2.y)
 
-    def ecc_add(self, A: Point, B: PointConst, C: Point, ensure_modulo=False) -> None:
-        """C = A + B"""
+    def ecc_add(self, A: Point, B: PointConst, C: Point, ensure_modulo=False, lazy: Optional[bool] = None) -> None:
+        """C = A + B
+        lazy uses lazy expressions with 3 reductions instead of 9, lazy_reduction is used if not given"""
+
+        self._ecc_add(A, B, None, C, ensure_modulo, lazy)
+
+    def ecc_add_ctrl(self, A: Point, B: PointConst, ctrl: Bit, C: Point, ensure_modulo=False,
+                     lazy: Optional[bool] = None) -> None:
+        """C = A + B if ctrl is 1, A - B if ctrl is 0
+        ctrl is folded into y of B(each bit is constant, ctrl or not ctrl), so no point is selected"""
+        y_B = self.get_len_bit()
+        self.select_constant([(-B.y_int) % self.P, B.y_int], [ctrl], y_B)
 
+        self._ecc_add(A, B, y_B, C, ensure_modulo, lazy)
+
+    def _ecc_add(self, A: Point, B: PointConst, y_B: Optional[Variable], C: Point, ensure_modulo=False,
+                 lazy: Optional[bool] = None) -> None:
+        """C = A + B, y of B is replaced by y_B if it is given"""
         if not (A.length == B.length == C.length == self.length):
             raise ValueError("Length does not match")
 
+        if self.lazy_reduction if lazy is None else lazy:
+            self._ecc_add_lazy(A, B, y_B, C, ensure_modulo)
+            return
+
         # get lambda
         y_sub = self.get_len_bit()
-        self.sub_const_modp(A.y, B.y, y_sub)  # y_A-y_B
+        if y_B is None:
+            self.sub_const_modp(A.y, B.y, y_sub)  # y_A-y_B
+        else:
+            self.sub_modp(A.y, y_B, y_sub)
 
         x_sub = self.get_len_bit()
         self.sub_const_modp(A.x, B.x, x_sub)  # x_A-x_B
@@ -66,43 +102,212 @@ class EccController(ModuloController):
         self.mult_modp(x_B_sub, lambda_, lambda_mult)  # lambda *(x_B-x_C)
 
         # y_C = lambda *(x_B-x_C) -y_B
+        if y_B is None:
+            self.sub_const_modp(lambda_mult, B.y, C.y, ensure_modulo)
+        else:
+            self.sub_modp(lambda_mult, y_B, C.y, ensure_modulo)
+
+    def _ecc_add_lazy(self, A: Point, B: PointConst, y_B: Optional[Variable], C: Point, ensure_modulo=False) -> None:
+        lambda_ = self.get_len_bit()
+        if y_B is None:
+            self._add_hint(lambda x_A, y_A, l: (_div_modp(y_A - B.y_int, x_A - B.x_int, self.P),),
+                           [A.x, A.y], [lambda_])
+        else:
+            self._add_hint(lambda x_A, y_A, y, l: (_div_modp(y_A - y, x_A - B.x_int, self.P),),
+                           [A.x, A.y, y_B], [lambda_])
+        lambda_lazy = self.lazy(lambda_)
+
+        def sub_y(x: LazyValue) -> LazyValue:
+            if y_B is None:
+                return self.lazy_sub_const(x, B.y_int)
+            return self.lazy_sub(x, self.lazy(y_B))
+
+        # lambda * (x_A-x_B) - (y_A-y_B) = 0
+        x_sub = self.lazy_sub_const(self.lazy(A.x), B.x_int)
+        y_sub = sub_y(self.lazy(A.y))
+        self.lazy_zero(self.lazy_sub(self.lazy_mult(lambda_lazy, x_sub), y_sub))
+
+        # x_C = lambda^2 - x_B - x_A
+        x_C = self.lazy_sub_const(self.lazy_square(lambda_lazy), B.x_int)
+        x_C = self.lazy_sub(x_C, self.lazy(A.x))
+        self.lazy_reduce(x_C, C.x, ensure_modulo)
+
+        # y_C = lambda*(x_B-x_C) - y_B
+        x_sub = self.lazy_sub(self.lazy(B.x_int), self.lazy(C.x))
+        y_C = sub_y(self.lazy_mult(lambda_lazy, x_sub))
+        self.lazy_reduce(y_C, C.y, ensure_modulo)
+
+    def ecc_add_point(self, A: Point, B: Point, C: Point, ensure_modulo=False) -> None:
+        """C = A + B of two point variables, A and B should not be same or opposite"""
+
+        if not (A.length == B.length == C.length == self.length):
+            raise ValueError("Length does not match")
+
+        # lambda = (y_A-y_B) / (x_A-x_B)
+        y_sub = self.get_len_bit()
+        self.sub_modp(A.y, B.y, y_sub)
+
+        x_sub = self.get_len_bit()
+        self.sub_modp(A.x, B.x, x_sub)
+
+        lambda_ = self.get_len_bit()
+        self.div_modp(y_sub, x_sub, lambda_)
+
+        # x_C = lambda^2 - x_B - x_A
+        lambda_squ = self.get_len_bit()
+        self.square_modp(lambda_, lambda_squ)
+
+        x_C_temp = self.get_len_bit()
+        self.sub_modp(lambda_squ, B.x, x_C_temp)
+        self.sub_modp(x_C_temp, A.x, C.x, ensure_modulo)
+
+        # y_C = lambda * (x_B-x_C) - y_B
+        x_B_sub = self.get_len_bit()
+        self.sub_modp(B.x, C.x, x_B_sub)
+
+        lambda_mult = self.get_len_bit()
+        self.mult_modp(x_B_sub, lambda_, lambda_mult)
+
         self.sub_modp(lambda_mult, B.y, C.y, ensure_modulo)
 
     def ecc_sub(self, A: Point, B: PointConst, C: Point, ensure_modulo=False) -> None:
         """C = A - B => A = B + C"""
 
+        def hint(x_A, y_A, x_C, y_C):
+            # C = A + (-B)
+            lambda_ = _div_modp(y_A + B.y_int, x_A - B.x_int, self.P)
+            x = (lambda_**2 - x_A - B.x_int) % self.P
+            y = (lambda_ * (x_A - x) - y_A) % self.P
+            return x, y
+
+        self._add_hint(hint, [A.x, A.y], [C.x, C.y])
         self.ecc_add(C, B, A)
 
         if ensure_modulo:
             self.ensure_modulo(C.x)
             self.ensure_modulo(C.y)
 
-    def ecc_multiply(self, G_DOUBLES: list[PointConst], key: Variable, out_point: Point) -> None:
-        """OUT = KEY * BASE"""
+    def ecc_multiply(self, G_DOUBLES: list[PointConst], key: Variable, out_point: Point,
+                     window: Optional[int] = None, signed: Optional[bool] = None, processes: int = 1) -> None:
+        """OUT = KEY * BASE
+        window bits of key are added at once, ecc_window is used if not given
+        signed uses key bits as signed digits with ecc_add_ctrl, signed_digits is used if not given
+        every addition is one stage, stages are built on processes at once(see build_stages)"""
 
         if not (len(G_DOUBLES) == out_point.length == len(key) == self.length):
             raise ValueError("Length does not match")
 
+        window = window or self.ecc_window
+        if self.signed_digits if signed is None else signed:
+            if window > 1:
+                raise ValueError("signed digits are used with window 1")
+
+            self._ecc_multiply_signed(G_DOUBLES, key, out_point, processes)
+            return
+
+        if window > 1:
+            self._ecc_multiply_window(G_DOUBLES, key, out_point, window, processes)
+            return
+
         G = G_DOUBLES[0]
 
         base_point = self.new_point()
         # start from G because implementing point at infinity is expensive
-        pre_point = base_point
+        points = [base_point] + [self.new_point() for _ in range(self.length)]
 
-        for i in tqdm(range(self.length)):
-            # ecc add
-            ancilla_add = self.new_point()
-            self.ecc_add(pre_point, G_DOUBLES[i], ancilla_add)
+        calls = [(points[i], G_DOUBLES[i], key[i], points[i + 1]) for i in range(self.length)]
+        self.build_stages('_multiply_stage', tqdm(calls), processes)
+        pre_point = points[-1]
 
-            # add if bit is 1
+        # subtract G because we started from G
+        with self.stage():
             new_point = self.new_point()
-            self.ctrl_select_point(pre_point, ancilla_add, key[i], new_point)
+            self.ecc_sub(pre_point, G, new_point)
+
+        self.merge_point(new_point, out_point)
+        self.set_point_constant(base_point, G)
+
+    def _multiply_stage(self, pre_point: Point, B: PointConst, bit: Bit, new_point: Point) -> None:
+        """NEW = PRE + B if bit is 1, else PRE"""
+        ancilla_add = self.new_point()
+        self.ecc_add(pre_point, B, ancilla_add)
+
+        self.ctrl_select_point(pre_point, ancilla_add, bit, new_point)
+
+    def _window_stage(self, pre_point: Point, table: list[PointConst], bits: Variable, new_point: Point) -> None:
+        """NEW = PRE + table[bits] if any bit is 1, else PRE"""
+        selected = self.new_point()
+        self.select_point_constant(table, bits, selected)
+
+        ancilla_add = self.new_point()
+        self.ecc_add_point(pre_point, selected, ancilla_add)
+
+        # add if any bit of window is 1
+        nonzero = bits[0]
+        for bit in bits[1:]:
+            pre_nonzero = nonzero
+            nonzero = self.get_bit()
+            self.or_gate(pre_nonzero, bit, nonzero)
+
+        self.ctrl_select_point(pre_point, ancilla_add, nonzero, new_point)
+
+    def _ecc_multiply_window(self, G_DOUBLES: list[PointConst], key: Variable, out_point: Point, window: int,
+                             processes: int = 1) -> None:
+        """OUT = KEY * BASE, multiple of doubles for every value of window is calculated classically
+        and selected by multiplexer tree on constants, then added once per window"""
+        G = G_DOUBLES[0]
 
+        base_point = self.new_point()
+        # start from G because implementing point at infinity is expensive
+        pre_point = base_point
+
+        # a of curve is not known, it is only needed when two multiples are same, so one of them is infinity
+        try:
+            tables = window_tables(G_DOUBLES, window, self.P)
+        except ValueError:
+            tables = None
+
+        if tables is None or any(point is None for table in tables for point in table[1:]):
+            raise ValueError(
+                f"multiple of doubles in window {window} is point at infinity, order of base point is too small")
+
+        calls = []
+        for start, table in zip(range(0, self.length, window), tables):
+            # table[d] = d * 2**start * G, 0 is replaced by any point because its sum is not selected
+            table[0] = table[1]
+
+            new_point = self.new_point()
+            calls.append((pre_point, table, key[start:start + window], new_point))
             pre_point = new_point
 
+        self.build_stages('_window_stage', tqdm(calls), processes)
+
         # subtract G because we started from G
-        new_point = self.new_point()
-        self.ecc_sub(pre_point, base_point, new_point)
+        with self.stage():
+            new_point = self.new_point()
+            self.ecc_sub(pre_point, G, new_point)
 
         self.merge_point(new_point, out_point)
         self.set_point_constant(base_point, G)
+
+    def _ecc_multiply_signed(self, G_DOUBLES: list[PointConst], key: Variable, out_point: Point,
+                             processes: int = 1) -> None:
+        """OUT = KEY * BASE, key[i] for i >= 1 adds 2**(i-1) * G if it is 1 and subtracts it if it is 0
+        sum of them is (KEY - key[0] - 2**(n-1) + 1) * G, so it starts from (2**(n-1) - 1 + key[0]) * G"""
+        n = self.length
+        if n < 2:
+            raise ValueError("key should have at least 2 bits")
+
+        start = point_sum(G_DOUBLES[:n - 1], self.P)
+
+        with self.stage():
+            pre_point = self.new_point()
+            self.select_point_constant([start, G_DOUBLES[n - 1]], key[:1], pre_point)
+
+        points = [pre_point] + [self.new_point() for _ in range(1, n)]
+
+        calls = [(points[i - 1], G_DOUBLES[i - 1], key[i], points[i]) for i in range(1, n)]
+        self.build_stages('ecc_add_ctrl', tqdm(calls), processes)
+        pre_point = points[-1]
+
+        self.merge_point(pre_point, out_point)
@@ -1,47 +1,310 @@
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+
 from ecc.controller.bit_controller import BitController
-from ecc.types import Variable, Bit
+from ecc.circuit import gadgets, scaling
+from ecc.circuit.folding import Folding
+from ecc.circuit.gates import (
+    Gate, GATES, HALFADDER, FULLADDER, NOT, AND, OR, XNOR)
+from ecc.circuit.netlist import Netlist
+from ecc.circuit.simulate import Simulation, simulate, pack_lanes
+from ecc.types import Binary, Bit, Constant, Name, Variable
+from ecc.utilities.bqm_builder import BQMBuilder, Penalty
 
 
 class GateController(BitController):
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, buffered: bool = False, record: bool = False) -> None:
+        # when buffered, every gate is kept and lowered when a model is made, so constants can be folded
+        self.gates = Netlist()
+        # when recording, every gate is kept even after it is added to bqm
+        self.netlist: Optional[Netlist] = Netlist() if record else None
+        # replaces penalty of gates by name, applies to gates added after it is set
+        self.penalties: dict[str, Penalty] = {}
+        # size or gap, encoding of gadgets is chosen by it, default encodings are used if None
+        self.gadget_objective: Optional[str] = None
+        self._reset_gates()
+
+        super().__init__(buffered)
+
+    def _reset_gates(self) -> None:
+        # constants folded through gates before _fold_start, made again when constants or names change
+        self._folding: Optional[Folding] = None
+        self._fold_start = 0
+        self._fold_version = -1
+        # bqm with every gate lowered and version of bqm it was made from
+        self._full: Optional[BinaryQuadraticModel] = None
+        self._full_version = -1
+
+    @property
+    def bqm(self) -> BinaryQuadraticModel:
+        """model with every gate, gates of buffered controller are lowered on a copy so they can still be folded"""
+        bqm = BitController.bqm.fget(self)
+        if not self.gates:
+            return bqm
+
+        if self._full is None or self._full_version != self._version:
+            builder = BQMBuilder()
+            builder.add_bqm(bqm)
+            self.gates.lower(builder, self.penalties)
+
+            self._full = builder.build(self._get_name_table())
+            self._full_version = self._version
+
+        return self._full
+
+    @bqm.setter
+    def bqm(self, bqm: BinaryQuadraticModel) -> None:
+        BitController.bqm.fset(self, bqm)
+        self.gates.clear()
+        self._reset_gates()
+
+    def _add_gate(self, gate: Gate, *bits: Bit) -> None:
+        if self.netlist is not None:
+            self.netlist.append(gate, bits)
+
+        if self.buffered:
+            self.gates.append(gate, bits)
+            self._version += 1
+            return
+
+        self._add_penalty(self.penalties.get(gate.name, gate.penalty), *bits)
+
+    def _gadget(self, name: str) -> Gate:
+        if self.gadget_objective is None:
+            return gadgets.GADGETS[name][0]
+
+        return gadgets.choose(name, self.gadget_objective)
+
+    def _add_hint(self, fn: Callable[..., tuple[int, ...]], inputs: list[Variable], outputs: list[Variable]) -> None:
+        """record how free outputs are calculated from inputs, only used for simulation
+        fn is called with ints of inputs and outputs(None if not known yet) and returns ints of outputs"""
+        if self.netlist is None:
+            return
+
+        self.netlist.add_hint(fn, inputs, outputs)
+
+    def simulate(self, *assignments: tuple[Union[Bit, Variable], Union[int, Sequence[int]]]) -> Simulation:
+        """evaluate recorded netlist classically for many inputs at once
+        each assignment gives an int for every lane or a single int used on every lane, constants are used on every lane"""
+        if self.netlist is None:
+            raise ValueError("netlist is not recorded, create controller with record=True")
+
+        n_lanes = max([1, *(len(v) for _, v in assignments if not isinstance(v, int))])
+        n_words = (n_lanes + 63) // 64
+        names = self._get_name_table()
+
+        inputs: dict[int, np.ndarray] = {}
+        for bit, value in self.constants.items():
+            inputs[int(names[bit])] = pack_lanes([value] * n_lanes, 1, n_words)[0]
+
+        for var, value in assignments:
+            var = [var] if isinstance(var, Bit) else var
+            value = [value] * n_lanes if isinstance(value, int) else value
+
+            packed = pack_lanes(value, len(var), n_words)
+            for bit, words in zip(var, packed):
+                inputs[int(names[bit])] = words
+
+        return simulate(self.netlist, names, inputs, n_lanes)
+
+    def run(self, sampler='sa', warm_start: Optional[Sequence[tuple]] = None, **params):
+        """warm_start is assignments given to simulate, every simulated lane is used as initial state of a read
+        names that can't be simulated start from 0"""
+        if warm_start is not None:
+            labels = list(self.fixed_bqm.variables)
+            simulation = self.simulate(*warm_start)
+            params['initial_states'] = (simulation.samples(labels), labels)
+
+        return super().run(sampler, **params)
+
+    def compile(self, penalties: Optional[dict[str, Penalty]] = None) -> BinaryQuadraticModel:
+        """create bqm from recorded netlist using current names, constants are not fixed
+        penalties replaces penalty of gates by name"""
+        if self.netlist is None:
+            raise ValueError("netlist is not recorded, create controller with record=True")
+
+        return self.netlist.compile(self._get_name_table(), {**self.penalties, **(penalties or {})})
+
+    def _fixed_gates(self) -> Optional[tuple[Netlist, np.ndarray, dict[Name, Binary]]]:
+        """gates of fixed_bqm with name of their bits on it and constants fixed on them, None if they are not known
+        gates left by folding on buffered controller, recorded netlist otherwise"""
+        if self.gates:
+            self._set_constant()
+            # terms not added as gates are not on any gate
+            if BitController.bqm.fget(self).num_variables:
+                return None
+
+            return self._fold_gates().netlist, self._fixed_names, self.constants_from_name
+
+        if self.netlist is None:
+            return None
+
+        self._set_constant()
+        return self.netlist, self._get_name_table(), self.constants_from_name
+
+    def stage_parts(self) -> Optional[list[BinaryQuadraticModel]]:
+        """bqm of gates of each block of stage_blocks with constants fixed, None if gates are not known
+        gate belongs to the latest stage of its bits, so every term of a stage is on it's part and parts add up to fixed_bqm"""
+        gates = self._fixed_gates()
+        if gates is None:
+            return None
+
+        netlist, names, constants = gates
+        stage_of_name = self._stage_of_names()
+        stages = np.unique(stage_of_name[stage_of_name >= 0])
+
+        netlists = [Netlist() for _ in stages]
+        for gate, rows in netlist.group():
+            stage = stage_of_name[names[rows]].max(axis=1)
+            # gates of only constants have no term on fixed_bqm
+            for row, i in zip(rows[stage >= 0].tolist(), np.searchsorted(stages, stage[stage >= 0]).tolist()):
+                netlists[i].append(gate, row)
+
+        parts = []
+        for stage, netlist in zip(stages.tolist(), netlists):
+            bqm = netlist.compile(names, self.penalties)
+            bqm.fix_variables([(name, value) for name, value in constants.items()
+                               if name in bqm.variables])
+            # variables of block that are only on terms of other blocks or on no term
+            bqm.add_variables_from((name, 0) for name in np.flatnonzero(stage_of_name == stage).tolist())
+            parts.append(bqm)
+
+        return parts
+
+    def analyze_biases(self, bqm: Optional[BinaryQuadraticModel] = None,
+                       penalties: Optional[dict[str, Penalty]] = None) -> dict[str, float]:
+        """bias range of bqm(controller's bqm if not given) and it's smallest gap after scaling to QPU range
+        gap is taken from penalties of recorded gates, every gate kind if not recorded"""
+        penalties = {**self.penalties, **(penalties or {})}
+        kinds = self.netlist.kinds if self.netlist is not None else GATES.values()
+
+        min_gap = min(penalties.get(gate.name, gate.penalty).gap for gate in kinds) if kinds else 1
+        return scaling.analyze(self.bqm if bqm is None else bqm, min_gap)
+
+    def balance_penalties(self) -> dict[str, Penalty]:
+        """penalty of every recorded gate kind multiplied so smallest gap is largest after scaling to QPU range
+        result can be given to compile or set on penalties before gates are added"""
+        if self.netlist is None:
+            raise ValueError("netlist is not recorded, create controller with record=True")
+
+        names = self._get_name_table()
+        multipliers = scaling.balance_penalties(self.netlist, names, self.penalties)
+
+        return scaling.scaled_penalties(self.netlist, multipliers, self.penalties)
+
+    def _get_meta(self) -> dict:
+        meta = super()._get_meta()
+
+        meta['penalties'] = {name: [penalty.linear, penalty.quadratic, penalty.offset]
+                             for name, penalty in self.penalties.items()}
+
+        return meta
+
+    def _set_state(self, arrays: dict[str, np.ndarray], meta: dict) -> None:
+        super()._set_state(arrays, meta)
+
+        # hints of recorded netlist are functions, so it is not stored
+        self.gates = Netlist()
+        self._reset_gates()
+        self.netlist = None
+        self.penalties = {
+            name: Penalty([tuple(t) for t in linear], [tuple(t) for t in quadratic], offset)
+            for name, (linear, quadratic, offset) in meta['penalties'].items()}
+
+    def _get_fragment(self) -> dict:
+        # gates are not folded, constants of stage are fixed with the rest
+        self.gates.lower(self.builder, self.penalties)
+        self.gates.clear()
+
+        return super()._get_fragment()
+
+    def build_stages(self, method: str, calls: Iterable[tuple], processes: int = 1) -> None:
+        if self.netlist is not None and processes > 1:
+            raise ValueError("hints of recorded netlist can't be sent between processes, use 1 process")
+
+        super().build_stages(method, calls, processes)
+
+    def _only_stored(self) -> bool:
+        return not self.gates and super()._only_stored()
+
+    def fold_constants(self) -> int:
+        """propagate constants through gates of buffered controller, returns number of removed gates
+        outputs and ancillas that are known are fixed and ones that are equal to an input are renamed to it on fixed_bqm,
+        gates, constants and names of controller are not changed so constants can still be changed later"""
+        self._set_constant()
+
+        return len(self.gates) - len(self._folding) if self._folding is not None else 0
+
+    def _fold_gates(self) -> Folding:
+        """constants folded through every gate, gates added since last call are folded on what is already known"""
+        if self._folding is None or self._fold_version != self._constants_version:
+            names = self._get_name_table()
+
+            constants: dict[Name, Binary] = {}
+            for bit, value in self.constants.items():
+                constants.setdefault(int(names[bit]), value)
+
+            self._folding = Folding(constants)
+            self._fold_start = 0
+            self._fold_version = self._constants_version
+
+        if self._fold_start < len(self.gates):
+            # only bits of new gates are named
+            offset = self.gates.starts[self._fold_start]
+            bits = self._get_name_table()[np.frombuffer(self.gates.bits, dtype=np.int64)[offset:]].tolist()
+
+            records = []
+            for code, start in zip(self.gates.codes[self._fold_start:], self.gates.starts[self._fold_start:]):
+                gate = self.gates.kinds[code]
+                records.append((gate, tuple(bits[start - offset:start - offset + gate.size])))
+
+            self._folding.add(records)
+            self._fold_start = len(self.gates)
+
+        return self._folding
+
+    def _fold_names(self, folding: Folding) -> np.ndarray:
+        """name on fixed bqm of every name, names merged by folding are renamed to the name they are merged to"""
+        renamed = np.arange(self.bit_cnt, dtype=np.int64)
+        for name1, name2 in folding.merges:
+            renamed[name2] = name1
+
+        # pointer jumping, like names of bits
+        while not np.array_equal(renamed[renamed], renamed):
+            renamed = renamed[renamed]
+
+        return renamed
+
+    def _fix_constants(self) -> tuple[BinaryQuadraticModel, dict[Name, Binary], Optional[np.ndarray]]:
+        if not self.gates:
+            return super()._fix_constants()
+
+        folding = self._fold_gates()
+        renamed = self._fold_names(folding)
+
+        # only remaining gates are lowered, names of removed gates are kept to be fixed or sampled
+        builder = BQMBuilder()
+        builder.add_bqm(BitController.bqm.fget(self))
+        folding.netlist.lower(builder, self.penalties)
+
+        names = np.unique(self._get_name_table()[np.frombuffer(self.gates.bits, dtype=np.int64)])
+        builder.add_arrays(names, np.zeros(len(names)), [], [], [], 0)
+
+        fixed = builder.build(renamed)
+        constants = {int(renamed[name]): value for name, value in folding.constants.items()}
+        fixed.fix_variables([(name, value) for name, value in constants.items() if name in fixed.variables])
+
+        return fixed, constants, renamed
 
     def halfadder_gate(self, in0: Bit, in1: Bit, sum_: Bit, carry: Bit) -> None:
         """halfadder gate"""
-        # add the variables (in order)
-        self._add_variable(in0, 1)
-        self._add_variable(in1, 1)
-        self._add_variable(sum_, 1)
-        self._add_variable(carry, 4)
-
-        # add the quadratic biases
-        self._add_quadratic(in0, in1, 2)
-        self._add_quadratic(in0, sum_, -2)
-        self._add_quadratic(in0, carry, -4)
-        self._add_quadratic(in1, sum_, -2)
-        self._add_quadratic(in1, carry, -4)
-        self._add_quadratic(sum_, carry, 4)
+        self._add_gate(HALFADDER, in0, in1, sum_, carry)
 
     def fulladder_gate(self, in0: Bit, in1: Bit, in2: Bit, sum_: Bit, carry: Bit) -> None:
         """fulladder gate"""
-        # add the variables (in order)
-        self._add_variable(in0, 1)
-        self._add_variable(in1, 1)
-        self._add_variable(in2, 1)
-        self._add_variable(sum_, 1)
-        self._add_variable(carry, 4)
-
-        # add the quadratic biases
-        self._add_quadratic(in0, in1, 2)
-        self._add_quadratic(in0, in2, 2)
-        self._add_quadratic(in0, sum_, -2)
-        self._add_quadratic(in0, carry, -4)
-        self._add_quadratic(in1, in2, 2)
-        self._add_quadratic(in1, sum_, -2)
-        self._add_quadratic(in1, carry, -4)
-        self._add_quadratic(in2, sum_, -2)
-        self._add_quadratic(in2, carry, -4)
-        self._add_quadratic(sum_, carry, 4)
+        self._add_gate(FULLADDER, in0, in1, in2, sum_, carry)
 
     def zero_gate(self, in0: Bit) -> None:
         """add bias toward zero"""
@@ -65,81 +328,30 @@ class GateController(BitController):
 
     def not_gate(self, in0: Bit, out: Bit) -> None:
         """not gate"""
-        # add the variables (in order)
-        self._add_variable(in0, -1)
-        self._add_variable(out, -1)
-
-        # add the quadratic biases
-        self._add_quadratic(in0, out, 2)
-
-        self._add_offset(1)
+        self._add_gate(NOT, in0, out)
 
     def and_gate(self, in0: Bit, in1: Bit, out: Bit) -> None:
         """and gate"""
-        # add the variables (in order)
-        self._add_variable(in0)
-        self._add_variable(in1)
-        self._add_variable(out, 3)
-
-        # add the quadratic biases
-        self._add_quadratic(in0, in1, 1)
-        self._add_quadratic(in0, out, -2)
-        self._add_quadratic(in1, out, -2)
+        self._add_gate(AND, in0, in1, out)
 
     def or_gate(self, in0: Bit, in1: Bit, out: Bit) -> None:
         """or gate"""
-        # add the variables (in order)
-        self._add_variable(in0, 1)
-        self._add_variable(in1, 1)
-        self._add_variable(out, 1)
-
-        # add the quadratic biases
-        self._add_quadratic(in0, in1, 1)
-        self._add_quadratic(in0, out, -2)
-        self._add_quadratic(in1, out, -2)
+        self._add_gate(OR, in0, in1, out)
 
     def xor_gate(self, in0: Bit, in1: Bit, out: Bit) -> None:
         """xor gate"""
-        ancilla = self.get_bit()
-
-        # add the variables (in order)
-        self._add_variable(in0, 1)
-        self._add_variable(in1, 1)
-        self._add_variable(out, 1)
-        self._add_variable(ancilla, 4)
-
-        # add the quadratic biases
-        self._add_quadratic(in0, in1, 2)
-        self._add_quadratic(in0, out, -2)
-        self._add_quadratic(in1, out, -2)
-        self._add_quadratic(in0, ancilla, -4)
-        self._add_quadratic(in1, ancilla, -4)
-        self._add_quadratic(ancilla, out, 4)
+        gate = self._gadget('xor')
+        self._add_gate(gate, in0, in1, out, *self.get_bit(gate.n_ancillas))
 
     def xnor_gate(self, in0: Bit, in1: Bit, out: Bit) -> None:
-        self.xor_gate(in0, in1, out)
-        self._flip_variable(out)
+        """xnor gate"""
+        ancilla = self.get_bit()
+        self._add_gate(XNOR, in0, in1, out, ancilla)
 
     def ctrl_select(self, in0: Bit, in1: Bit, ctrl: Bit, out: Bit) -> None:
         """in0 if ctrl is 0, in1 if ctrl is 1"""
-        ancilla = self.get_bit()
-
-        self._add_variable(in0, 1)
-        self._add_variable(in1)
-        self._add_variable(ctrl)
-        self._add_variable(out, 3)
-        self._add_variable(ancilla, 8)
-
-        self._add_quadratic(in0, in1, 2)
-        self._add_quadratic(in0, ctrl, -1)
-        self._add_quadratic(in1, ctrl, 1)
-        self._add_quadratic(in0, out, -4)
-        self._add_quadratic(in1, out, -2)
-        self._add_quadratic(ctrl, out, 2)
-        self._add_quadratic(in0, ancilla, 2)
-        self._add_quadratic(in1, ancilla, -4)
-        self._add_quadratic(ctrl, ancilla, -4)
-        self._add_quadratic(out, ancilla, -4)
+        gate = self._gadget('ctrl_select')
+        self._add_gate(gate, in0, in1, ctrl, out, *self.get_bit(gate.n_ancillas))
 
     def ctrl_select_variable(self, a: Variable, b: Variable, ctrl: Bit, c: Variable) -> None:
         """a if ctrl is 0 b if ctrl is 1"""
@@ -153,6 +365,87 @@ class GateController(BitController):
         for i in range(len(a)):
             self.ctrl_select(a[i], b[i], ctrl, c[i])
 
+    def ctrl_swap(self, in0: Bit, in1: Bit, ctrl: Bit, out0: Bit, out1: Bit) -> None:
+        """out0, out1 = in0, in1 if ctrl is 0, in1, in0 if ctrl is 1, uses one ancilla for both outputs"""
+        gate = self._gadget('ctrl_swap')
+        self._add_gate(gate, in0, in1, ctrl, out0, out1, *self.get_bit(gate.n_ancillas))
+
+    def ctrl_swap_variable(self, a: Variable, b: Variable, ctrl: Bit, c: Variable, d: Variable) -> None:
+        """c, d = a, b if ctrl is 0, b, a if ctrl is 1"""
+        if not len(a) == len(b) == len(c) == len(d):
+            raise ValueError("length of variables should be same")
+
+        for i in range(len(a)):
+            self.ctrl_swap(a[i], b[i], ctrl, c[i], d[i])
+
+    def fulladder_and_gate(self, in0: Bit, x: Bit, in1: Bit, in2: Bit, sum_: Bit, carry: Bit) -> None:
+        """fulladder gate of (in0 & x), in1, in2"""
+        gate = self._gadget('fulladder_and')
+        self._add_gate(gate, in0, x, in1, in2, sum_, carry, *self.get_bit(gate.n_ancillas))
+
+    def fulladder_xor_gate(self, in0: Bit, x: Bit, in1: Bit, in2: Bit, sum_: Bit, carry: Bit) -> None:
+        """fulladder gate of (in0 ^ x), in1, in2"""
+        gate = self._gadget('fulladder_xor')
+        self._add_gate(gate, in0, x, in1, in2, sum_, carry, *self.get_bit(gate.n_ancillas))
+
+    def select_constant(self, constants: list[Constant], select: Variable, out: Variable) -> None:
+        """out = constants[select], multiplexer tree whose inputs are constants
+        node of same constants is constant and node of 0, 1 is select bit itself, same nodes are shared"""
+        if len(constants) != 2**len(select):
+            raise ValueError("number of constants should be 2**length of select")
+
+        constants = [self.check_ConstantType(const, len(out)) for const in constants]
+
+        nots: dict[Bit, Bit] = {}
+        nodes: dict[tuple[Binary, ...], Bit] = {}
+
+        def negate(s: Bit) -> Bit:
+            if s not in nots:
+                nots[s] = self.get_bit()
+                self.not_gate(s, nots[s])
+            return nots[s]
+
+        def node(table: tuple[Binary, ...]) -> tuple[Optional[Bit], Binary]:
+            """bit of table, (None, value) if every value is same"""
+            if len(set(table)) == 1:
+                return None, table[0]
+            if table in nodes:
+                return nodes[table], 0
+
+            half = len(table) // 2
+            s = select[half.bit_length() - 1]
+            (x, x_value), (y, y_value) = node(table[:half]), node(table[half:])
+
+            if x is None and y is None:
+                bit = s if y_value else negate(s)
+            elif x == y:
+                bit = x
+            else:
+                bit = self.get_bit()
+                if x is None:
+                    # x_value if s is 0
+                    if x_value:
+                        self.or_gate(y, negate(s), bit)
+                    else:
+                        self.and_gate(y, s, bit)
+                elif y is None:
+                    if y_value:
+                        self.or_gate(x, s, bit)
+                    else:
+                        self.and_gate(x, negate(s), bit)
+                else:
+                    self.ctrl_select(x, y, s, bit)
+
+            nodes[table] = bit
+            return bit, 0
+
+        for i in range(len(out)):
+            bit, value = node(tuple(int(const[i]) for const in constants))
+            if bit is None:
+                self.set_bit_constant(out[i], value)
+            else:
+                self.merge_bit(out[i], bit)
+
     def ctrl_var(self, ctrl: Bit, a: Variable, c: Variable) -> None:
         """Returns var if control is 1, else returns 0"""
 
@@ -1,15 +1,43 @@
-from ecc.controller.arithmetic_controller import ArithmeticController
+from typing import Optional, Union
+
+from ecc.controller.arithmetic_controller import ArithmeticController, _shifted_columns
 from ecc.types import Variable, Constant
-from ecc.utilities.number_to_binary import number_to_binary
+from ecc.utilities.number_to_binary import number_to_binary, binary_to_number
+
+
+def _div_modp(a: int, b: int, p: int) -> int:
+    """(a/b) mod p, 0 if b has no inverse"""
+    try:
+        return a * pow(b, -1, p) % p
+    except ValueError:
+        return 0
+
+
+REDUCTION_STRATEGIES = ('multiply', 'fold')
+
+
+class LazyValue:
+    """variable that is congruent to a value mod P but not reduced yet, bound is the largest value it can have"""
+
+    def __init__(self, var: Variable, bound: int) -> None:
+        self.var = var
+        self.bound = bound
 
 
 class ModuloController(ArithmeticController):
-    def __init__(self, P):
+    def __init__(self, P, buffered: bool = False, record: bool = False):
         self.P = P
         self.P_CONST = number_to_binary(P)
         self.length = len(self.P_CONST)
 
-        super().__init__()
+        # P = 2^length - FOLD_CONST, used by fold reduction
+        self.FOLD_CONST = number_to_binary(2**self.length - P)
+        # strategy used by modulo_p when it is not given
+        self.reduction_strategy = 'multiply'
+        # lazy values are reduced before an operation would make them longer than this
+        self.lazy_bits = 2 * self.length + 2
+
+        super().__init__(buffered, record)
 
     def ensure_modulo(self, a: Variable) -> None:
         """ensure that A is less than P"""
@@ -22,27 +50,95 @@ class ModuloController(ArithmeticController):
 
         self.subtract_const(a, self.P_CONST, ancilla_sub, underflow)
 
-    def modulo_p(self, a: Variable, r: Variable, ensure_modulo=False):
+    def modulo_p(
+        self, a: Variable, r: Variable, ensure_modulo=False, strategy: Optional[str] = None, bound: Optional[int] = None
+    ):
         """r = a mod p
-        calculates A = m*P + R"""
+        strategy is one of multiply, fold, reduction_strategy is used if not given
+        bound is largest value a can have, when given quotient is made only as large as needed"""
 
         if len(r) != self.length:
             raise ValueError("Length does not match")
 
+        strategy = strategy or self.reduction_strategy
+        if strategy not in REDUCTION_STRATEGIES:
+            raise ValueError(f"unknown reduction strategy {strategy}")
+
+        if bound is not None and bound < self.P:
+            # already reduced
+            self.merge_variable(r[:len(a)], a[:len(r)])
+            for bit in [*a[len(r):], *r[len(a):]]:
+                self.zero_gate(bit)
+
+            if ensure_modulo:
+                self.ensure_modulo(r)
+            return
+
+        if strategy == 'fold':
+            a, bound = self._fold(a, bound)
+
+        self._modulo_multiply(a, r, bound)
+
+        if ensure_modulo:
+            self.ensure_modulo(r)
+
+    def _modulo_multiply(self, a: Variable, r: Variable, bound: Optional[int] = None) -> None:
+        """calculates A = m*P + R"""
         a_length = len(a)
         if a_length < self.length:
             raise ValueError("A is too short")
 
+        def hint(a_, m_, r_):
+            r_ = a_ % self.P if r_ is None else r_
+            return max(a_ - r_, 0) // self.P, r_
+
+        if bound is not None:
+            # m*P + R can be larger than bound when R is not ensured, so m is one less than bound // P at most
+            m_length = max(1, (bound // self.P).bit_length())
+
+            if m_length < a_length - self.length + 1:
+                m, product = self.get_bits(m_length, m_length + self.length)
+
+                self._add_hint(hint, [a], [m, r])
+                self.multiply_const(m, self.P_CONST, product)
+                self._reduce_columns(_shifted_columns((product, 0), (r, 0)), a)
+                return
+
         m_length = a_length - self.length + 1
         m, ancilla_mult = self.get_bits(m_length, a_length)
+
+        self._add_hint(hint, [a], [m, r])
         zero = self.get_zero_bit()
         ancilla_mult_ = [*ancilla_mult, zero]
 
         self.multiply_const(m, self.P_CONST, ancilla_mult_)
         self.add_no_overflow(ancilla_mult, r, a)
 
-        if ensure_modulo:
-            self.ensure_modulo(r)
+    def _fold(self, a: Variable, bound: Optional[int] = None) -> tuple[Variable, int]:
+        """A = A_hi * 2^length + A_lo = A_hi * FOLD_CONST + A_lo (mod P), repeated while A gets shorter
+        returns folded A and it's bound"""
+        k = self.length
+        bound = 2**len(a) - 1 if bound is None else bound
+        c = binary_to_number(self.FOLD_CONST)
+
+        while len(a) > k + 1:
+            high_bound = bound >> k
+            new_bound = 2**k - 1 + high_bound * c
+            length = new_bound.bit_length()
+            if length >= len(a):
+                break
+
+            high = a[k:]
+            product = self.get_bit(len(high) + len(self.FOLD_CONST)
+                                   if len(self.FOLD_CONST) != 1 else len(high))
+            self.multiply_const(high, self.FOLD_CONST, product)
+
+            folded = self.get_bit(length)
+            self._reduce_columns(_shifted_columns((a[:k], 0), (product, 0)), folded)
+
+            a, bound = folded, new_bound
+
+        return a, bound
 
     def add_modp(
         self, a: Variable, b: Variable, c: Variable, ensure_modulo=False
@@ -77,11 +173,14 @@ class ModuloController(ArithmeticController):
     def sub_modp(self, a: Variable, b: Variable, c: Variable, ensure_modulo=False) -> None:
         """c = (a-b) mod p"""
 
+        self._add_hint(lambda a, b, c: ((a - b) % self.P,), [a, b], [c])
         self.add_modp(b, c, a, ensure_modulo)
 
     def sub_const_modp(self, a: Variable, b: Constant, c: Variable, ensure_modulo=False) -> None:
         """c = (a-b) mod p"""
 
+        B = binary_to_number(self.check_ConstantType(b))
+        self._add_hint(lambda a, c: ((a - B) % self.P,), [a], [c])
         self.add_const_modp(c, b, a, ensure_modulo)
 
     def mult_modp(self, a: Variable, b: Variable, c: Variable, ensure_modulo=False) -> None:
@@ -135,6 +234,8 @@ class ModuloController(ArithmeticController):
         else:
             raise ValueError("Length does not match")
 
+        self._add_hint(lambda a, c: (_div_modp(1, a, self.P),), [a], [c])
+
         r = self.get_bit(self.length)
         self.mult_modp(a, c, r)
 
@@ -150,6 +251,7 @@ class ModuloController(ArithmeticController):
     def div_modp(self, a: Variable, b: Variable, c: Variable, ensure_modulo=False) -> None:
         """c = (a/b) mod p => a = (b*c) mod p"""
 
+        self._add_hint(lambda a, b, c: (_div_modp(a, b, self.P),), [a, b], [c])
         self.mult_modp(b, c, a, ensure_modulo)
 
     def double_modp(
@@ -166,3 +268,139 @@ class ModuloController(ArithmeticController):
         double = [b, *a]  # 2*A
 
         self.modulo_p(double, c, ensure_modulo)
+
+    def to_montgomery(self, x: int) -> int:
+        """x * R mod p where R = 2^length"""
+        return x * 2**self.length % self.P
+
+    def from_montgomery(self, x: int) -> int:
+        """x * R^-1 mod p"""
+        return x * pow(2, -self.length, self.P) % self.P
+
+    def mont_mult_modp(self, a: Variable, b: Variable, c: Variable, ensure_modulo=False) -> None:
+        """c = (a*b*R^-1) mod p where R = 2^length, product of values in montgomery form stays in montgomery form
+        calculates a*b + m*P = t*R with free m < R, then c = t mod p
+        a and b don't need to be reduced, t is bound by their length"""
+
+        if not (len(a) == len(b) == len(c) == self.length):
+            raise ValueError("Length does not match")
+
+        k = self.length
+        R = 2**k
+        P_INV = pow(-self.P, -1, R)
+
+        product, m, m_product, total = self.get_bits(2 * k, k, 2 * k, 2 * k + 1)
+        self.multiply(a, b, product)
+
+        self._add_hint(lambda t, m: (t * P_INV % R,), [product], [m])
+        self.multiply_const(m, self.P_CONST, m_product)
+        self.add(product, m_product, total)
+
+        for bit in total[:k]:
+            self.zero_gate(bit)
+
+        # t < 2P only when a, b < P
+        bound = ((R - 1)**2 + (R - 1) * self.P) // R
+        self.modulo_p(total[k:], c, ensure_modulo, bound=bound)
+
+    def lazy(self, a: Union[Variable, Constant], bound: Optional[int] = None) -> LazyValue:
+        """start lazy expression from variable(or int constant), bound is 2^len(a)-1 if not given"""
+        if isinstance(a, int):
+            const = number_to_binary(a)
+            a = self.get_bit(len(const))
+            self.set_variable_constant(a, const)
+            bound = binary_to_number(const)
+
+        return LazyValue(a, 2**len(a) - 1 if bound is None else bound)
+
+    def lazy_reduce(self, x: LazyValue, c: Optional[Variable] = None, ensure_modulo=False) -> Variable:
+        """c = x mod p, ends lazy expression"""
+        c = self.get_bit(self.length) if c is None else c
+        self.modulo_p(x.var, c, ensure_modulo, bound=x.bound)
+
+        return c
+
+    def lazy_zero(self, x: LazyValue) -> None:
+        """x mod p = 0"""
+        r = self.lazy_reduce(x)
+        self.set_variable_constant(r, 0)
+
+    def _lazy_fit(self, x: LazyValue, y: LazyValue, combine) -> tuple[LazyValue, LazyValue]:
+        """reduce larger operand until combined bound fits on lazy_bits"""
+        limit = 2**self.lazy_bits
+        reduced_bound = 2**self.length - 1
+
+        while combine(x.bound, y.bound) >= limit:
+            if x.bound >= y.bound and x.bound > reduced_bound:
+                x = LazyValue(self.lazy_reduce(x), reduced_bound)
+            elif y.bound > reduced_bound:
+                y = LazyValue(self.lazy_reduce(y), reduced_bound)
+            else:
+                break
+
+        return x, y
+
+    def lazy_add(self, x: LazyValue, y: LazyValue) -> LazyValue:
+        """x + y"""
+        x, y = self._lazy_fit(x, y, lambda a, b: a + b)
+
+        bound = x.bound + y.bound
+        c = self.get_bit(bound.bit_length())
+        self._reduce_columns(_shifted_columns((x.var, 0), (y.var, 0)), c)
+
+        return LazyValue(c, bound)
+
+    def lazy_add_const(self, x: LazyValue, b: int) -> LazyValue:
+        """x + b"""
+        return self.lazy_add(x, self.lazy(b % self.P)) if b % self.P else x
+
+    def lazy_sub(self, x: LazyValue, y: LazyValue) -> LazyValue:
+        """x - y, multiple of P not smaller than y is added so value is not negative"""
+        def multiple(b: int) -> int:
+            return -(-b // self.P) * self.P
+
+        x, y = self._lazy_fit(x, y, lambda a, b: a + multiple(b))
+
+        K = multiple(y.bound)
+        w = self.lazy_add(x, self.lazy(K)) if K else x
+
+        # found from c + y = w
+        c = self.get_bit(w.bound.bit_length())
+        self._add_hint(lambda w, y, c: (w - y,), [w.var, y.var], [c])
+        self._reduce_columns(_shifted_columns((c, 0), (y.var, 0)), w.var)
+
+        return LazyValue(c, w.bound)
+
+    def lazy_sub_const(self, x: LazyValue, b: int) -> LazyValue:
+        """x - b"""
+        return self.lazy_add_const(x, -b)
+
+    def lazy_mult(self, x: LazyValue, y: LazyValue) -> LazyValue:
+        """x * y"""
+        x, y = self._lazy_fit(x, y, lambda a, b: a * b)
+
+        c = self.get_bit(len(x.var) + len(y.var))
+        self.multiply(x.var, y.var, c)
+
+        return LazyValue(c, x.bound * y.bound)
+
+    def lazy_mult_const(self, x: LazyValue, b: int) -> LazyValue:
+        """x * b"""
+        b %= self.P
+        if b == 0:
+            return self.lazy(0)
+
+        const = number_to_binary(b)
+        c = self.get_bit(len(x.var) + len(const) if len(const) != 1 else len(x.var))
+        self.multiply_const(x.var, const, c)
+
+        return LazyValue(c, x.bound * b)
+
+    def lazy_square(self, x: LazyValue) -> LazyValue:
+        """x^2"""
+        x, _ = self._lazy_fit(x, x, lambda a, b: a * b)
+
+        c = self.get_bit(2 * len(x.var))
+        self.square(x.var, c)
+
+        return LazyValue(c, x.bound**2)
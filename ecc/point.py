@@ -1,3 +1,5 @@
+from typing import Optional
+
 from ecc.types import Variable, Constant
 from ecc.utilities.number_to_binary import number_to_binary
 
@@ -15,7 +17,21 @@ class Point:
 class PointConst:
     def __init__(self, x: int, y: int, length: int = 256):
         self.length = length
-        self.x: Constant = number_to_binary(x, length)
-        self.y: Constant = number_to_binary(y, length)
         self.x_int = x
         self.y_int = y
+
+        # bits are converted when they are first used, tables of many points are created quickly
+        self._x: Optional[Constant] = None
+        self._y: Optional[Constant] = None
+
+    @property
+    def x(self) -> Constant:
+        if self._x is None:
+            self._x = number_to_binary(self.x_int, self.length)
+        return self._x
+
+    @property
+    def y(self) -> Constant:
+        if self._y is None:
+            self._y = number_to_binary(self.y_int, self.length)
+        return self._y
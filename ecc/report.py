@@ -0,0 +1,145 @@
+from typing import Callable, Iterable, Optional
+
+import minorminer
+import networkx as nx
+import numpy as np
+
+from ecc.circuit import gadgets
+from ecc.controller import ArithmeticController, BaseController, EccController, ModuloController
+from ecc.controller.arithmetic_controller import ADD_STRATEGIES, MULTIPLY_STRATEGIES, SQUARE_STRATEGIES
+from ecc.controller.modulo_controller import REDUCTION_STRATEGIES
+from ecc.point import PointConst
+
+
+Report = dict[str, dict[str, int]]
+
+
+def measure(controller: BaseController) -> dict[str, int]:
+    """number of qubits(variables) and couplers(interactions) of controller's bqm"""
+    bqm = controller.bqm
+    return {'qubits': bqm.num_variables, 'couplers': bqm.num_interactions}
+
+
+def compare(build: Callable[[str], BaseController], strategies: Iterable[str]) -> Report:
+    """measure controller built by build for every strategy"""
+    return {strategy: measure(build(strategy)) for strategy in strategies}
+
+
+def best(report: Report) -> str:
+    """strategy with fewest qubits, fewest couplers on tie"""
+    return min(report, key=lambda s: (report[s]['qubits'], report[s]['couplers']))
+
+
+def success_rate(controller: BaseController, sampler='sa', **params) -> float:
+    """fraction of samples on zero energy, every gate of them is satisfied"""
+    sampleset = controller.run(sampler, **params)
+    return float(np.mean(np.abs(sampleset.record.energy) < 1e-9))
+
+
+def chain_lengths(controller: BaseController, target: nx.Graph, **params) -> dict[str, float]:
+    """longest and average chain of embedding controller's bqm on target graph, searched by minorminer"""
+    bqm = controller.bqm
+    source = list(bqm.quadratic) + [(v, v) for v in bqm.variables]
+
+    embedding = minorminer.find_embedding(source, target.edges, **params)
+    if bqm.num_variables and not embedding:
+        raise ValueError('embedding was not found')
+
+    lengths = [len(chain) for chain in embedding.values()]
+    return {'max_chain': max(lengths, default=0), 'mean_chain': float(np.mean(lengths)) if lengths else 0.0,
+            'physical_qubits': sum(lengths)}
+
+
+def _build_add(length: int, strategy: str) -> ArithmeticController:
+    controller = ArithmeticController(buffered=True)
+    a, b, c = controller.get_bits(length, length, length + 1)
+    controller.add(a, b, c, strategy)
+    return controller
+
+
+def adder_report(length: int, strategies: Iterable[str] = ADD_STRATEGIES) -> Report:
+    """size of length bit addition for each strategy"""
+    return compare(lambda strategy: _build_add(length, strategy), strategies)
+
+
+def adder_benchmark(
+    length: int,
+    strategies: Iterable[str] = ADD_STRATEGIES,
+    target: Optional[nx.Graph] = None,
+    sampler='sa',
+    **params,
+) -> dict[str, dict[str, float]]:
+    """size, ground state success rate of sampler and chain length on target(skipped if None) for each strategy
+    inputs are left free, so any sample on zero energy is a correct addition"""
+    result = {}
+    for strategy in strategies:
+        controller = _build_add(length, strategy)
+
+        result[strategy] = {**measure(controller), 'success_rate': success_rate(controller, sampler, **params)}
+        if target is not None:
+            result[strategy].update(chain_lengths(controller, target))
+
+    return result
+
+
+def multiply_report(length: int, strategies: Iterable[str] = MULTIPLY_STRATEGIES) -> Report:
+    """size of length x length bit multiplication for each strategy"""
+    def build(strategy: str) -> BaseController:
+        controller = ArithmeticController(buffered=True)
+        a, b, c = controller.get_bits(length, length, 2 * length)
+        controller.multiply(a, b, c, strategy)
+        return controller
+
+    return compare(build, strategies)
+
+
+def square_report(length: int, strategies: Iterable[str] = SQUARE_STRATEGIES) -> Report:
+    """size of length bit square for each strategy"""
+    def build(strategy: str) -> BaseController:
+        controller = ArithmeticController(buffered=True)
+        a, c = controller.get_bits(length, 2 * length)
+        controller.square(a, c, strategy)
+        return controller
+
+    return compare(build, strategies)
+
+
+def reduction_report(P: int, strategies: Iterable[str] = (*REDUCTION_STRATEGIES, 'montgomery')) -> Report:
+    """size of one mult_modp for each reduction strategy, montgomery measures mont_mult_modp"""
+    def build(strategy: str) -> BaseController:
+        controller = ModuloController(P, buffered=True)
+        a, b, c = controller.get_bits(*[controller.length] * 3)
+
+        if strategy == 'montgomery':
+            controller.mont_mult_modp(a, b, c)
+        else:
+            controller.reduction_strategy = strategy
+            controller.mult_modp(a, b, c)
+
+        return controller
+
+    return compare(build, strategies)
+
+
+def gadget_report(name: str) -> dict[str, dict[str, float]]:
+    """ancillas, couplers and gap after scaling to QPU range of every encoding of gadget"""
+    return {gate.name: {'ancillas': gate.n_ancillas,
+                        'couplers': len(gate.penalty.quadratic),
+                        'scaled_gap': gadgets.scaled_gap(gate.penalty)}
+            for gate in gadgets.GADGETS[name]}
+
+
+def ecc_multiply_report(P: int, G_DOUBLES: list[PointConst], windows: Iterable[int] = (1, 2, 3, 4)) -> Report:
+    """size of ecc_multiply for each window, signed measures window 1 with signed digits"""
+    def build(strategy: str) -> BaseController:
+        controller = EccController(P, buffered=True)
+        key, out_point = controller.get_bit(controller.length), controller.new_point()
+
+        if strategy == 'signed':
+            controller.ecc_multiply(G_DOUBLES, key, out_point, signed=True)
+        else:
+            controller.ecc_multiply(G_DOUBLES, key, out_point, int(strategy))
+
+        return controller
+
+    return compare(build, [*map(str, windows), 'signed'])
@@ -0,0 +1,5 @@
+from .registry import SAMPLERS, register_sampler, get_backend
+from .pool import PoolSampler
+from .gray import GrayCodeSolver
+from .elimination import EliminationSolver, min_fill_order
+from .decomposition import DecompositionSolver, block_levels
@@ -0,0 +1,282 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Hashable, Optional, Sequence, Union
+import os
+
+import dimod
+import numpy as np
+import scipy.sparse as sp
+from dimod.binary import BinaryQuadraticModel
+from dimod.sampleset import SampleSet
+from dimod.vartypes import Vartype
+
+from ecc.solvers.registry import get_backend, register_sampler
+from ecc.utilities.bqm_arrays import BQMArrays
+from ecc.utilities.bqm_template import Binding, BQMTemplate
+
+
+# lowest states listed for a block by exact samplers that can't draw one of them
+BLOCK_DEGENERACY = 64
+
+# terms of bqm as (u, v, bias, owner), linear term has u == v and owner is the block term belongs to
+Terms = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _solve_block(binding: Binding, sampler: Union[str, dimod.Sampler], params: dict, seed: int) -> np.ndarray:
+    """lowest state of block found by sampler in binding's labels order, ties are broken randomly"""
+    bqm = binding.to_bqm()
+    if isinstance(sampler, str):
+        sampler = get_backend(sampler)
+
+    # one state is used, so exact samplers don't list every lowest state of degenerate blocks
+    params = dict(params)
+    if 'max_degeneracy' in sampler.parameters:
+        if 'num_reads' in sampler.parameters:
+            params.setdefault('num_reads', 1)
+            params.setdefault('seed', seed)
+        else:
+            params.setdefault('max_degeneracy', BLOCK_DEGENERACY)
+
+    lowest = sampler.sample(bqm, **params).lowest()
+    states = binding.to_samples(lowest)
+
+    return states[np.random.default_rng(seed).integers(len(states))]
+
+
+def block_levels(block_of: np.ndarray, u: np.ndarray, v: np.ndarray, n_blocks: int) -> list[list[int]]:
+    """blocks grouped by level, level of block is one more than level of its highest earlier neighbor
+    blocks of a level don't read each other, so they can be sampled at once
+    block_of gives block of every variable, u and v are interactions"""
+    a, b = block_of[u], block_of[v]
+    earlier, later = np.minimum(a, b), np.maximum(a, b)
+    cut = earlier != later
+
+    parents: list[set[int]] = [set() for _ in range(n_blocks)]
+    for p, c in zip(earlier[cut].tolist(), later[cut].tolist()):
+        parents[c].add(p)
+
+    level = [0] * n_blocks
+    for block in range(n_blocks):
+        level[block] = max((level[p] + 1 for p in parents[block]), default=0)
+
+    groups: list[list[int]] = [[] for _ in range(max(level, default=-1) + 1)]
+    for block, i in enumerate(level):
+        groups[i].append(block)
+
+    return groups
+
+
+class DecompositionSolver(dimod.Sampler):
+    """solves bqm block by block like stages of a circuit, variables out of the subproblem are fixed on current state
+    every term belongs to one block, given by parts or to the later block of its variables
+    forward pass samples each block on its own terms, so values are passed to later blocks like a simulation
+    backward pass samples each block and earlier variables it reads on terms of it and later blocks,
+    so values wanted by later blocks are passed back
+    blocks of a level and every initial state are sampled at once on multiple processes,
+    backward pass goes one block at a time since blocks of a level may read and change same earlier variable
+    energy after every pass is stored on info['energies']"""
+
+    parameters = {'blocks': [], 'parts': [], 'child_params': [], 'max_sweeps': [], 'initial_states': [],
+                  'target': [], 'block_size': [], 'seed': []}
+
+    def __init__(self, child: Union[str, dimod.Sampler] = 'elimination', processes: int = 1) -> None:
+        self.child = child
+        self.processes = processes or os.cpu_count() or 1
+
+    @property
+    def properties(self) -> dict:
+        return {'child': self.child, 'processes': self.processes}
+
+    def sample(
+        self,
+        bqm: BinaryQuadraticModel,
+        blocks: Optional[Sequence[Sequence[Hashable]]] = None,
+        parts: Optional[Sequence[BinaryQuadraticModel]] = None,
+        child_params: Optional[dict] = None,
+        max_sweeps: int = 10,
+        initial_states=None,
+        target: Optional[float] = None,
+        block_size: int = 16,
+        seed: Optional[int] = None,
+    ) -> SampleSet:
+        """blocks are variables of each subproblem in order, variables not in any block form the last one
+        blocks of block_size variables in order of bqm are used if not given
+        parts are terms of each block, their sum should be bqm, child_params are passed to child
+        passes go on until energy reaches target, lowest state found from every initial state is returned"""
+        arrays = BQMArrays.from_bqm(bqm.binary)
+        n = arrays.num_variables
+
+        columns = self._columns(arrays, blocks, block_size)
+        block_of = np.empty(n, dtype=np.int64)
+        for i, block in enumerate(columns):
+            block_of[block] = i
+
+        if parts is not None and len(parts) != len(columns):
+            raise ValueError("parts should be given for every block")
+
+        terms = self._terms(arrays, block_of) if parts is None else self._part_terms(arrays, parts)
+        u, v, _, owner = terms
+        incidence = sp.csr_matrix(
+            (np.ones(2 * len(u)), (np.concatenate([u, v]), np.tile(np.arange(len(u)), 2))), shape=(n, len(u)))
+
+        forward, backward = [], []
+        for i, block in enumerate(columns):
+            forward.append(self._template(terms, incidence, block, owner == i))
+
+            # earlier variables read by terms of block
+            own = np.unique(incidence[block].indices)
+            own = own[owner[own] == i]
+            read = np.unique(np.concatenate([u[own], v[own]]))
+            read = read[block_of[read] < i]
+
+            backward.append(self._template(terms, incidence, np.union1d(block, read), owner >= i))
+
+        # blocks of a level read only earlier blocks, but backward templates change what they read
+        single = [[i] for i in range(len(columns))]
+        levels = block_levels(block_of, u, v, len(columns)) if self.processes > 1 else single
+
+        states = self._initial_states(arrays, bqm, initial_states)
+        rng = np.random.default_rng(seed)
+        params = child_params or {}
+
+        energies = arrays.energies(states)
+        best, best_energies = states.copy(), energies.copy()
+        history = [[float(e)] for e in energies]
+
+        executor: Optional[Executor] = None
+        if self.processes > 1 and (len(states) > 1 or any(len(level) > 1 for level in levels)):
+            executor = ProcessPoolExecutor(self.processes)
+
+        try:
+            for sweep in range(max_sweeps):
+                active = np.arange(len(states)) if target is None else \
+                    np.flatnonzero(best_energies > target + 1e-9)
+                if not len(active):
+                    break
+
+                templates, order = (forward, levels) if sweep % 2 == 0 else (backward, single[::-1])
+                for level in order:
+                    jobs = [(read, block) for read in active.tolist() for block in level]
+                    bindings = [templates[block][0].bind(states[read, templates[block][1]].tolist())
+                                for read, block in jobs]
+
+                    seeds = rng.integers(2**31, size=len(jobs)).tolist()
+                    args = (bindings, [self.child] * len(jobs), [params] * len(jobs), seeds)
+                    results = executor.map(_solve_block, *args) if executor is not None and len(jobs) > 1 \
+                        else map(_solve_block, *args)
+
+                    for (read, block), new in zip(jobs, results):
+                        states[read, templates[block][2]] = new
+
+                energies = arrays.energies(states)
+                for read in active.tolist():
+                    history[read].append(float(energies[read]))
+
+                lower = energies < best_energies
+                best[lower], best_energies[lower] = states[lower], energies[lower]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if bqm.vartype is Vartype.SPIN:
+            best = 2 * best - 1
+
+        sampleset = SampleSet.from_samples_bqm((best, arrays.labels), bqm)
+        sampleset.info['energies'] = history[0] if len(history) == 1 else history
+
+        return sampleset
+
+    @staticmethod
+    def _columns(arrays: BQMArrays, blocks: Optional[Sequence[Sequence[Hashable]]], block_size: int) -> list[np.ndarray]:
+        n = arrays.num_variables
+        if blocks is None:
+            return [np.arange(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+
+        columns, seen = [], np.zeros(n, dtype=bool)
+        for block in blocks:
+            index = arrays.index(block)
+            index = index[index >= 0]
+            if seen[index].any():
+                raise ValueError("variable is in more than one block")
+
+            seen[index] = True
+            if len(index):
+                columns.append(index)
+
+        if not seen.all():
+            columns.append(np.flatnonzero(~seen))
+
+        return columns
+
+    @staticmethod
+    def _terms(arrays: BQMArrays, block_of: np.ndarray) -> Terms:
+        """linear term belongs to block of its variable, interaction to later block of its variables"""
+        row, col, biases = arrays.coo()
+        diagonal = np.arange(arrays.num_variables)
+
+        return (np.concatenate([diagonal, row]), np.concatenate([diagonal, col]),
+                np.concatenate([arrays.linear, biases]),
+                np.concatenate([block_of, np.maximum(block_of[row], block_of[col])]))
+
+    @staticmethod
+    def _part_terms(arrays: BQMArrays, parts: Sequence[BinaryQuadraticModel]) -> Terms:
+        """every term of part i belongs to block i, terms on variables not in bqm are left out"""
+        terms = []
+        for i, part in enumerate(parts):
+            linear, (row, col, biases), _, labels = part.binary.to_numpy_vectors(return_labels=True)
+            index = arrays.index(labels)
+            diagonal = np.arange(len(labels))
+
+            u = index[np.concatenate([diagonal, row]).astype(np.int64)]
+            v = index[np.concatenate([diagonal, col]).astype(np.int64)]
+            bias = np.concatenate([linear, biases])
+            keep = (u >= 0) & (v >= 0)
+
+            terms.append((u[keep], v[keep], bias[keep], np.full(keep.sum(), i, dtype=np.int64)))
+
+        return tuple(np.concatenate(t) for t in zip(*terms))
+
+    @staticmethod
+    def _template(terms: Terms, incidence: sp.csr_matrix, free: np.ndarray, selected: np.ndarray
+                  ) -> tuple[BQMTemplate, np.ndarray, np.ndarray]:
+        """template on selected terms of free variables, inputs are other variables of those terms
+        returns template, columns of its inputs and columns of its free variables in template's order"""
+        u, v, biases, _ = terms
+
+        ids = np.unique(incidence[free].indices)
+        ids = ids[selected[ids]]
+        u, v, biases = u[ids], v[ids], biases[ids]
+
+        sub = np.union1d(free, np.concatenate([u, v]))
+        a, b = np.searchsorted(sub, np.minimum(u, v)), np.searchsorted(sub, np.maximum(u, v))
+        linear = a == b
+
+        h = np.bincount(a[linear], biases[linear], minlength=len(sub))
+        Q = sp.csr_matrix((biases[~linear], (a[~linear], b[~linear])), shape=(len(sub), len(sub)))
+
+        boundary = np.setdiff1d(sub, free)
+        template = BQMTemplate(BQMArrays(sub.tolist(), h, Q, 0), [boundary.tolist()])
+
+        return template, boundary, np.array(template.labels, dtype=np.int64)
+
+    @staticmethod
+    def _initial_states(arrays: BQMArrays, bqm: BinaryQuadraticModel, initial_states) -> np.ndarray:
+        """binary (reads, variables) array in order of arrays, one state of zeros if not given"""
+        n = arrays.num_variables
+        if initial_states is None:
+            return np.zeros((1, n), dtype=np.int8)
+
+        initial, labels = dimod.as_samples(initial_states)
+        if not len(initial):
+            return np.zeros((1, n), dtype=np.int8)
+
+        if bqm.vartype is Vartype.SPIN:
+            initial = (initial + 1) // 2
+
+        index = arrays.index(labels)
+        states = np.zeros((len(initial), n), dtype=np.int8)
+        states[:, index[index >= 0]] = initial[:, index >= 0]
+
+        return states
+
+
+register_sampler('decomposition', DecompositionSolver)
@@ -0,0 +1,179 @@
+from typing import Optional
+import heapq
+
+import dimod
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+from dimod.sampleset import SampleSet
+from dimod.vartypes import Vartype
+
+from ecc.solvers.registry import register_sampler
+
+
+def min_fill_order(n: int, edges: np.ndarray) -> list[int]:
+    """elimination order choosing the variable that adds fewest edges between its neighbors, ties by degree"""
+    adj: list[set[int]] = [set() for _ in range(n)]
+    for u, v in edges.tolist():
+        if u != v:
+            adj[u].add(v)
+            adj[v].add(u)
+
+    def fill(v: int) -> tuple[int, int]:
+        nbrs = adj[v]
+        d = len(nbrs)
+        edges = sum(len(adj[u] & nbrs) for u in nbrs) // 2
+        return d * (d - 1) // 2 - edges, d
+
+    # only scores of neighbors of eliminated variable are updated, old entries of heap are skipped
+    score = [fill(v) for v in range(n)]
+    heap = [(*score[v], v) for v in range(n)]
+    heapq.heapify(heap)
+
+    eliminated = [False] * n
+    order = []
+    while heap:
+        *s, v = heapq.heappop(heap)
+        if eliminated[v] or tuple(s) != score[v]:
+            continue
+
+        eliminated[v] = True
+        order.append(v)
+
+        nbrs = list(adj[v])
+        for i, u in enumerate(nbrs):
+            adj[u].discard(v)
+            for w in nbrs[i + 1:]:
+                adj[u].add(w)
+                adj[w].add(u)
+
+        for u in nbrs:
+            score[u] = fill(u)
+            heapq.heappush(heap, (*score[u], u))
+
+    return order
+
+
+class EliminationSolver(dimod.Sampler):
+    """exact solver using bucket elimination, time and memory grows with 2**width of elimination order
+    instead of 2**number of variables, so long chains like adders can be solved on large widths
+    returns lowest states(at most max_degeneracy) and stores their number on info['degeneracy']
+    if num_reads is given, that many lowest states are drawn uniformly at random instead of listing them"""
+
+    parameters = {'max_degeneracy': [], 'max_width': [], 'atol': [], 'num_reads': [], 'seed': []}
+    properties = {}
+
+    def sample(
+        self,
+        bqm: BinaryQuadraticModel,
+        max_degeneracy: Optional[int] = None,
+        max_width: int = 24,
+        atol: float = 1e-9,
+        num_reads: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> SampleSet:
+        labels = list(bqm.variables)
+        n = len(labels)
+
+        h, (row, col, biases), offset = bqm.binary.to_numpy_vectors(labels)
+
+        order = min_fill_order(n, np.stack([row, col], axis=1))
+        position = np.empty(n, dtype=np.int64)
+        position[order] = np.arange(n)
+
+        # factor is (scope sorted by position, energies, counts), kept on bucket of its first variable
+        buckets: list[list] = [[] for _ in range(n)]
+        for v in range(n):
+            buckets[position[v]].append(((v,), np.array([0, h[v]]), np.ones(2)))
+
+        for u, v, bias in zip(row.tolist(), col.tolist(), biases.tolist()):
+            if position[u] > position[v]:
+                u, v = v, u
+            buckets[position[u]].append(
+                ((u, v), np.array([[0, 0], [0, bias]]), np.ones((2, 2))))
+
+        count = 1.0
+        tables = []
+        for v in order:
+            factors = buckets[position[v]]
+            scope = sorted({u for s, _, _ in factors for u in s},
+                           key=lambda u: position[u])
+            if len(scope) > max_width:
+                raise ValueError(
+                    f"width of elimination is larger than {max_width}")
+
+            energy, counts = np.zeros((1,) * len(scope)), np.ones((1,) * len(scope))
+            for s, e, c in factors:
+                shape = [2 if u in s else 1 for u in scope]
+                energy = energy + e.reshape(shape)
+                counts = counts * c.reshape(shape)
+
+            tables.append((scope, energy, counts))
+
+            # minimize over v, count every state reaching minimum
+            lowest = energy.min(axis=0)
+            counts = np.where(energy <= lowest + atol, counts, 0).sum(axis=0)
+
+            if len(scope) > 1:
+                buckets[position[scope[1]]].append(
+                    (tuple(scope[1:]), lowest, counts))
+            else:
+                offset += float(lowest)
+                count *= float(counts)
+
+        if num_reads is not None:
+            samples = self._draw(tables, n, num_reads, seed, atol)
+        else:
+            samples = self._branch(tables, n, max_degeneracy, atol)
+
+        samples = np.array(samples, dtype=np.int8).reshape(-1, n)
+        if bqm.vartype is Vartype.SPIN:
+            samples = 2 * samples - 1
+
+        sampleset = SampleSet.from_samples_bqm((samples, labels), bqm)
+        sampleset.info['degeneracy'] = int(count)
+
+        return sampleset
+
+    @staticmethod
+    def _draw(tables: list, n: int, num_reads: int, seed: Optional[int], atol: float) -> list[np.ndarray]:
+        """assign in reverse order of elimination, value is chosen by number of lowest states reached by it"""
+        rng = np.random.default_rng(seed)
+
+        samples = []
+        for _ in range(num_reads):
+            x = np.zeros(n, dtype=np.int8)
+            for scope, energy, counts in reversed(tables):
+                index = (slice(None), *x[scope[1:]])
+                values = energy[index]
+                weights = np.where(values <= values.min() + atol, counts[index], 0)
+
+                x[scope[0]] = rng.random() * weights.sum() >= weights[0]
+
+            samples.append(x)
+
+        return samples
+
+    @staticmethod
+    def _branch(tables: list, n: int, max_degeneracy: Optional[int], atol: float) -> list[np.ndarray]:
+        """assign in reverse order of elimination, branching on every value reaching minimum"""
+        samples = []
+        stack = [(n - 1, np.zeros(n, dtype=np.int8))]
+        while stack and (max_degeneracy is None or len(samples) < max_degeneracy):
+            i, x = stack.pop()
+            if i < 0:
+                samples.append(x)
+                continue
+
+            scope, energy, _ = tables[i]
+            values = energy[(slice(None), *x[scope[1:]])]
+
+            for value in (1, 0):
+                if values[value] <= values.min() + atol:
+                    y = x.copy() if value else x
+                    y[scope[0]] = value
+                    stack.append((i - 1, y))
+
+        return samples
+
+
+register_sampler('elimination', EliminationSolver)
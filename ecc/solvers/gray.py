@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import os
+
+import dimod
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+from dimod.sampleset import SampleSet
+from dimod.vartypes import Vartype
+
+from ecc.solvers.registry import register_sampler
+
+
+def _enumerate(n: int) -> np.ndarray:
+    """every assignment of n bits as (2**n, n) array, row i is bits of i"""
+    return ((np.arange(2**n)[:, None] >> np.arange(n)) & 1).astype(np.int8)
+
+
+def _solve_block(
+    h: np.ndarray,
+    Q: np.ndarray,
+    offset: float,
+    lanes: np.ndarray,
+    gray: np.ndarray,
+    prefix: np.ndarray,
+    prefix_value: int,
+    atol: float,
+    max_degeneracy: Optional[int],
+) -> tuple[float, np.ndarray, int]:
+    """lowest states where prefix variables are fixed to bits of prefix_value
+    lane variables are enumerated at once, gray variables are walked in gray code order flipping one bit per step
+    returns lowest energy, lowest states(at most max_degeneracy) and number of lowest states"""
+    n = len(h)
+
+    # fix prefix variables
+    x_prefix = ((prefix_value >> np.arange(len(prefix))) & 1).astype(np.float64)
+    offset = offset + x_prefix @ h[prefix] + \
+        0.5 * x_prefix @ Q[np.ix_(prefix, prefix)] @ x_prefix
+    h = h + Q[:, prefix] @ x_prefix
+
+    X = _enumerate(len(lanes)).astype(np.float64)
+    Q_lanes = Q[np.ix_(lanes, lanes)]
+    energy = offset + X @ h[lanes] + 0.5 * np.einsum('ij,ij->i', X, X @ Q_lanes)
+
+    # field on gray variables from lane variables, changes only by gray variables after this
+    field = np.ascontiguousarray((h[gray] + X @ Q[np.ix_(lanes, gray)]).T)
+    Q_gray = Q[np.ix_(gray, gray)]
+    inner = np.zeros(len(gray))
+    x_gray = np.zeros(len(gray), dtype=np.int8)
+
+    best = np.inf
+    found: list[tuple[np.ndarray, np.ndarray]] = []
+    n_found = count = 0
+
+    for step in range(2**len(gray)):
+        if step:
+            i = (step & -step).bit_length() - 1
+            d = 1 - 2 * int(x_gray[i])
+
+            energy += d * (field[i] + inner[i])
+            inner += d * Q_gray[i]
+            x_gray[i] ^= 1
+
+        lowest = energy.min()
+        if lowest < best - atol:
+            best, found, n_found, count = lowest, [], 0, 0
+
+        if lowest <= best + atol:
+            hit = np.flatnonzero(energy <= best + atol)
+            count += len(hit)
+
+            if max_degeneracy is None or n_found < max_degeneracy:
+                found.append((hit, x_gray.copy()))
+                n_found += len(hit)
+
+    states = np.zeros((n_found, n), dtype=np.int8)
+    row = 0
+    for hit, x in found:
+        states[row:row + len(hit), lanes] = X[hit]
+        states[row:row + len(hit), gray] = x
+        row += len(hit)
+    states[:, prefix] = x_prefix
+
+    if max_degeneracy is not None:
+        states = states[:max_degeneracy]
+
+    return float(best), states, count
+
+
+class GrayCodeSolver(dimod.Sampler):
+    """exact solver returning only the lowest energy states, memory is bounded by 2**lane_bits states
+    state space is split into blocks by fixing prefix variables, blocks can be solved on multiple processes
+    number of lowest states is stored on info['degeneracy'] even if they are not all returned"""
+
+    parameters = {'lane_bits': [], 'max_degeneracy': [], 'processes': [], 'atol': []}
+    properties = {}
+
+    def sample(
+        self,
+        bqm: BinaryQuadraticModel,
+        lane_bits: int = 16,
+        max_degeneracy: Optional[int] = None,
+        processes: int = 1,
+        atol: float = 1e-9,
+    ) -> SampleSet:
+        labels = list(bqm.variables)
+        n = len(labels)
+
+        binary = bqm.binary
+        h, (row, col, biases), offset = binary.to_numpy_vectors(labels)
+
+        Q = np.zeros((n, n))
+        np.add.at(Q, (row, col), biases)
+        Q = Q + Q.T
+
+        n_lanes = min(n, lane_bits)
+        n_prefix = min(n - n_lanes, (max(1, processes) - 1).bit_length())
+
+        order = np.arange(n)
+        lanes, gray, prefix = order[:n_lanes], order[n_lanes:n - n_prefix], order[n - n_prefix:]
+
+        args = [(h, Q, offset, lanes, gray, prefix, value, atol, max_degeneracy)
+                for value in range(2**n_prefix)]
+
+        if len(args) > 1:
+            with ProcessPoolExecutor(min(len(args), processes or os.cpu_count())) as executor:
+                results = list(executor.map(_solve_block, *zip(*args)))
+        else:
+            results = [_solve_block(*args[0])]
+
+        best = min(energy for energy, _, _ in results)
+        lowest = [(states, count) for energy, states, count in results
+                  if energy <= best + atol]
+
+        samples = np.concatenate([states for states, _ in lowest])
+        if max_degeneracy is not None:
+            samples = samples[:max_degeneracy]
+
+        if bqm.vartype is Vartype.SPIN:
+            samples = 2 * samples - 1
+
+        sampleset = SampleSet.from_samples_bqm((samples, labels), bqm)
+        sampleset.info['degeneracy'] = sum(count for _, count in lowest)
+
+        return sampleset
+
+
+register_sampler('gray', GrayCodeSolver)
@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import os
+
+import dimod
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+from dimod.sampleset import SampleSet
+
+from ecc.solvers.registry import get_backend, register_sampler
+
+
+def _sample_chunk(child: str, bqm: BinaryQuadraticModel, params: dict) -> SampleSet:
+    return get_backend(child).sample(bqm, **params)
+
+
+class PoolSampler(dimod.Sampler):
+    """runs independent reads of a registered sampler on a pool of processes
+    reads are split evenly, each process gets its own seed and its share of initial states"""
+
+    def __init__(self, child: str = 'sa', processes: Optional[int] = None) -> None:
+        self.child = child
+        self.processes = processes or os.cpu_count() or 1
+
+    @property
+    def parameters(self) -> dict:
+        return {'num_reads': [], 'seed': [], 'initial_states': [],
+                **get_backend(self.child).parameters}
+
+    @property
+    def properties(self) -> dict:
+        return {'child': self.child, 'processes': self.processes}
+
+    def sample(self, bqm: BinaryQuadraticModel, num_reads: int = 1, seed: Optional[int] = None, **params) -> SampleSet:
+        n_chunks = max(1, min(self.processes, num_reads))
+        bounds = np.linspace(0, num_reads, n_chunks + 1).astype(int)
+
+        if seed is None:
+            seed = int(np.random.randint(2**31))
+
+        initial_states = params.pop('initial_states', None)
+        if initial_states is not None:
+            states, labels = dimod.as_samples(initial_states)
+
+        chunks = []
+        for i in range(n_chunks):
+            start, end = bounds[i], bounds[i + 1]
+            chunk = dict(params, num_reads=int(end - start), seed=seed + i)
+
+            if initial_states is not None:
+                # every read starts from its own state if there are enough, else all of them are given
+                chunk['initial_states'] = (
+                    states[start:end] if len(states) >= num_reads else states, labels)
+
+            chunks.append(chunk)
+
+        if n_chunks == 1:
+            return _sample_chunk(self.child, bqm, chunks[0])
+
+        with ProcessPoolExecutor(n_chunks) as executor:
+            results = list(executor.map(
+                _sample_chunk, [self.child] * n_chunks, [bqm] * n_chunks, chunks))
+
+        return dimod.concatenate(results)
+
+
+register_sampler('parallel', PoolSampler)
@@ -0,0 +1,28 @@
+from typing import Callable
+
+import dimod
+from dwave.samplers import SimulatedAnnealingSampler, SteepestDescentSolver, TabuSampler
+
+
+# factory of every sampler that can be chosen by name, all of them run locally except dwave
+SAMPLERS: dict[str, Callable[..., dimod.Sampler]] = {
+    'exact': dimod.ExactSolver,
+    'random': dimod.RandomSampler,
+    'sa': SimulatedAnnealingSampler,
+    'tabu': TabuSampler,
+    'steepest': SteepestDescentSolver,
+}
+
+
+def register_sampler(name: str, factory: Callable[..., dimod.Sampler]) -> None:
+    """add sampler factory to registry, existing name is replaced"""
+    SAMPLERS[name] = factory
+
+
+def get_backend(name: str, **kwargs) -> dimod.Sampler:
+    """create sampler registered by name, kwargs are passed to its factory"""
+    if name not in SAMPLERS:
+        raise ValueError(
+            f"sampler {name} is not registered, choose from {sorted(SAMPLERS)}")
+
+    return SAMPLERS[name](**kwargs)
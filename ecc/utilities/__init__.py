@@ -1,2 +1,8 @@
 from .ecc_double import ecc_double
-from .number_to_binary import number_to_binary
+from .curve import Curve, SECP256K1, batch_inverse, scalar_multiply
+from .number_to_binary import number_to_binary, binary_to_number
+from .bqm_builder import BQMBuilder, Penalty
+from .bqm_arrays import BQMArrays
+from .embedding_cache import EmbeddingCache, structure_hash
+from .array_file import save_arrays, load_arrays
+from .bqm_template import BQMTemplate, Binding
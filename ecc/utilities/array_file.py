@@ -0,0 +1,72 @@
+from typing import Any
+import json
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b'ECCARRAY'
+# arrays start on multiples of this so they can be memory mapped with any dtype
+ALIGNMENT = 64
+
+_HEADER = struct.Struct('<8sQ')
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+def save_arrays(path: str, arrays: dict[str, np.ndarray], meta: dict[str, Any]) -> None:
+    """store arrays and json serializable meta in one file
+    file is json header followed by raw buffer of every array, header has dtype, shape and offset of each"""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    for name, a in arrays.items():
+        if a.dtype.hasobject:
+            raise ValueError(f"array {name} has python objects")
+
+    entries, offset = {}, 0
+    for name, a in arrays.items():
+        entries[name] = {'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset}
+        offset = _align(offset + a.nbytes)
+
+    header = json.dumps({'meta': meta, 'arrays': entries}).encode()
+    start = _align(_HEADER.size + len(header))
+
+    # write to temporary file first so partially written file is never read
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+
+        for name, a in arrays.items():
+            f.seek(start + entries[name]['offset'])
+            f.write(a.tobytes())
+
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def load_arrays(path: str, mmap: bool = True) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+    """arrays and meta stored by save_arrays
+    when mmap, arrays are read only memory maps of the file and are read from disk only when used"""
+    with open(path, 'rb') as f:
+        magic, size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an array file")
+
+        header = json.loads(f.read(size))
+        start = _align(_HEADER.size + size)
+
+        arrays = {}
+        for name, entry in header['arrays'].items():
+            dtype, shape = np.dtype(entry['dtype']), tuple(entry['shape'])
+            count = int(np.prod(shape))
+
+            if mmap and count:
+                arrays[name] = np.memmap(f, dtype, 'r', start + entry['offset'], shape)
+            else:
+                f.seek(start + entry['offset'])
+                arrays[name] = np.fromfile(f, dtype, count).reshape(shape)
+
+    return arrays, header['meta']
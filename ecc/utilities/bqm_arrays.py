@@ -0,0 +1,121 @@
+from typing import Hashable, Optional, Sequence, Union
+
+import numpy as np
+import scipy.sparse as sp
+from dimod.binary import BinaryQuadraticModel
+from dimod.sampleset import SampleSet
+from dimod.vartypes import Vartype
+
+
+class BQMArrays:
+    """BinaryQuadraticModel stored as numpy arrays, variables are indexed densely in labels order
+    quadratic biases are stored as sparse upper triangular matrix"""
+
+    def __init__(
+        self,
+        labels: list[Hashable],
+        linear: np.ndarray,
+        quadratic: sp.csr_matrix,
+        offset: float,
+    ) -> None:
+        self.labels = labels
+        self.linear = linear
+        self.quadratic = quadratic
+        self.offset = offset
+
+        # built on first use, arrays made for every binding of a template don't need it
+        self._index: Optional[dict[Hashable, int]] = None
+
+    @classmethod
+    def from_bqm(cls, bqm: BinaryQuadraticModel) -> 'BQMArrays':
+        linear, quadratic, offset, labels = bqm.to_numpy_vectors(
+            return_labels=True)
+
+        return cls.from_vectors(list(labels), linear, quadratic, offset)
+
+    @classmethod
+    def from_vectors(
+        cls,
+        labels: list[Hashable],
+        linear: np.ndarray,
+        quadratic: tuple[np.ndarray, np.ndarray, np.ndarray],
+        offset: float,
+    ) -> 'BQMArrays':
+        """arrays from vectors given by BinaryQuadraticModel.to_numpy_vectors"""
+        row, col, biases = quadratic
+
+        n = len(labels)
+        u, v = np.minimum(row, col), np.maximum(row, col)
+        quadratic = sp.csr_matrix((biases, (u, v)), shape=(n, n))
+
+        return cls(labels, np.asarray(linear, dtype=np.float64), quadratic, float(offset))
+
+    @property
+    def num_variables(self) -> int:
+        return len(self.labels)
+
+    def coo(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """quadratic biases as (row, col, bias)"""
+        coo = self.quadratic.tocoo()
+        return coo.row, coo.col, coo.data
+
+    def to_bqm(self) -> BinaryQuadraticModel:
+        row, col, biases = self.coo()
+        return BinaryQuadraticModel.from_numpy_vectors(
+            self.linear, (row, col, biases), self.offset, Vartype.BINARY, variable_order=list(self.labels))
+
+    def index(self, labels: Sequence[Hashable]) -> np.ndarray:
+        """column of each label, -1 if label is not a variable of bqm"""
+        if self._index is None:
+            self._index = {v: i for i, v in enumerate(self.labels)}
+
+        get = self._index.get
+        return np.array([get(v, -1) for v in labels], dtype=np.int64)
+
+    def to_samples(self, sampleset: SampleSet) -> np.ndarray:
+        """samples of sampleset as (number of samples, number of variables) array in labels order"""
+        columns = self.index(sampleset.variables)
+        if (columns < 0).any():
+            raise ValueError("sampleset has variables not in bqm")
+
+        record = sampleset.record.sample
+        samples = np.zeros((len(record), self.num_variables), dtype=np.int8)
+        samples[:, columns] = record
+
+        return samples
+
+    def energies(self, samples: Union[np.ndarray, SampleSet]) -> np.ndarray:
+        """energy of every sample, calculated with one sparse matrix product"""
+        if isinstance(samples, SampleSet):
+            samples = self.to_samples(samples)
+
+        x = np.asarray(samples, dtype=np.float64)
+        interaction = (self.quadratic @ x.T).T
+
+        return self.offset + x @ self.linear + np.einsum('ij,ij->i', x, interaction)
+
+    def is_ground(self, samples: Union[np.ndarray, SampleSet], energy: float = 0, atol: float = 1e-9) -> np.ndarray:
+        """true for samples that has given ground state energy"""
+        return np.abs(self.energies(samples) - energy) <= atol
+
+    @staticmethod
+    def decode(samples: np.ndarray, columns: np.ndarray, fill: Optional[np.ndarray] = None) -> np.ndarray:
+        """value of a variable for every sample, bit i is taken from column i of samples
+        columns that are -1 are taken from fill(0 if not given)
+        returns uint64 array if variable fits, else array of python ints"""
+        columns = np.asarray(columns, dtype=np.int64)
+        missing = columns < 0
+
+        # only present columns are read, samples may have no columns when every variable is fixed
+        bits = np.zeros((len(samples), len(columns)), dtype=np.uint8)
+        bits[:, ~missing] = samples[:, columns[~missing]]
+        if missing.any():
+            fill = np.zeros(len(columns), dtype=np.uint8) if fill is None else fill
+            bits[:, missing] = np.asarray(fill, dtype=np.uint8)[missing]
+
+        if len(columns) <= 64:
+            weights = np.left_shift(np.uint64(1), np.arange(len(columns), dtype=np.uint64))
+            return (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+        packed = np.packbits(bits, axis=1, bitorder='little')
+        return np.array([int.from_bytes(row.tobytes(), 'little') for row in packed], dtype=object)
@@ -0,0 +1,171 @@
+from array import array
+from typing import Optional, Sequence
+
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+from dimod.vartypes import Vartype
+
+
+class Penalty:
+    """penalty template of a gate, positions index the bits given to the gate"""
+
+    def __init__(
+        self,
+        linear: Sequence[tuple[int, float]],
+        quadratic: Sequence[tuple[int, int, float]],
+        offset: float = 0,
+    ) -> None:
+        self.linear = tuple(linear)
+        self.quadratic = tuple(quadratic)
+        self.offset = offset
+
+        self.linear_index = tuple(i for i, _ in self.linear)
+        self.linear_biases = array('d', (b for _, b in self.linear))
+        self.quadratic_u_index = tuple(i for i, _, _ in self.quadratic)
+        self.quadratic_v_index = tuple(j for _, j, _ in self.quadratic)
+        self.quadratic_biases = array('d', (b for _, _, b in self.quadratic))
+
+    @property
+    def size(self) -> int:
+        """number of bits the template expects"""
+        positions = [*self.linear_index,
+                     *self.quadratic_u_index, *self.quadratic_v_index]
+        return max(positions) + 1
+
+    def scale(self, multiplier: float) -> 'Penalty':
+        """same penalty with every bias multiplied"""
+        return Penalty(
+            [(i, multiplier * b) for i, b in self.linear],
+            [(i, j, multiplier * b) for i, j, b in self.quadratic],
+            multiplier * self.offset,
+        )
+
+    def energies(self, n: Optional[int] = None) -> np.ndarray:
+        """energy of every state of n bits(size if not given), bit i of state index is position i"""
+        n = self.size if n is None else n
+        x = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+
+        energy = np.full(2**n, float(self.offset))
+        for i, b in self.linear:
+            energy += b * x[:, i]
+        for i, j, b in self.quadratic:
+            energy += b * x[:, i] * x[:, j]
+
+        return energy
+
+    @property
+    def gap(self) -> float:
+        """difference between lowest energy and the next energy level"""
+        levels = np.unique(self.energies())
+        return float(levels[1] - levels[0]) if len(levels) > 1 else 0.0
+
+
+class BQMBuilder:
+    """collects linear and quadratic terms on flat arrays, BinaryQuadraticModel is created once on build"""
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.linear_bits = array('q')
+        self.linear_biases = array('d')
+
+        self.quadratic_u = array('q')
+        self.quadratic_v = array('q')
+        self.quadratic_biases = array('d')
+
+        self.offset = 0
+
+    def __len__(self) -> int:
+        return len(self.linear_bits) + len(self.quadratic_u)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0 or self.offset != 0
+
+    def add_variable(self, bit: int, bias: float = 0) -> None:
+        self.linear_bits.append(bit)
+        self.linear_biases.append(bias)
+
+    def add_quadratic(self, bit1: int, bit2: int, bias: float) -> None:
+        self.quadratic_u.append(bit1)
+        self.quadratic_v.append(bit2)
+        self.quadratic_biases.append(bias)
+
+    def add_offset(self, v: float) -> None:
+        self.offset += v
+
+    def add_penalty(self, penalty: Penalty, bits: Sequence[int]) -> None:
+        """append every term of penalty, placing bits on the template's positions"""
+        get = bits.__getitem__
+
+        self.linear_bits.extend(map(get, penalty.linear_index))
+        self.linear_biases.extend(penalty.linear_biases)
+
+        self.quadratic_u.extend(map(get, penalty.quadratic_u_index))
+        self.quadratic_v.extend(map(get, penalty.quadratic_v_index))
+        self.quadratic_biases.extend(penalty.quadratic_biases)
+
+        self.offset += penalty.offset
+
+    def add_arrays(
+        self,
+        linear_bits: np.ndarray,
+        linear_biases: np.ndarray,
+        u: np.ndarray,
+        v: np.ndarray,
+        quadratic_biases: np.ndarray,
+        offset: float = 0,
+    ) -> None:
+        """append terms given as arrays"""
+        self.linear_bits.frombytes(np.asarray(linear_bits, dtype=np.int64).tobytes())
+        self.linear_biases.frombytes(np.asarray(linear_biases, dtype=np.float64).tobytes())
+
+        self.quadratic_u.frombytes(np.asarray(u, dtype=np.int64).tobytes())
+        self.quadratic_v.frombytes(np.asarray(v, dtype=np.int64).tobytes())
+        self.quadratic_biases.frombytes(np.asarray(quadratic_biases, dtype=np.float64).tobytes())
+
+        self.offset += offset
+
+    def add_bqm(self, bqm: BinaryQuadraticModel) -> None:
+        """append every term of bqm, variables are used as bits"""
+        linear, (row, col, biases), offset, labels = bqm.to_numpy_vectors(
+            return_labels=True)
+        labels = np.asarray(labels, dtype=np.int64)
+
+        self.add_arrays(labels, linear, labels[row], labels[col], biases, offset)
+
+    def build(self, names: Optional[np.ndarray] = None) -> BinaryQuadraticModel:
+        """create BinaryQuadraticModel from collected terms
+        names maps each bit to it's name, collected bits are used as names if not given"""
+        linear_bits = np.frombuffer(self.linear_bits, dtype=np.int64)
+        u = np.frombuffer(self.quadratic_u, dtype=np.int64)
+        v = np.frombuffer(self.quadratic_v, dtype=np.int64)
+        linear_biases = np.frombuffer(self.linear_biases, dtype=np.float64)
+        quadratic_biases = np.frombuffer(self.quadratic_biases, dtype=np.float64)
+
+        if names is not None:
+            linear_bits, u, v = names[linear_bits], names[u], names[v]
+
+        # x*x = x for binary variables, interaction with itself is linear
+        loop = u == v
+        if loop.any():
+            linear_bits = np.concatenate((linear_bits, u[loop]))
+            linear_biases = np.concatenate(
+                (linear_biases, quadratic_biases[loop]))
+            u, v, quadratic_biases = u[~loop], v[~loop], quadratic_biases[~loop]
+
+        labels, index = np.unique(
+            np.concatenate((linear_bits, u, v)), return_inverse=True)
+        n_linear, n_quadratic = len(linear_bits), len(u)
+
+        linear = np.bincount(
+            index[:n_linear], weights=linear_biases, minlength=len(labels))
+        row = index[n_linear:n_linear + n_quadratic]
+        col = index[n_linear + n_quadratic:]
+
+        bqm = BinaryQuadraticModel.from_numpy_vectors(
+            linear, (row, col, quadratic_biases), self.offset, Vartype.BINARY,
+            variable_order=labels.tolist())
+
+        self.clear()
+        return bqm
@@ -0,0 +1,144 @@
+from typing import Hashable, Optional, Sequence, Union
+
+import dimod
+import numpy as np
+import scipy.sparse as sp
+from dimod.sampleset import SampleSet, append_variables
+
+from ecc.solvers.registry import get_backend
+from ecc.types import Constant
+from ecc.utilities.bqm_arrays import BQMArrays
+from ecc.utilities.number_to_binary import number_to_binary
+
+
+def _to_bits(values: Sequence[Constant], length: int) -> np.ndarray:
+    """(len(values), length) array of bits of every value, value is int or list of bits"""
+    if length < 63 and all(isinstance(v, (int, np.integer)) for v in values):
+        values = np.asarray(values, dtype=np.int64)
+        if ((values < 0) | (values >> length != 0)).any():
+            raise ValueError(f"value does not fit on {length} bits")
+
+        return ((values[:, None] >> np.arange(length)) & 1).astype(np.int8)
+
+    rows = []
+    for value in values:
+        bits = number_to_binary(value, length) if isinstance(value, int) else list(value)
+        if len(bits) != length:
+            raise ValueError(f"value does not fit on {length} bits")
+        rows.append(bits)
+
+    return np.array(rows, dtype=np.int8).reshape(len(values), length)
+
+
+class Binding(BQMArrays):
+    """bqm of template with bound variables fixed, quadratic biases and labels are shared with template"""
+
+    def __init__(
+        self,
+        labels: list[Hashable],
+        linear: np.ndarray,
+        quadratic: sp.csr_matrix,
+        offset: float,
+        fixed_labels: list[Hashable],
+        fixed: np.ndarray,
+    ) -> None:
+        super().__init__(labels, linear, quadratic, offset)
+
+        self.fixed_labels = fixed_labels
+        self.fixed = fixed
+
+    def complete(self, sampleset: SampleSet) -> SampleSet:
+        """sampleset of this binding with fixed variables added, so it can be read like sampleset of controller"""
+        if not self.fixed_labels:
+            return sampleset
+
+        return append_variables(sampleset, (self.fixed.reshape(1, -1), self.fixed_labels))
+
+    def sample(self, sampler: Union[str, dimod.Sampler] = 'gray', **params) -> SampleSet:
+        """sample with sampler registered by name or sampler instance, fixed variables are added to result"""
+        bqm = self.to_bqm()
+        if not bqm.num_variables:
+            # samplers would return an empty SampleSet
+            return self.complete(SampleSet.from_samples_bqm((np.empty((1, 0), dtype=np.int8), []), bqm))
+
+        if isinstance(sampler, str):
+            sampler = get_backend(sampler)
+
+        return self.complete(sampler.sample(bqm, **params))
+
+
+class BQMTemplate:
+    """bqm compiled once whose input variables are bound to constants many times without changing it
+    terms between free and bound variables are kept as sparse matrix, so binding is one sparse product
+    constants are fixed on every binding"""
+
+    def __init__(
+        self,
+        arrays: BQMArrays,
+        inputs: Sequence[Sequence[Hashable]],
+        constants: Optional[dict[Hashable, int]] = None,
+    ) -> None:
+        self.lengths = [len(var) for var in inputs]
+        constants = constants or {}
+
+        labels = [v for var in inputs for v in var]
+        if len(set(labels)) != len(labels):
+            raise ValueError("same variable is given as input more than once")
+        if any(v in constants for v in labels):
+            raise ValueError("input is already constant")
+
+        # every bound variable is kept on binding, even if it has no term on bqm
+        self.fixed_labels = labels + list(constants)
+        self._constants = np.array(list(constants.values()), dtype=np.int8)
+
+        columns = arrays.index(self.fixed_labels)
+        self._present = columns >= 0
+        bound = columns[self._present]
+
+        is_free = np.ones(arrays.num_variables, dtype=bool)
+        is_free[bound] = False
+        free = np.flatnonzero(is_free)
+
+        Q = arrays.quadratic.tocsr()
+        rows_free, rows_bound = Q[free], Q[bound]
+
+        self.labels = [arrays.labels[i] for i in free]
+        self.linear = arrays.linear[free]
+        self.quadratic = rows_free[:, free].tocsr()
+        self.offset = arrays.offset
+
+        # every interaction between free and bound variable, on either triangle
+        self._coupling = (rows_free[:, bound] + rows_bound[:, free].T).tocsr()
+        self._bound_linear = arrays.linear[bound]
+        self._bound_quadratic = rows_bound[:, bound].tocsr()
+
+    @property
+    def num_variables(self) -> int:
+        """number of variables left on every binding"""
+        return len(self.labels)
+
+    def bind_many(self, *values: Sequence[Constant]) -> list[Binding]:
+        """one binding for every row, values gives a sequence of constants for each input
+        every binding is made at once with sparse products"""
+        if len(values) != len(self.lengths):
+            raise ValueError(f"template has {len(self.lengths)} inputs")
+
+        rows = {len(v) for v in values}
+        if len(rows) > 1:
+            raise ValueError("every input needs same number of values")
+        n = rows.pop() if rows else 1
+
+        X = np.hstack([_to_bits(v, length) for v, length in zip(values, self.lengths)]
+                      + [np.tile(self._constants, (n, 1))]).reshape(n, len(self.fixed_labels))
+
+        x = X[:, self._present].astype(np.float64)
+        linear = self.linear + (self._coupling @ x.T).T
+        offsets = self.offset + x @ self._bound_linear + \
+            np.einsum('ij,ij->i', x, (self._bound_quadratic @ x.T).T)
+
+        return [Binding(self.labels, linear[i], self.quadratic, float(offsets[i]), self.fixed_labels, X[i])
+                for i in range(n)]
+
+    def bind(self, *values: Constant) -> Binding:
+        """binding of one constant for each input, int or list of bits like set_variable_constant"""
+        return self.bind_many(*([v] for v in values))[0]
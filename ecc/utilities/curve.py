@@ -0,0 +1,189 @@
+from typing import Optional, Sequence
+
+from ecc.point import PointConst
+
+
+# (X, Y, Z) is affine point (X / Z^2, Y / Z^3), Z = 0 is point at infinity
+Jacobian = tuple[int, int, int]
+INFINITY: Jacobian = (1, 1, 0)
+
+
+def batch_inverse(values: Sequence[int], p: int) -> list[int]:
+    """inverse of every value mod p with one modular inverse(montgomery's trick), values should not be 0"""
+    prefix = [1] * (len(values) + 1)
+    for i, v in enumerate(values):
+        prefix[i + 1] = prefix[i] * v % p
+
+    inverse = pow(prefix[-1], -1, p) if values else 1
+
+    result = [0] * len(values)
+    for i in reversed(range(len(values))):
+        result[i] = inverse * prefix[i] % p
+        inverse = inverse * values[i] % p
+
+    return result
+
+
+def to_jacobian(A: Optional[PointConst]) -> Jacobian:
+    """None is point at infinity"""
+    return INFINITY if A is None else (A.x_int, A.y_int, 1)
+
+
+def to_affine(points: Sequence[Jacobian], p: int, length: int = 256) -> list[Optional[PointConst]]:
+    """affine points of jacobian points with one modular inverse, point at infinity is None"""
+    finite = [i for i, (_, _, z) in enumerate(points) if z % p]
+    inverses = batch_inverse([points[i][2] for i in finite], p)
+
+    result: list[Optional[PointConst]] = [None] * len(points)
+    for i, z_inv in zip(finite, inverses):
+        x, y, _ = points[i]
+        z_inv2 = z_inv * z_inv % p
+        result[i] = PointConst(x * z_inv2 % p, y * z_inv2 * z_inv % p, length)
+
+    return result
+
+
+def jacobian_double(A: Jacobian, a: int, p: int) -> Jacobian:
+    x, y, z = A
+    if z % p == 0 or y % p == 0:
+        return INFINITY
+
+    y2 = y * y % p
+    s = 4 * x * y2 % p
+    m = (3 * x * x + a * pow(z, 4, p)) % p
+
+    x3 = (m * m - 2 * s) % p
+    y3 = (m * (s - x3) - 8 * y2 * y2) % p
+    z3 = 2 * y * z % p
+
+    return x3, y3, z3
+
+
+def jacobian_add(A: Jacobian, B: Jacobian, p: int, a: Optional[int] = None) -> Jacobian:
+    """A + B, a is only used when A and B are same point, ValueError is raised if it is needed but not given"""
+    x1, y1, z1 = A
+    x2, y2, z2 = B
+    if z1 % p == 0:
+        return B
+    if z2 % p == 0:
+        return A
+
+    z1_2, z2_2 = z1 * z1 % p, z2 * z2 % p
+    u1, u2 = x1 * z2_2 % p, x2 * z1_2 % p
+    s1, s2 = y1 * z2_2 * z2 % p, y2 * z1_2 * z1 % p
+
+    if u1 == u2:
+        if s1 != s2:
+            return INFINITY
+        if a is None:
+            raise ValueError("points are same, a is needed to double")
+        return jacobian_double(A, a, p)
+
+    h, r = (u2 - u1) % p, (s2 - s1) % p
+    h2 = h * h % p
+    h3 = h2 * h % p
+    u1h2 = u1 * h2 % p
+
+    x3 = (r * r - h3 - 2 * u1h2) % p
+    y3 = (r * (u1h2 - x3) - s1 * h3) % p
+    z3 = h * z1 * z2 % p
+
+    return x3, y3, z3
+
+
+def scalar_multiply(k: int, A: PointConst, a: int, p: int) -> Optional[PointConst]:
+    """k * A by double and add on jacobian coordinates, None if it is point at infinity"""
+    if k < 0:
+        k, A = -k, PointConst(A.x_int, (-A.y_int) % p, A.length)
+
+    base = to_jacobian(A)
+    result = INFINITY
+    for bit in bin(k)[2:]:
+        result = jacobian_double(result, a, p)
+        if bit == '1':
+            result = jacobian_add(result, base, p, a)
+
+    return to_affine([result], p, A.length)[0]
+
+
+def point_sum(points: Sequence[PointConst], p: int, a: Optional[int] = None) -> Optional[PointConst]:
+    """sum of points, None if it is point at infinity"""
+    result = INFINITY
+    for point in points:
+        result = jacobian_add(result, to_jacobian(point), p, a)
+
+    return to_affine([result], p, points[0].length if points else 256)[0]
+
+
+def doubles(G: PointConst, count: int, a: int, p: int) -> list[PointConst]:
+    """2**i * G for i < count"""
+    points = [to_jacobian(G)]
+    for _ in range(count - 1):
+        points.append(jacobian_double(points[-1], a, p))
+
+    return to_affine(points, p, G.length)
+
+
+def window_tables(
+    G_DOUBLES: Sequence[PointConst], window: int, p: int, a: Optional[int] = None
+) -> list[list[Optional[PointConst]]]:
+    """tables[j][d] = d * 2**(window*j) * G for every window of doubles, d = 0 is None
+    every point of every table is normalized with one modular inverse"""
+    tables: list[list[Jacobian]] = []
+    for start in range(0, len(G_DOUBLES), window):
+        table = [INFINITY]
+        for double in G_DOUBLES[start:start + window]:
+            double = to_jacobian(double)
+            table += [jacobian_add(point, double, p, a) for point in table]
+        tables.append(table)
+
+    length = G_DOUBLES[0].length if G_DOUBLES else 256
+    points = to_affine([point for table in tables for point in table], p, length)
+
+    result, i = [], 0
+    for table in tables:
+        result.append(points[i:i + len(table)])
+        i += len(table)
+
+    return result
+
+
+class Curve:
+    """short weierstrass curve y^2 = x^3 + ax + b mod p with base point G of order n"""
+
+    def __init__(self, p: int, a: int, b: int, G: tuple[int, int], n: Optional[int] = None,
+                 length: Optional[int] = None) -> None:
+        self.p = p
+        self.a = a
+        self.b = b
+        self.n = n
+        self.length = length or p.bit_length()
+        self.G = PointConst(*G, self.length)
+
+    def is_on_curve(self, A: Optional[PointConst]) -> bool:
+        if A is None:
+            return True
+
+        x, y = A.x_int, A.y_int
+        return (y * y - x**3 - self.a * x - self.b) % self.p == 0
+
+    def multiply(self, k: int, A: Optional[PointConst] = None) -> Optional[PointConst]:
+        """k * A(G if not given)"""
+        return scalar_multiply(k, self.G if A is None else A, self.a, self.p)
+
+    def doubles(self, count: Optional[int] = None) -> list[PointConst]:
+        """2**i * G for i < count(length if not given), can be given to ecc_multiply"""
+        return doubles(self.G, count or self.length, self.a, self.p)
+
+    def window_tables(self, window: int, count: Optional[int] = None) -> list[list[Optional[PointConst]]]:
+        return window_tables(self.doubles(count), window, self.p, self.a)
+
+
+SECP256K1 = Curve(
+    p=0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F,
+    a=0,
+    b=7,
+    G=(0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+       0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8),
+    n=0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141,
+)
@@ -7,5 +7,5 @@ def ecc_double(A: PointConst, a: int, p) -> PointConst:
     x = ((lambda_ ** 2) - (2*A.x_int)) % p
     y = (lambda_ * (A.x_int - x) - A.y_int) % p
 
-    C = PointConst(x, y)
+    C = PointConst(x, y, A.length)
     return C
@@ -0,0 +1,101 @@
+from typing import Hashable, Iterable, Optional
+import hashlib
+import json
+import os
+
+import minorminer
+import numpy as np
+from dimod.binary import BinaryQuadraticModel
+
+
+Embedding = dict[Hashable, list[Hashable]]
+
+
+def _canonical_edges(bqm: BinaryQuadraticModel) -> tuple[list[Hashable], np.ndarray]:
+    """variables in sorted order and interactions as sorted (index, index) pairs"""
+    labels = sorted(bqm.variables)
+    index = {v: i for i, v in enumerate(labels)}
+
+    edges = np.array([sorted((index[u], index[v])) for u, v in bqm.quadratic],
+                     dtype=np.int64).reshape(-1, 2)
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+    return labels, edges
+
+
+def structure_hash(bqm: BinaryQuadraticModel) -> str:
+    """hash of interaction graph of bqm, biases are not used so same circuit with different constants has same hash"""
+    labels, edges = _canonical_edges(bqm)
+
+    h = hashlib.sha256()
+    h.update(np.int64(len(labels)).tobytes())
+    h.update(np.ascontiguousarray(edges).tobytes())
+
+    return h.hexdigest()
+
+
+def topology_hash(edgelist: Iterable[tuple[int, int]]) -> str:
+    """hash of target graph given as edges of qubits"""
+    edges = sorted(tuple(sorted(edge)) for edge in edgelist)
+
+    return hashlib.sha256(json.dumps(edges).encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """embeddings stored on directory as json files, keyed by structure of bqm and target topology
+    embedding is stored on index of sorted variables, so it can be reused when variables are named differently"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, bqm: BinaryQuadraticModel, edgelist: Iterable[tuple[int, int]]) -> str:
+        name = f'{structure_hash(bqm)[:32]}-{topology_hash(edgelist)[:16]}.json'
+        return os.path.join(self.directory, name)
+
+    def get(self, bqm: BinaryQuadraticModel, edgelist: Iterable[tuple[int, int]]) -> Optional[Embedding]:
+        """returns stored embedding of bqm, None if it is not stored"""
+        path = self._path(bqm, edgelist)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r') as f:
+            chains = json.load(f)['embedding']
+
+        labels = sorted(bqm.variables)
+        if len(chains) != len(labels):
+            return None
+
+        return dict(zip(labels, chains))
+
+    def put(self, bqm: BinaryQuadraticModel, edgelist: Iterable[tuple[int, int]], embedding: Embedding) -> None:
+        path = self._path(bqm, edgelist)
+        chains = [list(embedding[v]) for v in sorted(bqm.variables)]
+
+        # write to temporary file first so partially written file is never read
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'embedding': chains}, f)
+        os.replace(tmp, path)
+
+    def find_embedding(self, bqm: BinaryQuadraticModel, sampler, **params) -> Embedding:
+        """returns embedding of bqm on structured sampler, searched with minorminer only if not stored"""
+        edgelist = sampler.edgelist
+
+        if (embedding := self.get(bqm, edgelist)) is not None:
+            self.hits += 1
+            return embedding
+
+        self.misses += 1
+
+        # self loops are added so variables without interaction are embedded too
+        source = list(bqm.quadratic) + [(v, v) for v in bqm.variables]
+        embedding = minorminer.find_embedding(source, edgelist, **params)
+        if bqm.num_variables and not embedding:
+            raise ValueError('embedding was not found')
+
+        self.put(bqm, edgelist, embedding)
+        return embedding
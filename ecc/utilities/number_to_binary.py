@@ -8,3 +8,8 @@ def number_to_binary(num, length=None) -> list[Binary]:
         else list(map(int, reversed(bin(num)[2:])))
     )
     return binary
+
+
+def binary_to_number(binary: list[Binary]) -> int:
+    """inverse of number_to_binary"""
+    return sum(int(b) << i for i, b in enumerate(binary))
@@ -1,28 +1,24 @@
-from ecc.point import PointConst
-from ecc import EccController
-from ecc.data.secp256k1.base import secp256k1_params
-
-import json
+import os
 
-# init controller
-p = secp256k1_params['P']
-controller = EccController(p)
+from ecc import EccController
+from ecc.utilities.curve import SECP256K1
 
-# load doubles
-with open('ecc/data/secp256k1/doubles.json', 'r') as f:
-    j = json.load(f)
+# stages are built on worker processes, which import this file again on some platforms
+if __name__ == "__main__":
+    # init controller
+    p = SECP256K1.p
+    controller = EccController(p)
 
-doubles = []
-for i in range(256):
-    d = j[f'{i}']
-    point = PointConst(d['x'], d['y'])
-    doubles.append(point)
+    # doubles of base point
+    doubles = SECP256K1.doubles()
 
-# run ecc_mult
-key = controller.get_bit(256)
-out_point = controller.new_point()
-controller.ecc_multiply(doubles, key, out_point)
+    # run ecc_mult, every addition is built on one of the processes
+    key = controller.get_bit(256)
+    out_point = controller.new_point()
+    controller.ecc_multiply(doubles, key, out_point, processes=os.cpu_count())
 
+    # stored model can be opened again with EccController.load without building it
+    controller.save('secp256k1.ecc')
 
-print(controller.shape)
-print("DONE")
+    print(controller.shape)
+    print("DONE")
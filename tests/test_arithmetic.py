@@ -1,8 +1,11 @@
 import ecc
+import networkx as nx
 import unittest
+import warnings
 from parameterized import parameterized
 from typing import Union
 
+from ecc.controller.arithmetic_controller import ADD_STRATEGIES
 from tests import base
 
 
@@ -107,6 +110,186 @@ class TestArithmeticController(base.Base):
 
         self.check_solution((c, C))
 
+    @parameterized.expand([('wallace', 5, 7), ('dadda', 6, 3), ('dadda', 7, 7)])
+    def test_multiply_strategy(self, strategy, A, B):
+        a, b, c = self.controller.get_bits(3, 3, 6)
+
+        self.controller.multiply(a, b, c, strategy)
+
+        self.controller.set_variable_constant(a, A)
+        self.controller.set_variable_constant(b, B)
+
+        self.check_solution((c, A*B))
+
+    @parameterized.expand([(3,), (6,), (7,)])
+    def test_square_symmetric(self, A):
+        self.controller.square_strategy = 'symmetric'
+        a, c = self.controller.get_bits(3, 6)
+
+        self.controller.square(a, c)
+
+        self.controller.set_variable_constant(a, A)
+
+        self.check_solution((c, A**2))
+
+    def test_multiply_karatsuba(self):
+        controller = ecc.ArithmeticController(record=True)
+        controller.KARATSUBA_THRESHOLD = 4
+
+        a, b, c = controller.get_bits(9, 9, 18)
+        controller.multiply(a, b, c, 'karatsuba')
+
+        A, B = [0, 1, 300, 511, 257], [511, 1, 77, 511, 256]
+        result = controller.simulate((a, A), (b, B))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(c), [x*y for x, y in zip(A, B)])
+
+    @parameterized.expand([
+        ('kogge_stone', 3, 6, 3, 3),
+        ('brent_kung', 7, 3, 3, 2),
+        ('carry_select', 5, 6, 3, 3),
+        ('carry_select', 3, 6, 2, 3),
+    ])
+    def test_add_strategy(self, strategy, A, B, a_length, b_length):
+        a, b, c = self.controller.get_bits(a_length, b_length, max(a_length, b_length) + 1)
+
+        self.controller.add(a, b, c, strategy)
+
+        self.controller.set_variable_constant(a, A)
+        self.controller.set_variable_constant(b, B)
+
+        self.check_solution((c, A + B))
+
+    @parameterized.expand([(strategy,) for strategy in ADD_STRATEGIES])
+    def test_add_strategy_simulate(self, strategy):
+        controller = ecc.ArithmeticController(record=True)
+        controller.add_strategy = strategy
+        a, b, c = controller.get_bits(13, 9, 14)
+        controller.add(a, b, c)
+
+        A, B = [0, 8191, 4096, 1234], [0, 511, 511, 300]
+        result = controller.simulate((a, A), (b, B))
+
+        bqm = controller.compile()
+        names = list(bqm.variables)
+        self.assertTrue((bqm.energies((result.samples(names), names)) == 0).all())
+        self.assertEqual(result.get_variable(c), [x + y for x, y in zip(A, B)])
+
+    def test_add_multiple(self):
+        a, b, c, d = self.controller.get_bits(3, 3, 2, 5)
+
+        self.controller.add_multiple([a, b, c], d)
+
+        self.controller.set_variable_constant(a, 7)
+        self.controller.set_variable_constant(b, 5)
+        self.controller.set_variable_constant(c, 3)
+
+        self.check_solution((d, 15))
+
+    def test_unknown_strategy(self):
+        a, b, c = self.controller.get_bits(3, 3, 6)
+
+        with self.assertRaises(ValueError):
+            self.controller.multiply(a, b, c, 'unknown')
+
+        with self.assertRaises(ValueError):
+            self.controller.add(a, b, c[:4], 'unknown')
+
+    def test_multiply_report(self):
+        report = ecc.report.multiply_report(64)
+
+        self.assertEqual(ecc.report.best(report), 'karatsuba')
+        self.assertLess(report['karatsuba']['couplers'],
+                        report['array']['couplers'])
+
+        report = ecc.report.square_report(8)
+        self.assertEqual(ecc.report.best(report), 'symmetric')
+
+    def test_adder_benchmark(self):
+        report = ecc.report.adder_benchmark(3, target=nx.complete_graph(40), num_reads=10, seed=1)
+
+        self.assertEqual(set(report), set(ADD_STRATEGIES))
+        self.assertEqual(ecc.report.best(report), 'ripple')
+        for result in report.values():
+            self.assertGreater(result['success_rate'], 0)
+            self.assertEqual(result['max_chain'], 1)
+
+
+class TestBufferedArithmeticController(TestArithmeticController):
+    def setUp(self) -> None:
+        self.controller = ecc.ArithmeticController(buffered=True)
+
+    def test_fold_constants(self):
+        a, b, c = self.controller.get_bits(3, 3, 4)
+
+        self.controller.add(a, b, c)
+
+        self.controller.set_variable_constant(a, 5)
+        self.controller.set_variable_constant(b, 6)
+
+        removed = self.controller.fold_constants()
+
+        self.assertEqual(removed, 3)
+        self.assertEqual(self.controller.fixed_bqm.shape, (0, 0))
+        self.check_solution((c, 11))
+
+        # only given constants are stored, gates are folded again with changed constant
+        self.assertEqual(len(self.controller.constants), 6)
+        self.controller.set_variable_constant(a, 1)
+        self.check_solution((c, 7))
+
+    def test_fold_constants_partial(self):
+        a, b, c = self.controller.get_bits(3, 3, 6)
+
+        self.controller.multiply(a, b, c)
+
+        self.controller.set_variable_constant(b, 2)
+
+        self.controller.fold_constants()
+
+        # c = a << 1, only a is left and bits of c are renamed to it on fixed bqm
+        self.assertEqual(self.controller.fixed_bqm.shape, (3, 0))
+        self.assertEqual([self.controller._sampled_name(bit) for bit in c[1:4]],
+                         [self.controller._sampled_name(bit) for bit in a])
+        self.assertNotEqual(self.controller.get_names(*c[1:4]),
+                            self.controller.get_names(*a))
+
+    def test_fold_constants_bqm(self):
+        a, b, c = self.controller.get_bits(3, 3, 4)
+
+        self.controller.add(a, b, c)
+        self.controller.set_variable_constant(a, 5)
+        self.controller.set_variable_constant(b, 6)
+
+        # bqm has every gate, reading it doesn't lower gates that are folded
+        self.assertEqual(self.controller.shape, (12, 26))
+        self.assertEqual(self.controller.fold_constants(), 3)
+        self.assertEqual(self.controller.fixed_bqm.shape, (0, 0))
+
+    def test_fold_constants_added(self):
+        a, b, c = self.controller.get_bits(3, 3, 4)
+        x, y = self.controller.get_bits(1, 1)
+
+        self.controller.add(a, b, c)
+        self.controller.set_variable_constant(a, 5)
+        self.controller.set_variable_constant(b, 6)
+        self.controller.fold_constants()
+        folding = self.controller._folding
+
+        # y = c[0] xor x = not x, ancilla of xor is x and 0 = 0
+        self.controller.xor_gate(c[0], x[0], y[0])
+
+        self.assertEqual(self.controller.fold_constants(), 3)
+        self.assertIs(self.controller._folding, folding)
+        self.assertEqual(self.get_result(x, y), set(['01', '10']))
+
+        # every bit is extracted, including ancillas of removed gates
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            sample = self.controller.run_ExactSolver(True).samples()[0]
+            self.assertNotIn(None, self.controller.extract_variable(sample, list(range(self.controller.bit_cnt))))
+
 
 if __name__ == "__main__":
     unittest.main()
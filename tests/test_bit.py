@@ -0,0 +1,123 @@
+import ecc
+import unittest
+
+from tests import base
+
+
+class TestBitController(base.Base):
+    def setUp(self) -> None:
+        self.controller = ecc.GateController()
+
+    def test_merge_chain(self):
+        a = self.controller.get_bit(100)
+
+        for i in range(1, len(a)):
+            self.controller.merge_bit(a[i], a[i-1])
+
+        names = set(self.controller.get_name(a))
+        self.assertEqual(len(names), 1)
+
+        name = names.pop()
+        self.assertEqual(sorted(self.controller.name_to_bit[name]), a)
+
+    def test_merge_after_gate(self):
+        a, b, c, d, e, f = self.controller.get_bit(6)
+
+        self.controller.and_gate(a, b, c)
+        self.controller.or_gate(d, e, f)
+        self.controller.merge_bit(c, f)
+
+        self.assertEqual(self.controller.shape, (5, 6))
+
+        result = self.get_result(a, b, d, e, c)
+        answer = set(['00000', '01000', '10000', '11011', '11101', '11111'])
+
+        self.assertEqual(result, answer)
+
+    def test_merge_connected(self):
+        a, b, c = self.controller.get_bit(3)
+
+        self.controller.and_gate(a, b, c)
+        self.controller.merge_bit(a, c)
+
+        result = self.get_result(a, b)
+        answer = set(['00', '01', '11'])
+
+        self.assertEqual(result, answer)
+
+    def test_extract_batch(self):
+        a, b, c, d = self.controller.get_bit(4)
+
+        self.controller.and_gate(a, b, c)
+        self.controller.or_gate(c, d, b)
+        self.controller.set_bit_constant(d, 1)
+
+        sampleset = self.controller.run_ExactSolver()
+        bits, var = self.controller.extract_batch(sampleset, a, [a, b, c, d])
+
+        for s, bit, value in zip(sampleset.samples(sorted_by=None), bits, var):
+            self.assertEqual(bit, self.controller.extract_bit(s, a))
+            self.assertEqual(
+                value, ecc.binary_to_number(self.controller.extract_variable(s, [a, b, c, d])))
+
+    def test_extract_batch_not_found(self):
+        a, b = self.controller.get_bit(2)
+
+        self.controller.not_gate(a, b)
+        c = self.controller.get_bit()
+
+        sampleset = self.controller.run_ExactSolver()
+
+        with self.assertRaises(ValueError):
+            self.controller.extract_batch(sampleset, [a, c])
+
+    def test_run_repeated(self):
+        a, b, c = self.controller.get_bit(3)
+
+        self.controller.and_gate(a, b, c)
+        self.controller.set_bit_constant(a, 1)
+
+        self.assertEqual(self.get_result(b, c), set(['00', '11']))
+
+        # constant added after running is applied on bqm that still has every variable
+        self.controller.set_bit_constant(b, 1)
+        self.assertEqual(self.get_result(a, b, c), set(['111']))
+        self.assertIsNot(self.controller.fixed_bqm, self.controller.bqm)
+
+    def test_run_change_constant(self):
+        a, b, c = self.controller.get_bit(3)
+
+        self.controller.and_gate(a, b, c)
+        self.controller.set_variable_constant([a, b], 3)
+        self.assertEqual(self.get_result(c), set(['1']))
+
+        self.controller.set_bit_constant(a, 0)
+        self.assertEqual(self.get_result(c), set(['0']))
+
+    def test_fixed_cached(self):
+        a, b, c = self.controller.get_bit(3)
+
+        self.controller.or_gate(a, b, c)
+        self.controller.set_bit_constant(a, 0)
+
+        fixed = self.controller.fixed_bqm
+        self.controller.run_ExactSolver()
+        self.assertIs(self.controller.fixed_bqm, fixed)
+
+        self.controller.set_bit_constant(b, 1)
+        self.assertIsNot(self.controller.fixed_bqm, fixed)
+
+        d = self.controller.get_bit()
+        fixed = self.controller.fixed_bqm
+        self.controller.not_gate(c, d)
+        self.assertIsNot(self.controller.fixed_bqm, fixed)
+        self.assertEqual(self.get_result(d), set(['0']))
+
+
+class TestBufferedBitController(TestBitController):
+    def setUp(self) -> None:
+        self.controller = ecc.GateController(buffered=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import ecc
+import unittest
+
+import numpy as np
+
+
+class TestBQMArrays(unittest.TestCase):
+    def setUp(self) -> None:
+        self.controller = ecc.ArithmeticController()
+
+        self.a, self.b, self.c = self.controller.get_bits(2, 2, 3)
+        self.controller.add(self.a, self.b, self.c)
+
+        self.sampleset = self.controller.run_ExactSolver()
+        self.arrays = self.controller.get_arrays()
+
+    def test_energies(self):
+        energies = self.arrays.energies(self.sampleset)
+
+        np.testing.assert_allclose(energies, self.sampleset.record.energy)
+
+    def test_energies_constant(self):
+        # constant bits are fixed on bqm given to samplers, arrays must score samples the same way
+        self.controller.set_variable_constant(self.a, 3)
+        sampleset = self.controller.run_ExactSolver(True)
+
+        energies = self.controller.get_arrays().energies(sampleset)
+
+        np.testing.assert_allclose(energies, sampleset.record.energy)
+        self.assertTrue(self.controller.get_arrays().is_ground(sampleset).all())
+
+    def test_is_ground(self):
+        ground = self.arrays.is_ground(self.sampleset)
+
+        self.assertEqual(ground.sum(), 16)
+
+    def test_decode(self):
+        samples = self.arrays.to_samples(self.sampleset)
+        columns = self.arrays.index(self.controller.get_name(self.c))
+
+        result = self.arrays.decode(samples, columns)
+
+        expected = [
+            ecc.binary_to_number(self.controller.extract_variable(s, self.c))
+            for s in self.sampleset.samples(sorted_by=None)]
+        self.assertEqual(result.tolist(), expected)
+
+    def test_decode_fill(self):
+        samples = np.array([[1, 0], [0, 1]], dtype=np.int8)
+
+        result = self.arrays.decode(samples, [0, -1, 1], fill=[0, 1, 0])
+
+        self.assertEqual(result.tolist(), [3, 6])
+
+    def test_decode_no_columns(self):
+        samples = np.empty((2, 0), dtype=np.int8)
+
+        result = self.arrays.decode(samples, [-1, -1, -1], fill=[1, 0, 1])
+
+        self.assertEqual(result.tolist(), [5, 5])
+
+    def test_extract_batch_folded(self):
+        # every variable is folded to a constant, so sampleset has no columns
+        controller = ecc.ArithmeticController(buffered=True)
+        a, b, c = controller.get_bits(2, 2, 3)
+        controller.add(a, b, c)
+        controller.set_variable_constant(a, 3)
+        controller.set_variable_constant(b, 2)
+
+        sampleset = controller.run_ExactSolver()
+        self.assertEqual(len(sampleset.variables), 0)
+
+        c, = controller.extract_batch(sampleset, c)
+
+        self.assertEqual(c.tolist(), [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
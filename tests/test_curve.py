@@ -0,0 +1,81 @@
+import ecc
+import random
+import unittest
+
+from ecc.utilities import curve
+from ecc.utilities.curve import Curve, SECP256K1
+
+
+class TestCurve(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(0)
+
+        # y^2 = x^3 + 2x + 15 mod 8191
+        self.curve = Curve(8191, 2, 15, (7393, 1456))
+
+    def test_batch_inverse(self):
+        p = SECP256K1.p
+        values = [random.randrange(1, p) for _ in range(20)]
+
+        inverses = curve.batch_inverse(values, p)
+
+        self.assertEqual(inverses, [pow(v, -1, p) for v in values])
+        self.assertEqual(curve.batch_inverse([], p), [])
+
+    def test_affine(self):
+        G = self.curve.G
+        doubles = self.curve.doubles()
+
+        point = G
+        for double in doubles[1:]:
+            point = ecc.ecc_double(point, self.curve.a, self.curve.p)
+            self.assertEqual((point.x_int, point.y_int), (double.x_int, double.y_int))
+
+        added = curve.point_sum([doubles[3], doubles[5]], self.curve.p)
+        expected = self.curve.multiply(40)
+        self.assertEqual((added.x_int, added.y_int), (expected.x_int, expected.y_int))
+        self.assertTrue(self.curve.is_on_curve(expected))
+
+    def test_secp256k1(self):
+        G = SECP256K1.G
+
+        self.assertTrue(SECP256K1.is_on_curve(G))
+        self.assertIsNone(SECP256K1.multiply(SECP256K1.n))
+
+        # (n - 1) * G = -G
+        minus = SECP256K1.multiply(SECP256K1.n - 1)
+        self.assertEqual((minus.x_int, minus.y_int), (G.x_int, SECP256K1.p - G.y_int))
+
+        k = random.randrange(SECP256K1.n)
+        point = SECP256K1.multiply(k)
+        self.assertTrue(SECP256K1.is_on_curve(point))
+        self.assertEqual(SECP256K1.multiply(-k).y_int, SECP256K1.p - point.y_int)
+
+    def test_window_tables(self):
+        tables = SECP256K1.window_tables(4)
+
+        self.assertEqual(len(tables), 64)
+        self.assertIsNone(tables[0][0])
+        for j, d in [(0, 1), (3, 7), (63, 15), (20, 10)]:
+            expected = SECP256K1.multiply(d << (4 * j))
+            self.assertEqual((tables[j][d].x_int, tables[j][d].y_int), (expected.x_int, expected.y_int))
+
+    def test_point_sum(self):
+        doubles = self.curve.doubles()
+
+        point = curve.point_sum(doubles[:4], self.curve.p)
+        expected = self.curve.multiply(15)
+
+        self.assertEqual((point.x_int, point.y_int), (expected.x_int, expected.y_int))
+        self.assertEqual(point.x, ecc.number_to_binary(expected.x_int, 13))
+
+        # doubling needs a
+        with self.assertRaises(ValueError):
+            curve.point_sum([doubles[0], doubles[0]], self.curve.p)
+
+        point = curve.point_sum([doubles[0], doubles[0]], self.curve.p, self.curve.a)
+        self.assertEqual(point.x_int, doubles[1].x_int)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import ecc
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import dimod
+import networkx as nx
+
+from ecc.utilities import embedding_cache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+        # stands in for QPU, 8x8 grid of qubits
+        graph = nx.convert_node_labels_to_integers(nx.grid_2d_graph(8, 8))
+        self.sampler = dimod.StructureComposite(
+            dimod.RandomSampler(), list(graph.nodes), list(graph.edges))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def get_controller(self, a_value: int) -> ecc.ArithmeticController:
+        controller = ecc.ArithmeticController()
+        controller.get_sampler(self.sampler, self.directory.name)
+
+        a, b, c = controller.get_bits(3, 3, 4)
+        controller.add(a, b, c)
+        controller.set_variable_constant(a, a_value)
+
+        return controller
+
+    def test_structure_hash(self):
+        bqm1 = self.get_controller(3).bqm
+        bqm2 = self.get_controller(5).bqm
+        bqm2.add_linear(0, 10)
+
+        self.assertEqual(embedding_cache.structure_hash(bqm1),
+                         embedding_cache.structure_hash(bqm2))
+
+        bqm2.add_quadratic(0, 12, 1)
+        self.assertNotEqual(embedding_cache.structure_hash(bqm1),
+                            embedding_cache.structure_hash(bqm2))
+
+    def test_reuse(self):
+        controller = self.get_controller(3)
+        sampleset = controller.run_DWaveSampler(num_reads=10)
+
+        self.assertEqual(len(sampleset), 10)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+        controller = self.get_controller(5)
+        with mock.patch.object(embedding_cache.minorminer, 'find_embedding') as find:
+            sampleset = controller.run_DWaveSampler(num_reads=10)
+
+        find.assert_not_called()
+        self.assertEqual(controller.embedding_cache.hits, 1)
+        self.assertEqual(set(sampleset.variables), set(controller.fixed_bqm.variables))
+
+
+if __name__ == "__main__":
+    unittest.main()
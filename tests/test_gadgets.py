@@ -0,0 +1,115 @@
+import ecc
+import io
+import unittest
+from parameterized import parameterized
+
+from ecc.circuit import Netlist, gadgets
+from ecc.circuit.gates import CTRL_SELECT, XOR_PENALTY
+from ecc.utilities.bqm_builder import Penalty
+from tests import base
+
+
+class TestGadgets(unittest.TestCase):
+    @parameterized.expand(gadgets.ALL_GATES.items())
+    def test_verify(self, name, gate):
+        self.assertEqual(gadgets.verify(gate), 1)
+
+    def test_verify_wrong(self):
+        with self.assertRaises(ValueError):
+            gadgets.verify(CTRL_SELECT, XOR_PENALTY)
+
+        # and gate without penalty on output
+        wrong = Penalty([(0, 0), (1, 0)], [(0, 1, 1)])
+        with self.assertRaises(ValueError):
+            gadgets.verify(ecc.circuit.gates.AND, wrong)
+
+    def test_fit_penalty(self):
+        # ctrl_select needs an ancilla
+        select = CTRL_SELECT.evaluate
+        self.assertIsNone(gadgets.fit_penalty(3, lambda a, b, c: select(a, b, c)[:1]))
+
+        penalty = gadgets.fit_penalty(3, select)
+        self.assertAlmostEqual(gadgets.verify(CTRL_SELECT, penalty), 1)
+        self.assertAlmostEqual(gadgets.scaled_gap(penalty), 0.25)
+
+    def test_choose(self):
+        self.assertEqual(gadgets.choose('ctrl_select', 'size'), gadgets.CTRL_SELECT_SPARSE)
+        self.assertEqual(gadgets.choose('xor', 'gap').n_ancillas, 1)
+
+        with self.assertRaises(ValueError):
+            gadgets.choose('xor', 'speed')
+
+    def test_report(self):
+        report = ecc.report.gadget_report('ctrl_select')
+
+        self.assertEqual(report['ctrl_select']['couplers'], 10)
+        self.assertEqual(report['ctrl_select_sparse']['couplers'], 8)
+
+
+class TestGadgetController(base.Base):
+    def setUp(self) -> None:
+        self.controller = ecc.ArithmeticController(record=True)
+        self.controller.gadget_objective = 'size'
+
+    def test_ctrl_swap(self):
+        a, b, ctrl, c, d = self.controller.get_bit(5)
+
+        self.controller.ctrl_swap(a, b, ctrl, c, d)
+
+        result = self.get_result(a, b, ctrl, c, d)
+        answer = set(('00000', '01001', '10010', '11011',
+                      '00100', '01110', '10101', '11111'))
+
+        self.assertEqual(result, answer)
+
+    def test_fulladder_xor_gate(self):
+        a, x, b, c, s, carry = self.controller.get_bit(6)
+
+        self.controller.fulladder_xor_gate(a, x, b, c, s, carry)
+
+        for r in self.get_result(a, x, b, c, s, carry):
+            total = (int(r[0]) ^ int(r[1])) + int(r[2]) + int(r[3])
+            self.assertEqual(int(r[4]) + 2 * int(r[5]), total)
+
+    @parameterized.expand([
+        [5, 6, 1, 11],
+        [5, 6, 0, 5],
+        [3, 1, 1, 4],
+    ])
+    def test_add_and(self, a_, b_, ctrl_, c_):
+        a, b, c = self.controller.get_bits(3, 2, 4)
+        ctrl = self.controller.get_bit()
+
+        self.controller.add_and(a, b, ctrl, c)
+        self.controller.set_variable_constant(a, a_)
+        self.controller.set_variable_constant(b, b_ % 4)
+        self.controller.set_bit_constant(ctrl, ctrl_)
+
+        self.check_solution((c, (a_ + (b_ % 4) * ctrl_)))
+
+    def test_multiply_size(self):
+        controller = ecc.ArithmeticController(record=True)
+        a, b, c = controller.get_bits(6, 6, 12)
+        controller.multiply(a, b, c)
+
+        a_, b_, c_ = self.controller.get_bits(6, 6, 12)
+        self.controller.multiply(a_, b_, c_)
+
+        self.assertLess(self.controller.bqm.num_variables, controller.bqm.num_variables)
+
+        sim = self.controller.simulate((a_, [13, 63]), (b_, [7, 62]))
+        self.assertEqual(sim.get_variable(c_), [91, 3906])
+
+    def test_save_load(self):
+        a, b, ctrl, c, d = self.controller.get_bit(5)
+        self.controller.ctrl_swap(a, b, ctrl, c, d)
+
+        f = io.BytesIO()
+        self.controller.netlist.save(f)
+        f.seek(0)
+
+        self.assertEqual(list(Netlist.load(f)), list(self.controller.netlist))
+
+
+if __name__ == "__main__":
+    unittest.main()
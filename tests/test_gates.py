@@ -138,5 +138,10 @@ class TestGateController(base.Base):
     #     self.check_solution((a, 1))
 
 
+class TestBufferedGateController(TestGateController):
+    def setUp(self) -> None:
+        self.controller = ecc.GateController(buffered=True)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 import ecc
+import random
 import unittest
+from unittest import mock
 from parameterized import parameterized
 from typing import Union
 
@@ -154,6 +156,127 @@ class TestModuloController(base.Base):
 
         self.assertEqual(result, answer)
 
+    @parameterized.expand([(9, 9), (4, 4), (3, 2)])
+    def test_modulo_p_bound(self, A, bound):
+        a, r = self.controller.get_bits(4, 3)
+
+        self.controller.modulo_p(a, r, True, bound=bound)
+
+        self.controller.set_variable_constant(a, A)
+
+        self.check_solution((r, A % self.P))
+
+
+class TestReduction(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(0)
+
+    def simulate(self, controller, operation):
+        a, b, c = controller.get_bits(*[controller.length] * 3)
+        operation(a, b, c, True)
+
+        P = controller.P
+        A = [random.randrange(P) for _ in range(50)] + [P - 1]
+        B = [random.randrange(P) for _ in range(50)] + [P - 1]
+
+        result = controller.simulate((a, A), (b, B))
+        self.assertTrue(result.valid.all())
+
+        return A, B, result.get_variable(c)
+
+    @parameterized.expand([(45,), (63,), (5,), (0,)])
+    def test_modulo_p_fold(self, A):
+        controller = ecc.ModuloController(5)
+        a, r = controller.get_bits(6, 3)
+
+        controller.modulo_p(a, r, True, 'fold')
+
+        controller.set_variable_constant(a, A)
+
+        sampleset = controller.run('elimination')
+
+        self.assertEqual(sampleset.first.energy, 0)
+        self.assertEqual(controller.extract_batch(sampleset, r)[0].tolist(), [A % 5])
+
+    @parameterized.expand([(8191,), (2**31 - 1,), (65521,)])
+    def test_fold(self, P):
+        controller = ecc.ModuloController(P, record=True)
+        controller.reduction_strategy = 'fold'
+
+        A, B, C = self.simulate(controller, controller.mult_modp)
+
+        self.assertEqual(C, [x*y % P for x, y in zip(A, B)])
+
+    @parameterized.expand([(8191,), (251,)])
+    def test_montgomery(self, P):
+        controller = ecc.ModuloController(P, record=True)
+
+        A, B, C = self.simulate(controller, controller.mont_mult_modp)
+
+        self.assertEqual([controller.from_montgomery(c) for c in C],
+                         [controller.from_montgomery(x) * controller.from_montgomery(y) % P
+                          for x, y in zip(A, B)])
+
+    @parameterized.expand([(131,), (251,)])
+    def test_montgomery_unreduced(self, P):
+        controller = ecc.ModuloController(P, record=True)
+        a, b, c = controller.get_bits(*[controller.length] * 3)
+        controller.mont_mult_modp(a, b, c, True)
+
+        # inputs in [P, R) are not reduced, t reaches 2P when P is much smaller than R
+        R = 2**controller.length
+        A = list(range(P, R)) + [1]
+        B = [253] * (R - P) + [R - 1]
+        result = controller.simulate((a, A), (b, B))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(c), [x * y * pow(R, -1, P) % P for x, y in zip(A, B)])
+
+    def test_lazy(self):
+        P = 8191
+        controller = ecc.ModuloController(P, record=True)
+        l, x_A, x_C = controller.get_bits(13, 13, 13)
+
+        # x_C = lambda^2 - x_B - x_A
+        with mock.patch.object(controller, 'modulo_p', wraps=controller.modulo_p) as modulo_p:
+            x = controller.lazy_sub_const(controller.lazy_square(controller.lazy(l)), 1234)
+            x = controller.lazy_sub(x, controller.lazy(x_A))
+            controller.lazy_reduce(x, x_C, True)
+
+        self.assertEqual(modulo_p.call_count, 1)
+
+        L = [random.randrange(P) for _ in range(50)]
+        A = [random.randrange(P) for _ in range(50)]
+        result = controller.simulate((l, L), (x_A, A))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(x_C),
+                         [(v*v - 1234 - a) % P for v, a in zip(L, A)])
+
+    def test_lazy_fit(self):
+        controller = ecc.ModuloController(13)
+        controller.lazy_bits = 10
+        a, b = controller.get_bits(4, 4)
+
+        with mock.patch.object(controller, 'modulo_p', wraps=controller.modulo_p) as modulo_p:
+            x = controller.lazy_mult(controller.lazy(a), controller.lazy(b))
+            x = controller.lazy_mult(x, controller.lazy(a))
+
+        # product of 8 and 4 bits is reduced before multiplying
+        self.assertEqual(modulo_p.call_count, 1)
+        self.assertLess(x.bound, 2**10)
+
+    def test_reduction_report(self):
+        report = ecc.report.reduction_report(2**61 - 1)
+
+        self.assertEqual(ecc.report.best(report), 'fold')
+
+
+class TestBufferedModuloController(TestModuloController):
+    def setUp(self) -> None:
+        super().setUp()
+        self.controller = ecc.ModuloController(self.P, buffered=True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,102 @@
+import ecc
+import io
+import unittest
+
+from ecc.circuit import Netlist, scaling
+from ecc.circuit.gates import GATES, AND, XOR, AND_PENALTY
+from ecc.utilities.bqm_builder import Penalty
+
+
+class TestNetlist(unittest.TestCase):
+    def setUp(self) -> None:
+        self.controller = ecc.ModuloController(5, record=True)
+
+        a, b, c = self.controller.get_bits(3, 3, 3)
+        self.controller.add_modp(a, b, c)
+        self.controller.xor_gate(a[0], b[0], c[0])
+
+    def test_compile(self):
+        bqm = self.controller.compile()
+
+        self.assertTrue(bqm.is_almost_equal(self.controller.bqm))
+
+    def test_count(self):
+        counts = self.controller.netlist.count()
+
+        self.assertEqual(counts['xor'], 1)
+        self.assertEqual(sum(counts.values()), len(self.controller.netlist))
+
+    def test_save_load(self):
+        f = io.BytesIO()
+        self.controller.netlist.save(f)
+        f.seek(0)
+
+        netlist = Netlist.load(f)
+
+        self.assertEqual(list(netlist), list(self.controller.netlist))
+
+    def test_penalties(self):
+        double = Penalty([(i, 2*b) for i, b in AND_PENALTY.linear],
+                         [(i, j, 2*b) for i, j, b in AND_PENALTY.quadratic])
+
+        netlist = Netlist([(AND, (0, 1, 2)), (XOR, (0, 1, 3, 4))])
+        bqm = netlist.compile(penalties={'and': double})
+
+        self.assertEqual(bqm.get_linear(2), 6)
+        self.assertEqual(bqm.get_quadratic(0, 1), 4)
+
+    def test_wrong_size(self):
+        with self.assertRaises(ValueError):
+            Netlist([(AND, (0, 1))])
+
+
+class TestScaling(unittest.TestCase):
+    def setUp(self) -> None:
+        self.controller = ecc.ModuloController(13, record=True)
+
+        a, b, c = self.controller.get_bits(4, 4, 4)
+        self.controller.mult_modp(a, b, c)
+        self.controller.ctrl_select(a[0], b[0], a[1], c[0])
+
+    def test_gap(self):
+        for gate in GATES.values():
+            self.assertEqual(gate.penalty.gap, 1)
+            self.assertEqual(gate.penalty.scale(3).gap, 3)
+
+    def test_analyze(self):
+        result = self.controller.analyze_biases()
+
+        self.assertEqual(result['min_gap'], 1)
+        self.assertEqual(result['ratio'], max(result['max_linear'] / scaling.H_RANGE,
+                                              result['max_quadratic'] / scaling.J_RANGE))
+        self.assertAlmostEqual(result['scaled_gap'] * result['ratio'], 1)
+
+    def test_balance(self):
+        penalties = self.controller.balance_penalties()
+        bqm = self.controller.compile(penalties)
+
+        before = self.controller.analyze_biases()
+        after = self.controller.analyze_biases(bqm, penalties)
+        self.assertLessEqual(after['ratio'], before['ratio'] + 1e-9)
+        self.assertEqual(set(penalties), set(self.controller.netlist.count()))
+
+    def test_balance_ground(self):
+        controller = ecc.ArithmeticController(record=True)
+        a, b, c = controller.get_bits(2, 2, 3)
+        controller.add(a, b, c)
+
+        solver = ecc.solvers.GrayCodeSolver()
+        before = solver.sample(controller.compile())
+        after = solver.sample(controller.compile(controller.balance_penalties()))
+
+        def states(sampleset):
+            return {tuple(sorted(s.items())) for s in sampleset.samples()}
+
+        self.assertEqual(before.first.energy, 0)
+        self.assertEqual(after.first.energy, 0)
+        self.assertEqual(states(before), states(after))
+        self.assertEqual(len(before), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
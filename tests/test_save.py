@@ -0,0 +1,118 @@
+import ecc
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from base import Base
+from ecc.utilities.array_file import load_arrays, save_arrays
+
+
+class TestSave(Base):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'controller.ecc')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def build(self, buffered: bool = False) -> ecc.ArithmeticController:
+        controller = ecc.ArithmeticController(buffered)
+        controller.add_strategy = 'kogge_stone'
+        controller.penalties['xor'] = ecc.circuit.gates.XOR.penalty.scale(2)
+
+        self.a, self.b, self.c = controller.get_bits(3, 3, 4)
+        with controller.stage():
+            controller.add(self.a, self.b, self.c)
+        controller.merge_variable(self.a[:1], self.b[:1])
+        controller.set_variable_constant(self.a, 5)
+        controller.set_variable_constant(self.b, 5)
+
+        return controller
+
+    @parameterized.expand([[False, True], [False, False], [True, True]])
+    def test_save_load(self, buffered, mmap):
+        controller = self.build(buffered)
+        controller.save(self.path)
+
+        loaded = ecc.BaseController.load(self.path, mmap)
+
+        self.assertIs(type(loaded), ecc.ArithmeticController)
+        self.assertEqual(loaded.buffered, buffered)
+        self.assertEqual(loaded.add_strategy, 'kogge_stone')
+        self.assertEqual(loaded.penalties['xor'].linear, controller.penalties['xor'].linear)
+        self.assertEqual(loaded.shape, controller.shape)
+        self.assertEqual(loaded.bit_to_name, controller.bit_to_name)
+        self.assertEqual(loaded.constants, controller.constants)
+        self.assertEqual(loaded.stages, controller.stages)
+        self.assertEqual(loaded.bqm, controller.bqm)
+
+        self.controller = loaded
+        self.check_solution((self.a, 5), (self.c, 10))
+
+    def test_arrays(self):
+        controller = self.build()
+        controller.save(self.path)
+
+        loaded = ecc.ArithmeticController.load(self.path)
+        arrays = loaded.get_arrays(fixed=False)
+
+        # arrays are taken from file without building bqm
+        self.assertIsNotNone(loaded._stored)
+
+        samples = np.random.default_rng(0).integers(0, 2, (10, arrays.num_variables))
+        np.testing.assert_allclose(arrays.energies(samples),
+                                   controller.get_arrays(fixed=False).energies(samples))
+
+    def test_extend(self):
+        # gates and merges added after loading are added on stored bqm
+        self.build().save(self.path)
+        loaded = ecc.BaseController.load(self.path)
+
+        loaded.add(self.c, loaded.get_bit(4), loaded.get_bit(5))
+        loaded.merge_bit(self.b[2], self.c[3])
+
+        expected = self.build()
+        expected.add(self.c, expected.get_bit(4), expected.get_bit(5))
+        expected.merge_bit(self.b[2], self.c[3])
+
+        self.assertEqual(loaded.bqm, expected.bqm)
+        self.assertEqual(loaded.bit_to_name, expected.bit_to_name)
+
+        # controller can be saved again after it is extended
+        loaded.save(self.path)
+        self.assertEqual(ecc.BaseController.load(self.path).bqm, expected.bqm)
+
+    def test_load_class(self):
+        ecc.EccController(13).save(self.path)
+
+        loaded = ecc.ModuloController.load(self.path)
+        self.assertIs(type(loaded), ecc.EccController)
+        self.assertEqual(loaded.P, 13)
+        self.assertEqual(loaded.P_CONST, ecc.number_to_binary(13))
+
+        self.build().save(self.path)
+        with self.assertRaises(ValueError):
+            ecc.EccController.load(self.path)
+
+    def test_array_file(self):
+        arrays = {'a': np.arange(5, dtype=np.int8), 'b': np.ones((2, 3)), 'c': np.empty(0)}
+        save_arrays(self.path, arrays, {'p': 2**255 - 19})
+
+        loaded, meta = load_arrays(self.path)
+
+        self.assertEqual(meta, {'p': 2**255 - 19})
+        for name, a in arrays.items():
+            np.testing.assert_array_equal(loaded[name], a)
+            self.assertEqual(loaded[name].dtype, a.dtype)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'0' * 32)
+        with self.assertRaises(ValueError):
+            load_arrays(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
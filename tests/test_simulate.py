@@ -0,0 +1,196 @@
+import ecc
+import random
+import unittest
+
+from ecc.point import PointConst
+from ecc.utilities.curve import Curve, point_sum
+
+
+class TestSimulate(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(0)
+
+        self.A = [random.randrange(256) for _ in range(100)]
+        self.B = [random.randrange(256) for _ in range(100)]
+
+    def test_add(self):
+        controller = ecc.ArithmeticController(record=True)
+        a, b, c = controller.get_bits(8, 8, 9)
+
+        controller.add(a, b, c)
+
+        result = controller.simulate((a, self.A), (b, self.B))
+
+        self.assertEqual(result.unresolved, 0)
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(c),
+                         [A+B for A, B in zip(self.A, self.B)])
+
+    def test_subtract(self):
+        controller = ecc.ArithmeticController(record=True)
+        a, b, c = controller.get_bits(8, 8, 8)
+        u = controller.get_bit()
+
+        controller.subtract(a, b, c, u)
+
+        result = controller.simulate((a, self.A), (b, self.B))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(c),
+                         [(A-B) % 256 for A, B in zip(self.A, self.B)])
+        self.assertEqual(result.get_bit(u).tolist(),
+                         [int(A < B) for A, B in zip(self.A, self.B)])
+
+    def test_mult_modp(self):
+        P = 251
+        controller = ecc.ModuloController(P, record=True)
+        a, b, c = controller.get_bits(8, 8, 8)
+
+        controller.mult_modp(a, b, c, True)
+
+        A = [v % P for v in self.A]
+        B = [v % P for v in self.B]
+        result = controller.simulate((a, A), (b, B))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(c),
+                         [(x*y) % P for x, y in zip(A, B)])
+
+    def test_wrong_input(self):
+        controller = ecc.ArithmeticController(record=True)
+        a, b, c = controller.get_bits(3, 3, 4)
+
+        controller.add(a, b, c)
+
+        result = controller.simulate((a, [1, 2]), (b, [3, 4]), (c, [4, 5]))
+
+        self.assertEqual(result.valid.tolist(), [True, False])
+
+    def test_ecc_add(self):
+        # y^2 = x^3 + 2x + 15 mod 8191
+        P = 8191
+        controller = ecc.EccController(P, record=True)
+        A, C = controller.new_point(), controller.new_point()
+        B = PointConst(7393, 1456, 13)
+
+        controller.ecc_add(A, B, C)
+
+        result = controller.simulate((A.x, [1, 5325]), (A.y, [7807, 5044]))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(C.x), [4269, 6362])
+        self.assertEqual(result.get_variable(C.y), [2442, 922])
+
+    def test_ecc_add_lazy(self):
+        P = 8191
+        controller = ecc.EccController(P, record=True)
+        controller.lazy_reduction = True
+        A, C = controller.new_point(), controller.new_point()
+        B = PointConst(7393, 1456, 13)
+
+        controller.ecc_add(A, B, C, True)
+
+        result = controller.simulate((A.x, [1, 5325]), (A.y, [7807, 5044]))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(C.x), [4269, 6362])
+        self.assertEqual(result.get_variable(C.y), [2442, 922])
+
+    def doubles(self) -> list[PointConst]:
+        # y^2 = x^3 + 2x + 15 mod 8191
+        G = PointConst(7393, 1456, 13)
+
+        doubles = [G]
+        for _ in range(12):
+            doubles.append(ecc.ecc_double(doubles[-1], 2, 8191))
+
+        return doubles
+
+    def check_ecc_multiply(self, keys: list[int], **kwargs):
+        P, doubles = 8191, self.doubles()
+        expected = [point_sum([doubles[i] for i in range(13) if k >> i & 1], P, 2) for k in keys]
+
+        controller = ecc.EccController(P, record=True)
+        key, out = controller.get_bit(13), controller.new_point()
+        controller.ecc_multiply(doubles, key, out, **kwargs)
+
+        result = controller.simulate((key, keys))
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(out.x), [point.x_int for point in expected])
+        self.assertEqual(result.get_variable(out.y), [point.y_int for point in expected])
+
+    def test_ecc_multiply_window(self):
+        # keys whose first addition is not G + G, which has no unique lambda
+        for window in (2, 3, 4):
+            self.check_ecc_multiply([100, 1234, 4660, 8188], window=window)
+
+    def test_ecc_multiply_signed(self):
+        # every key is correct with signed digits, including odd keys
+        self.check_ecc_multiply([1, 5, 777, 1234, 8190], signed=True)
+
+    def test_ecc_multiply_report(self):
+        report = ecc.report.ecc_multiply_report(8191, self.doubles(), (1, 4))
+
+        self.assertLess(report['4']['qubits'], report['1']['qubits'] / 2)
+        self.assertLess(report['signed']['qubits'], report['1']['qubits'])
+
+    def test_ecc_multiply_window_small_order(self):
+        # G has order 6, so some multiple in every window is point at infinity
+        curve = Curve(13, 0, 1, (2, 3))
+
+        for window in (2, 3, 4):
+            controller = ecc.EccController(13)
+            key, out = controller.get_bit(4), controller.new_point()
+
+            with self.assertRaises(ValueError):
+                controller.ecc_multiply(curve.doubles(), key, out, window)
+
+    def test_ecc_add_ctrl(self):
+        P = 8191
+        controller = ecc.EccController(P, record=True)
+        A, C = controller.new_point(), controller.new_point()
+        ctrl = controller.get_bit()
+        B = PointConst(7393, 1456, 13)
+
+        controller.ecc_add_ctrl(A, B, ctrl, C)
+
+        result = controller.simulate((A.x, [1, 5325, 1]), (A.y, [7807, 5044, 7807]), (ctrl, [1, 1, 0]))
+
+        # A - B = A + (x_B, -y_B)
+        minus = point_sum([PointConst(1, 7807, 13), PointConst(7393, P - 1456, 13)], P)
+
+        self.assertTrue(result.valid.all())
+        self.assertEqual(result.get_variable(C.x), [4269, 6362, minus.x_int])
+        self.assertEqual(result.get_variable(C.y), [2442, 922, minus.y_int])
+
+    def test_select_constant(self):
+        controller = ecc.GateController(record=True)
+        select, out = controller.get_bits(3, 4)
+        constants = [3, 5, 0, 15, 15, 8, 1, 3]
+
+        controller.select_constant(constants, select, out)
+
+        result = controller.simulate((select, list(range(8))))
+        self.assertEqual(result.get_variable(out), constants)
+
+    def test_sample(self):
+        controller = ecc.ModuloController(13, record=True)
+        a, b, c = controller.get_bits(4, 4, 4)
+
+        controller.div_modp(a, b, c)
+
+        controller.set_variable_constant(a, 7)
+        controller.set_variable_constant(b, 5)
+
+        result = controller.simulate()
+        sample = result.sample()
+
+        bqm = controller.fixed_bqm
+
+        self.assertEqual(bqm.energy({v: sample[v] for v in bqm.variables}), 0)
+        self.assertEqual(result.get_variable(c), [4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,267 @@
+import ecc
+import unittest
+from collections import Counter
+
+import dimod
+from parameterized import parameterized
+
+from ecc.solvers import DecompositionSolver, EliminationSolver, GrayCodeSolver, PoolSampler
+from ecc.utilities.curve import Curve
+
+
+class TestSolvers(unittest.TestCase):
+    def setUp(self) -> None:
+        P = 13
+        self.controller = ecc.ModuloController(P, record=True)
+        self.a, self.b, self.c = self.controller.get_bits(4, 4, 4)
+
+        self.controller.mult_modp(self.a, self.b, self.c)
+
+        self.controller.set_variable_constant(self.a, 7)
+        self.controller.set_variable_constant(self.b, 5)
+
+    def check_ground(self, sampleset):
+        lowest = sampleset.lowest()
+        self.assertEqual(lowest.first.energy, 0)
+
+        c, = self.controller.extract_batch(lowest, self.c)
+        self.assertTrue((c == 7*5 % 13).all())
+
+    @parameterized.expand([
+        ['sa', {'num_reads': 20, 'num_sweeps': 10000, 'seed': 0}],
+        ['tabu', {'num_reads': 4, 'seed': 0, 'timeout': 50}],
+        ['parallel', {'num_reads': 20, 'num_sweeps': 10000, 'seed': 0}],
+    ])
+    def test_run(self, sampler, params):
+        self.check_ground(self.controller.run(sampler, **params))
+
+    def test_pool(self):
+        sampleset = self.controller.run(PoolSampler('sa', 2), num_reads=20, num_sweeps=10000, seed=0)
+
+        self.assertEqual(len(sampleset), 20)
+        self.check_ground(sampleset)
+
+    def test_warm_start(self):
+        sampleset = self.controller.run('steepest', warm_start=(), num_reads=1)
+
+        self.assertEqual(sampleset.first.energy, 0)
+        self.check_ground(sampleset)
+
+    def test_polish(self):
+        sampleset = self.controller.run('random', polish=True, num_reads=5, seed=0)
+
+        before = self.controller.run('random', num_reads=5, seed=0)
+
+        self.assertTrue((sampleset.record.energy <= before.record.energy).all())
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            self.controller.run('unknown')
+
+
+class TestGrayCodeSolver(unittest.TestCase):
+    @parameterized.expand([
+        [16, 1],
+        [4, 1],
+        [5, 4],
+    ])
+    def test_lowest(self, lane_bits, processes):
+        bqm = dimod.generators.ran_r(1, 14, seed=lane_bits)
+        expected = dimod.ExactSolver().sample(bqm).lowest()
+
+        result = GrayCodeSolver().sample(bqm, lane_bits=lane_bits, processes=processes)
+
+        self.assertEqual(result.first.energy, expected.first.energy)
+        self.assertEqual(set(map(tuple, result.record.sample)),
+                         set(map(tuple, expected.record.sample)))
+
+    def test_max_degeneracy(self):
+        # every state where a is 0 is lowest
+        bqm = dimod.BQM({'a': 1, 'b': 0, 'c': 0, 'd': 0}, {}, 0, 'BINARY')
+
+        result = GrayCodeSolver().sample(bqm, lane_bits=2, max_degeneracy=3)
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result.info['degeneracy'], 8)
+
+
+class TestEliminationSolver(unittest.TestCase):
+    @parameterized.expand([[0], [1], [2]])
+    def test_lowest(self, seed):
+        bqm = dimod.generators.ran_r(1, 12, seed=seed)
+        expected = dimod.ExactSolver().sample(bqm).lowest()
+
+        result = EliminationSolver().sample(bqm)
+
+        self.assertEqual(result.first.energy, expected.first.energy)
+        self.assertEqual(result.info['degeneracy'], len(expected))
+        self.assertEqual(set(map(tuple, result.record.sample)),
+                         set(map(tuple, expected.record.sample)))
+
+    def test_add(self):
+        controller = ecc.ArithmeticController()
+        a, b, c = controller.get_bits(64, 64, 65)
+
+        controller.add(a, b, c)
+        controller.set_variable_constant(a, 2**63 + 12345)
+        controller.set_variable_constant(c, 2**64 + 2**62)
+
+        sampleset = controller.run('elimination')
+
+        self.assertEqual(sampleset.first.energy, 0)
+        self.assertEqual(sampleset.info['degeneracy'], 1)
+        self.assertEqual(controller.extract_batch(sampleset, b)[0].tolist(),
+                         [2**63 + 2**62 - 12345])
+
+    def test_add_modp(self):
+        P = 2**61 - 1
+        controller = ecc.ModuloController(P)
+        a, b, c = controller.get_bits(61, 61, 61)
+
+        controller.add_modp(a, b, c)
+        controller.set_variable_constant(a, P - 5)
+        controller.set_variable_constant(b, 12345)
+
+        sampleset = controller.run('elimination')
+
+        self.assertEqual(sampleset.first.energy, 0)
+        self.assertEqual(controller.extract_batch(sampleset, c)[0].tolist(),
+                         [12340])
+
+    def test_num_reads(self):
+        # every state where a is 0 is lowest, each of them is drawn equally often
+        bqm = dimod.BQM({'a': 1, 'b': 0, 'c': 0, 'd': 0}, {('b', 'c'): 0}, 0, 'BINARY')
+
+        result = EliminationSolver().sample(bqm, num_reads=800, seed=0)
+
+        self.assertEqual(result.info['degeneracy'], 8)
+        self.assertTrue((result.record.energy == 0).all())
+        states = Counter(map(tuple, result.record.sample))
+        self.assertEqual(len(states), 8)
+        self.assertGreater(min(states.values()), 70)
+
+    def test_num_reads_degenerate(self):
+        # 2**60 lowest states, only drawn one is made
+        bqm = dimod.BQM({v: 0 for v in range(60)}, {(v, v + 1): 0 for v in range(59)}, 0, 'BINARY')
+
+        result = EliminationSolver().sample(bqm, num_reads=1, seed=0)
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result.info['degeneracy'], 2**60)
+
+    def test_max_width(self):
+        bqm = dimod.generators.ran_r(1, 12, seed=0)
+
+        with self.assertRaises(ValueError):
+            EliminationSolver().sample(bqm, max_width=3)
+
+
+class TestDecompositionSolver(unittest.TestCase):
+    def build(self, buffered: bool = False) -> ecc.ArithmeticController:
+        # t = a + x, c = t + b, solving x needs value of t wanted by later stage
+        controller = ecc.ArithmeticController(buffered, record=True)
+        self.a, self.b, self.x = controller.get_bits(8, 8, 8)
+
+        with controller.stage():
+            self.t = controller.get_bit(9)
+            controller.add(self.a, self.x, self.t)
+
+        with controller.stage():
+            self.c = controller.get_bit(10)
+            controller.add(self.t, self.b, self.c)
+
+        controller.set_variable_constant(self.a, 100)
+        controller.set_variable_constant(self.b, 37)
+        controller.set_variable_constant(self.c, 300)
+
+        return controller
+
+    def test_backward(self):
+        controller = self.build()
+        sampleset = controller.run_stages(target=0, seed=0)
+
+        self.assertEqual(sampleset.first.energy, 0)
+        # forward pass can't know t, it is passed back from later stage
+        self.assertGreater(sampleset.info['energies'][1], 0)
+
+        t, x = controller.extract_batch(sampleset, self.t, self.x)
+        self.assertEqual((t[0], x[0]), (263, 163))
+
+    @parameterized.expand([[False], [True]])
+    def test_parts(self, buffered):
+        # parts of buffered controller are made from gates left by folding
+        controller = self.build(buffered)
+        self.assertEqual(controller.fold_constants() > 0, buffered)
+
+        blocks, parts = controller.stage_blocks(), controller.stage_parts()
+
+        self.assertEqual(len(blocks), len(parts))
+        for part in parts:
+            self.assertTrue(set(part.variables) <= set(controller.fixed_bqm.variables))
+
+        total = sum(parts[1:], parts[0].copy())
+        total.offset = controller.fixed_bqm.offset
+        self.assertEqual(total, controller.fixed_bqm)
+
+    def test_processes(self):
+        controller = self.build()
+        states = dimod.SampleSet.from_samples_bqm(
+            [dict.fromkeys(controller.fixed_bqm.variables, v) for v in (0, 1)], controller.fixed_bqm)
+
+        results = [controller.run_stages(processes=processes, initial_states=states, max_sweeps=4, seed=1)
+                   for processes in (1, 2)]
+
+        self.assertEqual(results[0].info['energies'], results[1].info['energies'])
+        self.assertEqual(len(results[0]), 2)
+        for sampleset in results:
+            self.assertEqual(list(sampleset.record.energy), [0, 0])
+
+    def test_processes_shared_read(self):
+        # blocks 1 and 2 are on same level and both read variable 0 on backward pass
+        bqm = dimod.BQM({0: 3, 1: -1}, {(0, 1): 2, (0, 2): 1, (0, 3): -4, (1, 3): 1}, 0, 'BINARY')
+        states = dimod.SampleSet.from_samples_bqm(dict.fromkeys(range(4), 0), bqm)
+
+        results = [DecompositionSolver(processes=processes).sample(
+            bqm, blocks=[[0, 1], [2], [3]], initial_states=states, max_sweeps=2, seed=0) for processes in (1, 2)]
+
+        for sampleset in results:
+            self.assertEqual(sampleset.info['energies'], [0, -1, -1])
+
+    def test_heuristic(self):
+        # without parts, interactions belong to later block and energy never gets higher than initial state
+        bqm = dimod.generators.ran_r(1, 40, seed=0)
+        sampleset = DecompositionSolver().sample(bqm, block_size=8, max_sweeps=6, seed=0)
+
+        energies = sampleset.info['energies']
+        self.assertEqual(len(energies), 7)
+        self.assertEqual(sampleset.first.energy, min(energies))
+        self.assertEqual(sampleset.first.energy, bqm.energy(sampleset.first.sample))
+
+        with self.assertRaises(ValueError):
+            DecompositionSolver().sample(bqm, blocks=[[0, 1], [1, 2]])
+
+    def test_degenerate_block(self):
+        # block has 2**40 lowest states, elimination child draws one of them
+        bqm = dimod.BQM({v: 0 for v in range(40)}, {(v, v + 1): 0 for v in range(39)}, 0, 'BINARY')
+
+        sampleset = DecompositionSolver().sample(bqm, block_size=40, max_sweeps=1, seed=0)
+
+        self.assertEqual(sampleset.first.energy, 0)
+
+    def test_ecc_multiply(self):
+        curve = Curve(13, 0, 1, (2, 3))
+
+        controller = ecc.EccController(13, record=True)
+        key, out = controller.get_bit(4), controller.new_point()
+        controller.ecc_multiply(curve.doubles(), key, out, signed=True)
+        controller.set_variable_constant(key, 5)
+
+        sampleset = controller.run_stages(target=0, seed=0)
+        self.assertEqual(sampleset.first.energy, 0)
+
+        x, y = controller.extract_batch(sampleset, out.x, out.y)
+        self.assertEqual((int(x[0]) % 13, int(y[0]) % 13), (2, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
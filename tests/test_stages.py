@@ -0,0 +1,85 @@
+import ecc
+import unittest
+
+from parameterized import parameterized
+
+from ecc.utilities.curve import Curve
+
+
+class TestStages(unittest.TestCase):
+    def build(self, processes: int, buffered: bool = False) -> ecc.ArithmeticController:
+        controller = ecc.ArithmeticController(buffered)
+        controller.add_strategy = 'kogge_stone'
+
+        # a[i+1] = a[i] + b, bits of every stage are created before
+        self.a = controller.get_bits(*range(3, 8))
+        self.b, self.d = controller.get_bits(3, 3)
+
+        controller.build_stages('add', [(self.a[i], self.b, self.a[i + 1]) for i in range(4)], processes)
+        # stages that merge and set constants on bits of controller
+        controller.build_stages('merge_variable', [(self.d, self.b)], processes)
+        controller.build_stages('set_variable_constant', [(self.a[0], 5), (self.b, 3)], processes)
+
+        return controller
+
+    @parameterized.expand([[False], [True]])
+    def test_processes(self, buffered):
+        expected = self.build(1, buffered)
+        controller = self.build(2, buffered)
+
+        self.assertEqual(controller.buffered, buffered)
+        self.assertEqual(controller.bit_cnt, expected.bit_cnt)
+        self.assertEqual(controller.bit_to_name, expected.bit_to_name)
+        self.assertEqual(controller.constants, expected.constants)
+        self.assertEqual(controller.stages, expected.stages)
+        self.assertEqual(controller.bqm, expected.bqm)
+
+        sampleset = controller.run('elimination')
+        self.assertEqual(sampleset.first.energy, 0)
+
+        a2, a4, d = controller.extract_batch(sampleset, self.a[2], self.a[4], self.d)
+        self.assertEqual((a2[0], a4[0], d[0]), (11, 17, 3))
+
+    def test_fragment(self):
+        # fragment has only bits created by stage and bits of controller merged by it
+        controller = ecc.ArithmeticController(True)
+        a, b = controller.get_bits(100, 2)
+
+        blank = controller._blank()
+        c = blank.get_bit(2)
+        blank.merge_variable(b, [a[0], c[0]])
+        fragment = blank._get_fragment()
+
+        self.assertEqual(len(fragment['names']), 2)
+        self.assertEqual(fragment['merged_bits'].tolist(), [a[0]])
+        self.assertEqual(fragment['merged_names'].tolist(), [b[0]])
+
+        controller._add_fragment(fragment, 102, 0)
+        self.assertEqual(controller.get_names(a[0], c[0], c[1]), [b[0], b[1], c[1]])
+
+    def test_ecc_multiply(self):
+        curve = Curve(13, 0, 1, (2, 3))
+
+        controllers = []
+        for processes in (1, 2):
+            controller = ecc.EccController(13)
+            key, out = controller.get_bit(4), controller.new_point()
+            controller.ecc_multiply(curve.doubles(), key, out, signed=True, processes=processes)
+            controllers.append(controller)
+
+        expected, controller = controllers
+        self.assertEqual(len(controller.stages), 4)
+        self.assertEqual(controller.stages, expected.stages)
+        self.assertEqual(controller.bit_to_name, expected.bit_to_name)
+        self.assertEqual(controller.bqm, expected.bqm)
+
+    def test_record(self):
+        controller = ecc.ArithmeticController(record=True)
+        a, b, c = controller.get_bits(3, 3, 4)
+
+        with self.assertRaises(ValueError):
+            controller.build_stages('add', [(a, b, c)], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
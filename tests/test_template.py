@@ -0,0 +1,73 @@
+import ecc
+import itertools
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self) -> None:
+        self.P = 5
+        self.controller = ecc.ModuloController(self.P)
+
+        self.a, self.b, self.c = self.controller.get_bits(3, 3, 3)
+        self.controller.add_modp(self.a, self.b, self.c, True)
+
+    def test_sweep(self):
+        shape = self.controller.shape
+        template = self.controller.template(self.a, self.b)
+
+        pairs = list(itertools.product(range(self.P), repeat=2))
+        bindings = template.bind_many(*zip(*pairs))
+
+        for (A, B), binding in zip(pairs, bindings):
+            sampleset = binding.sample('gray')
+            self.assertEqual(sampleset.first.energy, 0)
+
+            c, = self.controller.extract_batch(sampleset, self.c)
+            self.assertEqual(set(c.tolist()), {(A + B) % self.P})
+
+        # bqm of controller is not changed by bindings
+        self.assertEqual(self.controller.shape, shape)
+
+    @parameterized.expand([(1, 3), (4, 4), (0, 2)])
+    def test_bind(self, A, B):
+        template = self.controller.template(self.a, self.b)
+        binding = template.bind(ecc.number_to_binary(A, 3), B)
+
+        expected = self.controller.bqm.copy()
+        fixed = dict(zip(self.controller.get_names(*self.a, *self.b),
+                         ecc.number_to_binary(A, 3) + ecc.number_to_binary(B, 3)))
+        for bit, value in self.controller.constants.items():
+            fixed[self.controller.get_name(bit)] = value
+        expected.fix_variables([(name, value) for name, value in fixed.items() if name in expected.variables])
+
+        bqm = binding.to_bqm()
+        self.assertEqual(set(bqm.variables), set(expected.variables))
+        self.assertEqual(bqm, expected)
+
+        samples = np.random.default_rng(A).integers(0, 2, (8, template.num_variables))
+        np.testing.assert_allclose(binding.energies(samples),
+                                   ecc.BQMArrays.from_bqm(expected).energies(samples[:, binding.index(expected.variables)]))
+
+    def test_constants(self):
+        # constants set before template are fixed on every binding
+        self.controller.set_variable_constant(self.a, 2)
+        template = self.controller.template(self.b)
+
+        sampleset = template.bind(4).sample('gray')
+        a, c = self.controller.extract_batch(sampleset, self.a, self.c)
+        self.assertEqual(set(a.tolist()), {2})
+        self.assertEqual(set(c.tolist()), {1})
+
+        with self.assertRaises(ValueError):
+            self.controller.template(self.a)
+        with self.assertRaises(ValueError):
+            template.bind(8)
+        with self.assertRaises(ValueError):
+            template.bind(1, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()